@@ -0,0 +1,101 @@
+"""
+Затримка запису в БД під час онлайн-бекапу (services/backup.py) проти простою
+
+Безперервний потік create_question + save_answer; спершу без бекапу, потім під час
+BackupScheduler.run_once() з різним розміром кроку. Наприкінці — цілісність
+і кількість рядків у відновленому знімку.
+
+Запуск: python -m benchmarks.bench_backup --rows 50000 --pages 16 64 -1
+(--pages -1 — уся БД за один крок)
+"""
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.bench_replay import percentile
+
+
+async def fill(db, rows: int):
+    def run(conn):
+        conn.executemany(
+            "INSERT INTO questions (request_id, user_id, question, answer, status) "
+            "VALUES (?, ?, ?, ?, 'answered')",
+            ((f"F{i:07X}", i, f"Питання номер {i} про розклад і оцінки " * 4, "Відповідь " * 20)
+             for i in range(rows)),
+        )
+
+    await db._transaction(run)
+
+
+async def measure_writes(db, stop: asyncio.Event, counter: list) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        request_id = await db.create_question(counter[0], "Нове питання під час бекапу")
+        await db.save_answer(request_id, "Відповідь")
+        latencies.append((time.perf_counter() - started) * 1000)
+        counter[0] += 1
+        await asyncio.sleep(0.002)
+    return latencies
+
+
+async def run(rows: int, pages_variants: list, idle_seconds: float):
+    from services.backup import BackupScheduler, list_snapshots
+    from services.database import db
+
+    workdir = tempfile.mkdtemp()
+    db.db_path = os.path.join(workdir, "bench.db")
+    await db.init()
+    await fill(db, rows)
+    print(f"БД: {os.path.getsize(db.db_path) / 1024 / 1024:.1f} МБ, {rows} рядків")
+
+    counter = [1]
+    stop = asyncio.Event()
+    writer = asyncio.create_task(measure_writes(db, stop, counter))
+    await asyncio.sleep(idle_seconds)
+    stop.set()
+    idle = await writer
+    print(f"{'без бекапу':<18} записів={len(idle):<6} p50={percentile(idle, 0.5):.2f} мс "
+          f"p99={percentile(idle, 0.99):.2f} мс max={max(idle):.2f} мс")
+
+    for pages in pages_variants:
+        scheduler = BackupScheduler(os.path.join(workdir, f"backups{pages}"), step_pages=pages)
+        stop = asyncio.Event()
+        writer = asyncio.create_task(measure_writes(db, stop, counter))
+        started = time.perf_counter()
+        path = await scheduler.run_once()
+        duration = time.perf_counter() - started
+        stop.set()
+        during = await writer
+        expected = await db._transaction(lambda conn: conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0])
+        print(f"{f'бекап pages={pages}':<18} записів={len(during):<6} p50={percentile(during, 0.5):.2f} мс "
+              f"p99={percentile(during, 0.99):.2f} мс max={max(during, default=0):.2f} мс, "
+              f"бекап {duration:.2f} с, знімок {os.path.getsize(path) / 1024:.0f} КБ")
+
+        restored = os.path.join(workdir, f"restored{pages}.db")
+        with gzip.open(list_snapshots(scheduler.directory)[-1], "rb") as src, open(restored, "wb") as dst:
+            dst.write(src.read())
+        conn = sqlite3.connect(restored)
+        check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        count = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        conn.close()
+        print(f"{'':<18} integrity_check={check}, рядків у знімку {count} (у БД зараз {expected})")
+
+    await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="рядків у тестовій БД")
+    parser.add_argument("--pages", type=int, nargs="+", default=[16, 64, -1], help="сторінок за крок")
+    parser.add_argument("--idle-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    os.environ.update({"TRACE_ENABLED": "false", "TRAFFIC_CAPTURE_PATH": "", "RATE_LIMIT_SECONDS": "0"})
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    asyncio.run(run(args.rows, args.pages, args.idle_seconds))
@@ -0,0 +1,103 @@
+"""
+Масовий розбір хвилі спаму: по одному (/reply: get_question + save_answer) проти
+масових дій однією транзакцією (/answerall, /reject, /delete), та доставка черги outbox
+послідовно проти паралельного надсилання з темпом на бота
+
+Запуск: python -m benchmarks.bench_bulk --questions 1000 --deliveries 300 --api-latency-ms 100
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import tempfile
+import time
+
+
+_serial = itertools.count()
+
+
+async def fill(db, count: int) -> list:
+    """count нових питань без відповіді; повертає request_id усіх очікуючих"""
+    def run(conn):
+        conn.executemany(
+            "INSERT INTO questions (request_id, user_id, question, status) VALUES (?, ?, ?, 'pending')",
+            ((f"{i:08X}", 1000 + i, f"Купуйте підписники дешево, пишіть у приват {i}")
+             for i in itertools.islice(_serial, count)),
+        )
+
+    await db._transaction(run)
+    return await db.filter_pending()
+
+
+async def timed(label: str, coro) -> float:
+    started = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed:>8.3f} с" + (f"  ({result})" if isinstance(result, int) else ""))
+    return elapsed
+
+
+async def one_by_one(db, request_ids: list) -> int:
+    for request_id in request_ids:
+        await db.get_question(request_id)
+        await db.save_answer(request_id, "Спам відхилено")
+    return len(request_ids)
+
+
+async def drain(db, worker, bot, count: int, concurrency: int, rate: float) -> float:
+    request_ids = await fill(db, count)
+    await db.save_answers(request_ids, "Відповідь")
+    worker.concurrency, worker.rate = concurrency, rate
+    worker.start([bot])
+    started = time.perf_counter()
+    while await db.count_outbox():
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await worker.stop()
+    return elapsed
+
+
+async def run(questions: int, deliveries: int, api_latency: float):
+    from aiogram import Bot
+    from benchmarks.bench_replay import create_fake_session
+    from services.database import db
+    from services.outbox import DeliveryWorker
+
+    db.db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    await db.init()
+
+    print(f"Хвиля з {questions} питань:")
+    sequential = await timed("по одному (get_question + save_answer)", one_by_one(db, await fill(db, questions)))
+    await db._transaction(lambda conn: conn.execute("DELETE FROM outbox"))
+    bulk = await timed("/answerall (save_answers, одна транзакція)", db.save_answers(await fill(db, questions), "Спам"))
+    await timed("/reject (одна транзакція)", db.reject_questions(await fill(db, questions)))
+    await timed("/delete (одна транзакція)", db.delete_questions(await fill(db, questions)))
+    print(f"Збереження відповідей: у {sequential / bulk:.0f} разів швидше\n")
+    await db._transaction(lambda conn: conn.execute("DELETE FROM outbox"))
+
+    bot = Bot(token="123456:BENCH", session=create_fake_session(api_latency))
+    worker = DeliveryWorker(idle_interval=0.05)
+    print(f"Доставка {deliveries} відповідей (Bot API {api_latency * 1000:.0f} мс):")
+    for concurrency, rate in ((1, 0.0), (8, 25.0), (8, 0.0)):
+        elapsed = await drain(db, worker, bot, deliveries, concurrency, rate)
+        pace = f"{rate:.0f}/с" if rate else "без ліміту"
+        print(f"  concurrency={concurrency:<2} темп {pace:<11} {elapsed:>8.2f} с ({deliveries / elapsed:.1f} повід./с)")
+    await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--deliveries", type=int, default=300)
+    parser.add_argument("--api-latency-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "BOT_TOKEN": "123456:BENCH",
+        "TRACE_ENABLED": "false",
+        "TRAFFIC_CAPTURE_PATH": "",
+        "ENV_FILE": os.path.join(tempfile.mkdtemp(), "bench.env"),
+    })
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    asyncio.run(run(args.questions, args.deliveries, args.api_latency_ms / 1000))
@@ -0,0 +1,149 @@
+"""
+Вартість маршрутизації callback_query: попередній ланцюжок F.data-фільтрів
+проти таблиці префіксів (utils/callbacks.py)
+
+Обидва варіанти — ті самі два роутери (адмінський з IsAdmin першим, потім користувацький)
+з порожніми обробниками, тож вимірюється лише пошук обробника і розбір даних.
+
+Запуск: python -m benchmarks.bench_callbacks --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+ADMIN_ID = 1
+USER_ID = 2
+
+CASES = [
+    ("ask_question", USER_ID),
+    ("confirm_send", USER_ID),
+    ("cancel_question", USER_ID),
+    ("rate:3F2A9C1B:1", USER_ID),
+    ("rate:3F2A9C1B:x", USER_ID),
+    ("admin_stats", ADMIN_ID),
+    ("admin_reply:3F2A9C1B", ADMIN_ID),
+    ("admin_search:3", ADMIN_ID),
+]
+
+
+async def noop(*args, **kwargs):
+    pass
+
+
+def legacy_routers():
+    """Фільтри у тому порядку, в якому вони були в handlers/admin.py і handlers/user.py"""
+    from aiogram import F, Router
+    from utils.filters import IsAdmin
+    from utils.states import UserStates
+
+    admin = Router()
+    admin.callback_query.filter(IsAdmin())
+    for data in ("admin_stats", "admin_pending", "admin_back"):
+        admin.callback_query.register(noop, F.data == data)
+    for prefix in ("admin_reply:", "admin_reply_all:"):
+        admin.callback_query.register(noop, F.data.startswith(prefix))
+    admin.callback_query.register(noop, F.data.startswith("admin_search:"))
+
+    user = Router()
+    for data in ("back_to_menu", "how_it_works", "ask_question"):
+        user.callback_query.register(noop, F.data == data)
+    user.callback_query.register(noop, F.data == "confirm_send", UserStates.confirming_question)
+    user.callback_query.register(noop, F.data == "edit_question", UserStates.confirming_question)
+    user.callback_query.register(noop, F.data == "cancel_question")
+
+    async def rate(callback):
+        parts = callback.data.split(":")
+        int(parts[2])
+
+    user.callback_query.register(rate, F.data.startswith("rate:"))
+    return admin, user
+
+
+def table_routers():
+    from aiogram import Router
+    from utils import callbacks as schema
+    from utils.filters import IsAdmin
+    from utils.states import UserStates
+
+    admin = Router()
+    admin.callback_query.filter(IsAdmin())
+    admin_table = schema.CallbackRouter(admin)
+    for factory in (
+        schema.AdminStatsCallback, schema.AdminPendingCallback, schema.AdminBackCallback,
+        schema.AdminReplyCallback, schema.AdminReplyAllCallback, schema.AdminSearchCallback,
+    ):
+        admin_table(factory)(noop)
+
+    user = Router()
+    user_table = schema.CallbackRouter(user)
+    for factory in (
+        schema.BackToMenuCallback, schema.HowItWorksCallback, schema.AskQuestionCallback,
+        schema.CancelQuestionCallback, schema.RateCallback,
+    ):
+        user_table(factory)(noop)
+    user_table(schema.ConfirmSendCallback, UserStates.confirming_question)(noop)
+    user_table(schema.EditQuestionCallback, UserStates.confirming_question)(noop)
+    return admin, user
+
+
+def callback_update(update_id: int, user_id: int, data: str):
+    from aiogram.types import Update
+    return Update.model_validate({"update_id": update_id, "callback_query": {
+        "id": str(update_id), "chat_instance": "0", "data": data,
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+        "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "."},
+    }})
+
+
+async def measure(routers, iterations: int) -> dict:
+    from aiogram import Bot, Dispatcher
+    from aiogram.fsm.storage.base import StorageKey
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from benchmarks.bench_replay import create_fake_session
+    from utils.states import UserStates
+
+    bot = Bot(token="123456:BENCH", session=create_fake_session(0))
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_routers(*routers)
+    await dp.storage.set_state(
+        StorageKey(bot_id=bot.id, chat_id=USER_ID, user_id=USER_ID), UserStates.confirming_question
+    )
+
+    results = {}
+    for data, user_id in CASES:
+        updates = [callback_update(i, user_id, data) for i in range(iterations)]
+        errors = 0
+        started = time.perf_counter()
+        for update in updates:
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+        results[data] = ((time.perf_counter() - started) / iterations * 1_000_000, errors)
+    return results
+
+
+async def run(iterations: int):
+    before = await measure(legacy_routers(), iterations)
+    after = await measure(table_routers(), iterations)
+    print(f"{'callback_data':<24}{'F.data, мкс':>14}{'таблиця, мкс':>15}{'прискорення':>13}")
+    for data, _ in CASES:
+        (old, old_errors), (new, new_errors) = before[data], after[data]
+        note = f"  винятків: {old_errors} → {new_errors}" if old_errors or new_errors else ""
+        print(f"{data:<24}{old:>14.1f}{new:>15.1f}{old / new:>12.2f}×{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "BOT_TOKEN": "123456:BENCH",
+        "ADMIN_IDS": str(ADMIN_ID),
+        "BOTS_FILE": "",
+        "ENV_FILE": os.path.join(tempfile.mkdtemp(), "bench.env"),
+    })
+    asyncio.run(run(args.iterations))
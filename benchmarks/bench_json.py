@@ -0,0 +1,117 @@
+"""
+Вартість JSON для оновлень і викликів Bot API: stdlib json проти orjson (services/json_codec.py)
+
+Для кожного типу оновлення — розбір тіла вебхука (лише JSON і JSON + Update.model_validate);
+для вихідних викликів — build_form_data (параметри з клавіатурою) і розбір відповіді
+через check_response, як у AiohttpSession.
+
+Запуск: python -m benchmarks.bench_json --iterations 20000
+"""
+import argparse
+import json
+import os
+import time
+
+QUESTION = ("Доброго дня! Хочу запитати про розклад консультацій перед сесією, "
+            "бо в групі ніхто не знає, коли і де вони будуть. ") * 30
+
+
+def message_update(text: str) -> dict:
+    return {"update_id": 100, "message": {
+        "message_id": 7, "date": 1700000000, "text": text,
+        "chat": {"id": 42, "type": "private", "first_name": "Марія", "username": "maria"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Марія", "username": "maria", "language_code": "uk"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}] if text.startswith("/") else None,
+    }}
+
+
+def callback_update() -> dict:
+    return {"update_id": 101, "callback_query": {
+        "id": "4382bfdwdsb323b2d9", "chat_instance": "-12345", "data": "admin_reply:3F2A9C1B",
+        "from": {"id": 1, "is_bot": False, "first_name": "Admin"},
+        "message": {
+            "message_id": 8, "date": 1700000000, "text": QUESTION[:1500],
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 123456, "is_bot": True, "first_name": "bot"},
+            "reply_markup": {"inline_keyboard": [
+                [{"text": "↩️ Відповісти на #3F2A9C1B", "callback_data": "admin_reply:3F2A9C1B"}],
+                [{"text": "👥 Відповісти всім (3)", "callback_data": "admin_reply_all:3F2A9C1B"}],
+            ]},
+        },
+    }}
+
+
+def timed(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run(iterations: int):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.methods import SendMessage
+    from aiogram.types import Update
+    from config import TEXTS
+    from services.json_codec import ORJSON, STDLIB
+    from utils.keyboards import admin_reply_keyboard
+
+    codecs = [codec for codec in (STDLIB, ORJSON) if codec]
+    if not ORJSON:
+        print("orjson не встановлено — лише stdlib json (pip install orjson)")
+
+    updates = {
+        "message /start": message_update("/start"),
+        "message довге питання": message_update(QUESTION),
+        "callback_query": callback_update(),
+    }
+    send = SendMessage(
+        chat_id=42,
+        text=TEXTS["admin_new_question"].format(request_id="3F2A9C1B", question=QUESTION[:3500], similar=""),
+        parse_mode="HTML",
+        reply_markup=admin_reply_keyboard("3F2A9C1B", similar=2),
+    )
+    response = json.dumps({"ok": True, "result": {
+        "message_id": 9, "date": 1700000000, "text": send.text,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 123456, "is_bot": True, "first_name": "bot"},
+    }}, ensure_ascii=False)
+
+    results = {}
+    for codec in codecs:
+        session = AiohttpSession(json_loads=codec.loads, json_dumps=codec.dumps)
+        bot = Bot(token="123456:BENCH", session=session)
+        row = {}
+        for name, update in updates.items():
+            body = codec.dumps(update).encode()
+            row[f"{name}: JSON"] = timed(lambda: codec.loads(body), iterations)
+            row[f"{name}: + Update"] = timed(
+                lambda: Update.model_validate(codec.loads(body), context={"bot": bot}), iterations
+            )
+        row["sendMessage: build_form_data"] = timed(lambda: session.build_form_data(bot, send), iterations)
+        row["sendMessage: відповідь"] = timed(
+            lambda: session.check_response(bot, send, 200, response), iterations
+        )
+        results[codec.name] = row
+
+    names = list(next(iter(results.values())))
+    header = "".join(f"{codec.name:>12}" for codec in codecs)
+    if len(codecs) > 1:
+        header += f"{'прискорення':>14}"
+    print(f"{'мкс на операцію':<40}{header}")
+    for name in names:
+        values = [results[codec.name][name] for codec in codecs]
+        line = f"{name:<40}" + "".join(f"{value:>12.1f}" for value in values)
+        if len(values) > 1:
+            line += f"{values[0] / values[1]:>13.2f}×"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+    run(args.iterations)
@@ -0,0 +1,103 @@
+"""
+Пам'ять на кожного додаткового бота в режимі BOTS_FILE
+(спільні процес, пул з'єднань, диспетчер і БД) проти окремого процесу на бота
+
+Запуск: python -m benchmarks.bench_multibot --bots 1 10 50 --users 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Виконується у свіжому інтерпретаторі для кожної кількості ботів
+MEASURE = """
+import asyncio, itertools, json, logging, sys
+logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+from benchmarks.bench_replay import create_fake_session
+import main
+from aiogram.types import Update
+from services.database import db
+from services.introspection import rss_bytes
+
+db.db_path = sys.argv[1]
+users = int(sys.argv[2])
+update_ids = itertools.count(1)
+
+def callback(user, data):
+    return Update.model_validate({"update_id": next(update_ids), "callback_query": {
+        "id": "1", "chat_instance": "0", "data": data,
+        "from": {"id": user, "is_bot": False, "first_name": "user"},
+        "message": {"message_id": 1, "date": 0, "chat": {"id": user, "type": "private"}, "text": "."}}})
+
+def message(user, text):
+    return Update.model_validate({"update_id": next(update_ids), "message": {
+        "message_id": 1, "date": 0, "text": text,
+        "chat": {"id": user, "type": "private"},
+        "from": {"id": user, "is_bot": False, "first_name": "user"}}})
+
+async def run():
+    bots, dp = main.create_bots_and_dispatcher(session=create_fake_session(0))
+    await dp.emit_startup(bots=bots)
+    before = rss_bytes()
+    for bot in bots:
+        for user in range(1, users + 1):
+            await dp.feed_update(bot, callback(user, "ask_question"))
+            await dp.feed_update(bot, message(user, f"Тестове питання номер {user} про розклад"))
+            await dp.feed_update(bot, callback(user, "confirm_send"))
+    result = {"idle": before, "loaded": rss_bytes()}
+    await dp.emit_shutdown(bots=bots)
+    print(json.dumps(result))
+
+asyncio.run(run())
+"""
+
+
+def measure(bots: int, users: int) -> dict:
+    workdir = tempfile.mkdtemp()
+    bots_file = os.path.join(workdir, "bots.json")
+    with open(bots_file, "w", encoding="utf-8") as f:
+        json.dump([
+            {"token": f"{100000 + i}:BENCH", "admin_ids": [1], "spam_words": ""}
+            for i in range(bots)
+        ], f)
+    env = dict(
+        os.environ,
+        BOTS_FILE=bots_file,
+        ENV_FILE=os.path.join(workdir, "none.env"),
+        RATE_LIMIT_SECONDS="0",
+        TRAFFIC_CAPTURE_PATH="",
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", MEASURE, os.path.join(workdir, "bench.db"), str(users)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def mb(value: float) -> str:
+    return f"{value / 1024 / 1024:.1f} МБ"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bots", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--users", type=int, default=20, help="користувачів з питанням на кожного бота")
+    args = parser.parse_args()
+
+    results = {count: measure(count, args.users) for count in sorted(set(args.bots) | {1})}
+    base = results[1]
+    print(f"Один бот в окремому процесі: {mb(base['loaded'])} RSS")
+    for count, result in results.items():
+        if count == 1:
+            continue
+        per_bot_idle = (result["idle"] - base["idle"]) / (count - 1)
+        per_bot_loaded = (result["loaded"] - base["loaded"]) / (count - 1)
+        print(
+            f"{count:>4} ботів: {mb(result['loaded'])} RSS, на кожного додаткового: "
+            f"{mb(per_bot_idle)} (без навантаження), {mb(per_bot_loaded)} (з {args.users} питаннями); "
+            f"окремими процесами було б ~{mb(base['loaded'] * count)}"
+        )
@@ -0,0 +1,86 @@
+"""
+Перцентилі часу відповіді: точні (сортування таблиці в SQLite) проти злиття
+щоденних DDSketch, як у /stats (services/quantiles.py)
+
+Затримки — логнормальний розподіл з довгим хвостом (медіана ~20 хв).
+
+Запуск: python -m benchmarks.bench_quantiles --rows 200000 --days 7
+"""
+import argparse
+import math
+import random
+import sqlite3
+import time
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def exact(conn: sqlite3.Connection, count: int) -> list:
+    """Як це виглядало б у SQL: окремий ORDER BY по всій таблиці на кожен квантиль"""
+    return [
+        conn.execute(
+            """SELECT (julianday(answered_at) - julianday(created_at)) * 86400 AS waited
+               FROM questions ORDER BY waited LIMIT 1 OFFSET ?""",
+            (int(q * (count - 1)),)
+        ).fetchone()[0]
+        for q in QUANTILES
+    ]
+
+
+def from_sketches(daily: list) -> list:
+    from services.quantiles import DDSketch
+
+    merged = DDSketch()
+    for data in daily:
+        merged.merge(DDSketch.from_json(data))
+    return [merged.quantile(q) for q in QUANTILES]
+
+
+def timed(func, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def run(rows: int, days: int):
+    from services.quantiles import DDSketch
+
+    rng = random.Random(1)
+    started = time.time() - days * 86400
+    records = []
+    for i in range(rows):
+        created = started + i * days * 86400 / rows
+        waited = round(rng.lognormvariate(math.log(1200), 1.5))
+        records.append((f"{i:08X}", created, created + waited))
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE questions (request_id TEXT PRIMARY KEY, created_at TIMESTAMP, answered_at TIMESTAMP)")
+    conn.executemany(
+        "INSERT INTO questions VALUES (?, datetime(?, 'unixepoch'), datetime(?, 'unixepoch'))", records
+    )
+
+    sketches = [DDSketch() for _ in range(days)]
+    add_started = time.perf_counter()
+    for i, (_, created, answered) in enumerate(records):
+        sketches[i * days // rows].add(answered - created)
+    add_us = (time.perf_counter() - add_started) / rows * 1_000_000
+    daily = [sketch.to_json() for sketch in sketches]
+
+    exact_ms, truth = timed(lambda: exact(conn, rows), repeat=1)
+    sketch_ms, estimate = timed(lambda: from_sketches(daily))
+
+    print(f"{rows} відповідей за {days} дн.; додавання у скетч: {add_us:.2f} мкс, "
+          f"розмір дня: {sum(map(len, daily)) // days} байт JSON")
+    print(f"{'':<8}{'точно, с':>12}{'скетч, с':>12}{'похибка':>10}")
+    for q, value, approx in zip(QUANTILES, truth, estimate):
+        print(f"p{q * 100:<7.0f}{value:>12.0f}{approx:>12.0f}{abs(approx - value) / value:>9.2%}")
+    print(f"час: SQL {exact_ms:.1f} мс, злиття скетчів {sketch_ms:.2f} мс ({exact_ms / sketch_ms:.0f}×)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+    run(args.rows, args.days)
@@ -0,0 +1,244 @@
+"""
+Відтворення знеособленого трафіку (TRAFFIC_CAPTURE_PATH) через create_bot_and_dispatcher()
+проти фейкового Bot API: затримка обробки оновлень та пропускна здатність
+
+Запуск:
+  python -m benchmarks.bench_replay capture.jsonl --speed 1 --out before.json
+  python -m benchmarks.bench_replay capture.jsonl --speed max --compare before.json
+
+--speed: 1 — реальні інтервали, N — у N разів швидше, max — без пауз.
+Оновлення одного користувача обробляються послідовно (стан FSM відтворюється точно).
+ID запитів із запису зіставляються з питаннями, створеними під час відтворення:
+невідомий ID отримує найстаріше ще не зіставлене питання без відповіді.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+_ID_IN_CALLBACK = re.compile(r"^(admin_reply|admin_reply_all|rate):([0-9A-F]{8})")
+_ID_IN_COMMAND = re.compile(r"^(/reply|/spam|/ham)(\s+)([0-9A-F]{8})")
+
+
+def prepare_environment(records: list, rate_limit: bool):
+    """Оточення до імпорту бота: псевдоніми адмінів, без запису трафіку та .env"""
+    admins = {
+        str(r["update"].get("message", r["update"].get("callback_query", {})).get("from", {}).get("id"))
+        for r in records if r.get("admin")
+    }
+    os.environ.update({
+        "ENV_FILE": os.path.join(tempfile.mkdtemp(), "replay.env"),
+        "BOT_TOKEN": "123456:REPLAY",
+        "USE_WEBHOOK": "false",
+        "ADMIN_IDS": ",".join(sorted(admins - {"None"})),
+        "TRAFFIC_CAPTURE_PATH": "",
+        "TRACE_ENABLED": "false",
+    })
+    if not rate_limit:
+        os.environ["RATE_LIMIT_SECONDS"] = "0"
+    # main налаштовує логування лише якщо воно ще не налаштоване
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+
+
+def create_fake_session(api_latency: float):
+    from aiogram.client.session.base import BaseSession
+    from aiogram.types import Chat, Message, User, WebhookInfo
+
+    class FakeSession(BaseSession):
+        """Фейковий Bot API: фіксована затримка і правдоподібні відповіді"""
+
+        def __init__(self):
+            super().__init__()
+            self.calls = Counter()
+            self._message_ids = itertools.count(1)
+
+        async def make_request(self, bot, method, timeout=None):
+            self.calls[type(method).__name__] += 1
+            await asyncio.sleep(api_latency)
+            returning = method.__returning__
+            if returning is bool:
+                return True
+            if returning is WebhookInfo:
+                return WebhookInfo(url="", has_custom_certificate=False, pending_update_count=0)
+            if returning is User:
+                return User(id=123456, is_bot=True, first_name="replay")
+            chat_id = getattr(method, "chat_id", None)
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+                text=getattr(method, "text", None),
+            )
+
+        async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+            yield b""
+
+        async def close(self):
+            pass
+
+    return FakeSession()
+
+
+class RequestIdMap:
+    """Відповідність ID запитів із запису та ID, створених під час відтворення"""
+
+    def __init__(self, database):
+        self.db = database
+        self.mapping = {}
+
+    async def resolve(self, original: str) -> str:
+        if original in self.mapping:
+            return self.mapping[original]
+        taken = set(self.mapping.values())
+        for question in await self.db.get_pending_questions():
+            if question["request_id"] not in taken:
+                self.mapping[original] = question["request_id"]
+                return question["request_id"]
+        return original
+
+    async def rewrite(self, update: dict) -> dict:
+        callback = update.get("callback_query")
+        if callback and callback.get("data"):
+            match = _ID_IN_CALLBACK.match(callback["data"])
+            if match:
+                new_id = await self.resolve(match.group(2))
+                callback["data"] = callback["data"].replace(match.group(2), new_id, 1)
+        message = update.get("message")
+        if message and message.get("text"):
+            match = _ID_IN_COMMAND.match(message["text"])
+            if match:
+                new_id = await self.resolve(match.group(3))
+                message["text"] = message["text"].replace(match.group(3), new_id, 1)
+        return update
+
+
+def update_kind(update: dict) -> str:
+    if "callback_query" in update:
+        return "callback:" + (update["callback_query"].get("data") or "").split(":", 1)[0]
+    text = update["message"].get("text") or ""
+    return text.split(maxsplit=1)[0] if text.startswith("/") else "text"
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def replay(records: list, speed: float, api_latency: float, concurrency: int) -> dict:
+    import main
+    from aiogram.types import Update
+    from services.database import db
+
+    db.db_path = os.path.join(tempfile.mkdtemp(), "replay.db")
+    session = create_fake_session(api_latency)
+    bot, dp = main.create_bot_and_dispatcher(session=session)
+    await dp.emit_startup(bot=bot, bots=[bot])
+
+    ids = RequestIdMap(db)
+    user_locks = defaultdict(asyncio.Lock)
+    limit = asyncio.Semaphore(concurrency)
+    latencies = defaultdict(list)
+    errors = Counter()
+
+    async def handle(record: dict):
+        update = record["update"]
+        sender = (update.get("message") or update.get("callback_query") or {}).get("from", {}).get("id")
+        async with user_locks[sender], limit:
+            await ids.rewrite(update)
+            kind = update_kind(update)
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, Update.model_validate(update))
+            except Exception as e:
+                errors[f"{kind}: {type(e).__name__}"] += 1
+            latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    tasks = []
+    started = time.perf_counter()
+    offset = 0.0
+    for record in records:
+        offset += record["dt"]
+        if speed:
+            delay = offset / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(handle(record)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+
+    await dp.emit_shutdown(bot=bot, bots=[bot])
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "updates": len(records),
+        "wall_s": round(wall, 3),
+        "throughput": round(len(records) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(everything, 0.5), 2),
+        "p90_ms": round(percentile(everything, 0.9), 2),
+        "p99_ms": round(percentile(everything, 0.99), 2),
+        "max_ms": round(max(everything, default=0.0), 2),
+        "errors": sum(errors.values()),
+        "error_kinds": dict(errors),
+        "api_calls": sum(session.calls.values()),
+        "by_kind": {
+            kind: {
+                "count": len(values),
+                "p50_ms": round(statistics.median(values), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+            }
+            for kind, values in sorted(latencies.items())
+        },
+    }
+
+
+def print_result(result: dict):
+    print(f"Оновлень: {result['updates']} за {result['wall_s']} с "
+          f"({result['throughput']} оновл./с), викликів API: {result['api_calls']}, "
+          f"помилок: {result['errors']}")
+    print(f"Затримка: p50={result['p50_ms']} мс p90={result['p90_ms']} мс "
+          f"p99={result['p99_ms']} мс max={result['max_ms']} мс")
+    for kind, stats in result["by_kind"].items():
+        print(f"  {kind:<32} n={stats['count']:<6} p50={stats['p50_ms']} мс p99={stats['p99_ms']} мс")
+
+
+def print_comparison(before: dict, after: dict):
+    print(f"\n{'метрика':<12} {'було':>10} {'стало':>10} {'зміна':>9}")
+    for key in ("throughput", "p50_ms", "p90_ms", "p99_ms", "max_ms", "errors", "api_calls"):
+        old, new = before.get(key, 0), after.get(key, 0)
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "—"
+        print(f"{key:<12} {old:>10} {new:>10} {change:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="файл запису (JSONL)")
+    parser.add_argument("--speed", default="1", help="1, N або max")
+    parser.add_argument("--api-latency-ms", type=float, default=30, help="затримка фейкового Bot API")
+    parser.add_argument("--concurrency", type=int, default=256, help="одночасних оновлень в обробці")
+    parser.add_argument("--no-rate-limit", action="store_true", help="вимкнути RATE_LIMIT_SECONDS")
+    parser.add_argument("--out", help="зберегти результат у JSON")
+    parser.add_argument("--compare", help="результат попередньої збірки (JSON) для порівняння")
+    args = parser.parse_args()
+
+    # Без імпорту модулів бота: config читає оточення під час імпорту
+    with open(args.capture, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    prepare_environment(records, rate_limit=not args.no_rate_limit)
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+
+    result = asyncio.run(replay(records, speed, args.api_latency_ms / 1000, args.concurrency))
+    print_result(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
@@ -0,0 +1,78 @@
+"""
+Бенчмарк повнотекстового пошуку (FTS5)
+
+Запуск: python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from services.database import SQLiteDatabase, build_fts_query
+
+WORDS = (
+    "питання відповідь навчання сесія екзамен викладач стипендія гуртожиток "
+    "розклад практика диплом бібліотека деканат кафедра лекція семінар "
+    "оцінка залік курсова лабораторна аудиторія студент група староста"
+).split()
+
+QUERIES = ["стипендія", "екзамен розклад", "гурт", "диплом практика кафедра", "лекц"]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def fill(conn: sqlite3.Connection, rows: int, batch: int = 10_000) -> float:
+    """Вставка рядків через тригери (індекс оновлюється на кожен запис)"""
+    rng = random.Random(42)
+    started = time.perf_counter()
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO questions (request_id, user_id, question, answer, status) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"{i:08X}", -1, random_text(rng, 20), random_text(rng, 30), "delivered")
+                for i in range(start, min(start + batch, rows))
+            ),
+        )
+        conn.commit()
+    return time.perf_counter() - started
+
+
+async def main(rows: int, repeats: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+    database = SQLiteDatabase(path)
+    await database.init()
+
+    insert_time = fill(database._conn, rows)
+    print(f"Вставка {rows} рядків з індексуванням: {insert_time:.1f} с")
+
+    started = time.perf_counter()
+    await database.rebuild_search_index()
+    print(f"Повна перебудова індексу: {time.perf_counter() - started:.1f} с")
+
+    for terms in QUERIES:
+        timings = []
+        for page in range(repeats):
+            started = time.perf_counter()
+            total, _ = await database.search_questions(terms, limit=5, offset=(page % 3) * 5)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"{build_fts_query(terms):<40} збігів={total:<8} "
+            f"p50={timings[len(timings) // 2] * 1000:.1f} мс max={timings[-1] * 1000:.1f} мс"
+        )
+
+    await database.close()
+    print(f"Розмір файлу БД: {os.path.getsize(path) / 1024 / 1024:.0f} МБ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeats))
@@ -0,0 +1,67 @@
+"""
+Бенчмарк холодного старту: імпорт модулів та ініціалізація сховища
+
+Запуск: python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str, runs: int) -> list:
+    """Час `import module` у свіжому інтерпретаторі (як при холодному старті)"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+async def measure_storage(backend: str, rows: int) -> float:
+    """init() сховища (memory — завантаження знімка) та перебудова індексу схожих питань"""
+    from services.database import create_database
+    from services.similarity import SimilarityIndex
+
+    database = create_database(backend, os.path.join(tempfile.mkdtemp(), "bench_startup.db"))
+    await database.init()
+    for i in range(rows):
+        await database.create_question(i, f"Тестове питання номер {i} про розклад та стипендію")
+    await database.close()
+
+    started = time.perf_counter()
+    await database.init()
+    SimilarityIndex().rebuild(await database.get_pending_questions(all_bots=True))
+    elapsed = time.perf_counter() - started
+    await database.close()
+    return elapsed
+
+
+def report(name: str, timings: list):
+    print(f"{name:<40} median={statistics.median(timings) * 1000:.0f} мс "
+          f"min={min(timings) * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pending", type=int, default=1000, help="питань у черзі для init")
+    args = parser.parse_args()
+
+    report("import aiogram", measure_import("aiogram", args.runs))
+    report("import main", measure_import("main", args.runs))
+    report("import aiohttp.web (лише вебхук)", measure_import("aiohttp.web", args.runs))
+    for backend in ("sqlite", "memory"):
+        report(
+            f"init сховища {backend} ({args.pending} pending)",
+            [asyncio.run(measure_storage(backend, args.pending))]
+        )
@@ -0,0 +1,105 @@
+"""
+Бекенди сховища: SQLite проти пам'яті з журналом операцій (services/memory_store.py)
+
+Для кожного бекенду — той самий сценарій: питання від users користувачів паралельно
+(перевірка ліміту + створення), відповіді, доставка через outbox, оцінки та /stats;
+потім перезапуск (memory — знімок і повтор журналу). Наприкінці підсумки бекендів
+звіряються між собою; повний контракт сховища — у tests/ (python -m pytest tests).
+
+Запуск: python -m benchmarks.bench_storage --questions 5000 --users 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+
+async def timed_ops(samples: dict, name: str, coro):
+    started = time.perf_counter()
+    result = await coro
+    samples.setdefault(name, []).append(time.perf_counter() - started)
+    return result
+
+
+async def scenario(backend: str, questions: int, users: int) -> dict:
+    from benchmarks.bench_replay import percentile
+    from services.database import create_database
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_storage.db")
+    db = create_database(backend, path)
+    await db.init()
+    samples: dict = {}
+
+    async def user(index: int):
+        request_ids = []
+        for i in range(index, questions, users):
+            await timed_ops(samples, "check_rate_limit", db.check_rate_limit(i, 0))
+            request_ids.append(await timed_ops(
+                samples, "create_question", db.create_question(i, f"Питання {i} про розклад сесії")
+            ))
+        for request_id in request_ids[::2]:
+            await timed_ops(samples, "get_question", db.get_question(request_id))
+            await timed_ops(samples, "save_answer", db.save_answer(request_id, "Відповідь"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(users)))
+    while True:
+        batch = await timed_ops(samples, "fetch_outbox_due", db.fetch_outbox_due(50))
+        if not batch:
+            break
+        ids = [item["id"] for item in batch]
+        await timed_ops(samples, "complete_outbox", db.complete_outbox(ids, [item["request_id"] for item in batch], ids))
+        for item in batch[::3]:
+            await timed_ops(samples, "save_rating", db.save_rating(item["request_id"], 1))
+    for _ in range(20):
+        stats = await timed_ops(samples, "get_stats", db.get_stats())
+    elapsed = time.perf_counter() - started
+    await db.close()
+
+    restarted = time.perf_counter()
+    db = create_database(backend, path)
+    await db.init()
+    restart = time.perf_counter() - restarted
+    counts = await db.count_questions()
+    await db.close()
+
+    files = [os.path.join(os.path.dirname(path), name) for name in os.listdir(os.path.dirname(path))]
+    return {
+        "elapsed": elapsed,
+        "restart": restart,
+        "disk": sum(os.path.getsize(name) for name in files),
+        "ops": {name: (percentile(values, 0.5), percentile(values, 0.99), len(values)) for name, values in samples.items()},
+        "check": (counts["total"], counts["answered"], counts["pending"], stats["useful"]),
+    }
+
+
+async def run(questions: int, users: int):
+    results = {backend: await scenario(backend, questions, users) for backend in ("sqlite", "memory")}
+    sqlite, memory = results["sqlite"], results["memory"]
+
+    print(f"{'мкс, p50 / p99':<20}{'sqlite':>20}{'memory':>20}")
+    for name in sqlite["ops"]:
+        (s50, s99, _), (m50, m99, _) = sqlite["ops"][name], memory["ops"][name]
+        print(f"{name:<20}{s50 * 1e6:>10.0f} / {s99 * 1e6:<7.0f}{m50 * 1e6:>10.0f} / {m99 * 1e6:<7.0f}")
+    print(f"{'сценарій, с':<20}{sqlite['elapsed']:>20.2f}{memory['elapsed']:>20.2f}")
+    print(f"{'перезапуск, мс':<20}{sqlite['restart'] * 1000:>20.0f}{memory['restart'] * 1000:>20.0f}")
+    print(f"{'на диску, КБ':<20}{sqlite['disk'] / 1024:>20.0f}{memory['disk'] / 1024:>20.0f}")
+    same = "збігаються" if sqlite["check"] == memory["check"] else f"РІЗНІ: {sqlite['check']} / {memory['check']}"
+    print(f"Підсумки бекендів (питань, з відповіддю, очікують, оцінки): {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "BOT_TOKEN": "123456:BENCH",
+        "TRACE_ENABLED": "false",
+        "ENV_FILE": os.path.join(tempfile.mkdtemp(), "bench.env"),
+    })
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    asyncio.run(run(args.questions, args.users))
@@ -0,0 +1,97 @@
+"""
+Вартість відхилення небажаних запитів вебхука (services/webhook.py) проти повної обробки
+
+Для кожного сценарію — час handle() на запит: підроблений секрет, завелике тіло,
+повтор update_id, непотрібний тип оновлення; для порівняння — той самий непотрібний
+тип через звичайний SimpleRequestHandler (розбір Update і диспетчер) та валідне /start.
+
+Запуск: python -m benchmarks.bench_webhook --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_replay import create_fake_session, percentile
+
+
+class Payload:
+    """Мінімальний StreamReader для make_mocked_request"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def readany(self) -> bytes:
+        body, self.body = self.body, b""
+        return body
+
+
+def update(update_id: int, kind: str = "message", text: str = "/start") -> bytes:
+    return json.dumps({"update_id": update_id, kind: {
+        "message_id": 1, "date": 0, "text": text,
+        "chat": {"id": update_id, "type": "private"},
+        "from": {"id": update_id, "is_bot": False, "first_name": "user"},
+    }}, separators=(",", ":")).encode()
+
+
+async def run(requests: int):
+    from aiohttp.test_utils import make_mocked_request
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+    import main
+    from services.database import db
+    from services.webhook import SECRET_HEADER, GuardedRequestHandler, webhook_secret
+
+    db.db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    bot, dp = main.create_bot_and_dispatcher(session=create_fake_session(0))
+    await db.init()
+    secret = webhook_secret(bot)
+    guarded = GuardedRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False)
+    plain = SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False)
+
+    def request(body: bytes, token: str = secret):
+        headers = {SECRET_HEADER: token, "Content-Length": str(len(body)), "Content-Type": "application/json"}
+        return make_mocked_request("POST", "/webhook", headers=headers, payload=Payload(body))
+
+    big = update(1, text="x" * (256 * 1024))
+    ids = iter(range(10, 10 ** 9))
+    scenarios = {
+        "підроблений секрет": lambda: (guarded, request(update(next(ids)), token="forged")),
+        "завелике тіло": lambda: (guarded, request(big)),
+        "повтор update_id": lambda: (guarded, request(update(1))),
+        "тип edited_message": lambda: (guarded, request(update(next(ids), "edited_message"))),
+        "edited_message без фільтра": lambda: (plain, request(update(next(ids), "edited_message"))),
+        "валідне /start": lambda: (guarded, request(update(next(ids)))),
+    }
+    await guarded.handle(request(update(1)))
+
+    for name, make in scenarios.items():
+        latencies, statuses = [], set()
+        for _ in range(requests):
+            handler, req = make()
+            started = time.perf_counter()
+            response = await handler.handle(req)
+            latencies.append((time.perf_counter() - started) * 1_000_000)
+            statuses.add(response.status)
+        print(f"{name:<28} p50={percentile(latencies, 0.5):>8.1f} мкс "
+              f"p99={percentile(latencies, 0.99):>8.1f} мкс  HTTP {sorted(statuses)}")
+    print(f"Лічильники: {guarded.guard.stats()}")
+    await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="запитів на сценарій")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "BOT_TOKEN": "123456:BENCH",
+        "TRACE_ENABLED": "false",
+        "TRAFFIC_CAPTURE_PATH": "",
+        "RATE_LIMIT_SECONDS": "0",
+        "ENV_FILE": os.path.join(tempfile.mkdtemp(), "bench.env"),
+    })
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    asyncio.run(run(args.requests))
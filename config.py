@@ -1,12 +1,26 @@
 """
 Конфігурація бота
 """
+import json
+import logging
 import os
-from dataclasses import dataclass, field
-from typing import List
-from dotenv import load_dotenv
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Pattern, Tuple
+from dotenv import load_dotenv, dotenv_values
 
-load_dotenv()
+# Файл налаштувань, що перечитується на льоту (SIGHUP або зміна файлу)
+ENV_FILE = os.getenv("ENV_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+# Оточення процесу до load_dotenv: має пріоритет над файлом, а значення, видалені з файлу,
+# не лишаються при перезавантаженні через копії в os.environ
+_PROCESS_ENV = dict(os.environ)
+
+load_dotenv(ENV_FILE)
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -14,10 +28,12 @@ class Settings:
     # Telegram
     BOT_TOKEN: str = os.getenv("BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
 
-    # Адміни (через кому)
-    ADMIN_IDS: List[int] = field(default_factory=lambda: [
-        int(x.strip()) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()
-    ])
+    # Адміни (ADMIN_IDS, через кому), спам-слова (SPAM_WORDS) та канал (ANSWERS_CHANNEL_ID) —
+    # див. RuntimeConfig нижче: вони перезавантажуються без рестарту
+
+    # Кілька ботів в одному процесі: JSON-файл зі списком
+    # [{"token", "admin_ids", "spam_words", "channel"}]; порожній — один бот з BOT_TOKEN
+    BOTS_FILE: str = os.getenv("BOTS_FILE", "")
 
     # Вебхук
     USE_WEBHOOK: bool = os.getenv("USE_WEBHOOK", "false").lower() == "true"
@@ -25,22 +41,83 @@ class Settings:
     WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
     WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
     WEBHOOK_PORT: int = int(os.getenv("PORT", os.getenv("WEBHOOK_PORT", "8080")))
+    # SO_REUSEPORT: новий процес слухає порт ще до завершення старого
+    WEBHOOK_REUSE_PORT: bool = os.getenv("WEBHOOK_REUSE_PORT", "false").lower() == "true"
+
+    # Дедлайн плавної зупинки (сек): дочекатися обробників і черг
+    SHUTDOWN_TIMEOUT: float = float(os.getenv("SHUTDOWN_TIMEOUT", "25"))
 
     # База даних
     DB_PATH: str = os.getenv("DB_PATH", "bot_data.db")
+    # sqlite або memory (стан у пам'яті, журнал операцій DB_PATH.log і знімок DB_PATH.snapshot)
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "sqlite").lower()
+    # memory: інтервал пакетного запису журналу з fsync (мс); зміни питань і outbox чекають fsync одразу
+    STORE_FLUSH_MS: int = int(os.getenv("STORE_FLUSH_MS", "50"))
+    # memory: знімок стану і стиснення журналу — періодично (сек) або коли журнал більший за ліміт
+    STORE_SNAPSHOT_INTERVAL: int = int(os.getenv("STORE_SNAPSHOT_INTERVAL", "600"))
+    STORE_LOG_MAX_MB: int = int(os.getenv("STORE_LOG_MAX_MB", "16"))
+    # memory: журнал блокується одним процесом; новий процес (WEBHOOK_REUSE_PORT) чекає
+    # на закриття сховища старим не довше за цей час (сек), інакше не стартує
+    STORE_LOCK_TIMEOUT: float = float(os.getenv("STORE_LOCK_TIMEOUT", "60"))
 
     # Ліміти
     RATE_LIMIT_SECONDS: int = int(os.getenv("RATE_LIMIT_SECONDS", "30"))
     MAX_QUESTION_LENGTH: int = int(os.getenv("MAX_QUESTION_LENGTH", "1000"))
 
-    # Спам-фільтр
-    SPAM_WORDS: List[str] = field(default_factory=lambda: [
-        word.strip().lower() for word in
-        os.getenv("SPAM_WORDS", "").split(",") if word.strip()
-    ])
+    # Спам-перевірка поза event loop: thread або process, ліміт часу та політика при таймауті
+    SPAM_EXECUTOR: str = os.getenv("SPAM_EXECUTOR", "thread")
+    SPAM_WORKERS: int = int(os.getenv("SPAM_WORKERS", "2"))
+    SPAM_TIME_BUDGET_MS: int = int(os.getenv("SPAM_TIME_BUDGET_MS", "500"))
+    SPAM_FAIL_OPEN: bool = os.getenv("SPAM_FAIL_OPEN", "true").lower() == "true"
 
-    # Публікація відповідей у канал
-    ANSWERS_CHANNEL_ID: str = os.getenv("ANSWERS_CHANNEL_ID", "")
+    # Рейди: однаковий текст від RAID_THRESHOLD різних акаунтів за RAID_WINDOW сек
+    RAID_THRESHOLD: int = int(os.getenv("RAID_THRESHOLD", "20"))
+    RAID_WINDOW: int = int(os.getenv("RAID_WINDOW", "600"))
+
+    # Сповіщення адмінів: понад NOTIFY_BURST_THRESHOLD питань за вікно — дайджести
+    NOTIFY_BURST_THRESHOLD: int = int(os.getenv("NOTIFY_BURST_THRESHOLD", "10"))
+    NOTIFY_DIGEST_WINDOW: int = int(os.getenv("NOTIFY_DIGEST_WINDOW", "60"))
+
+    # Період перевірки змін ENV_FILE (сек)
+    CONFIG_RELOAD_INTERVAL: float = float(os.getenv("CONFIG_RELOAD_INTERVAL", "5"))
+
+    # Трасування оновлень: файл .jsonl або URL OTLP/HTTP колектора;
+    # зберігаються трейси довші за TRACE_SLOW_MS, з помилками та частка TRACE_SAMPLE_RATE решти
+    TRACE_ENABLED: bool = os.getenv("TRACE_ENABLED", "false").lower() == "true"
+    TRACE_EXPORT: str = os.getenv("TRACE_EXPORT", "traces.jsonl")
+    TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", "1000"))
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+    # Запис знеособленого трафіку для відтворення (порожній шлях — вимкнено);
+    # сіль робить псевдоніми користувачів стабільними між перезапусками
+    TRAFFIC_CAPTURE_PATH: str = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+    TRAFFIC_CAPTURE_SALT: str = os.getenv("TRAFFIC_CAPTURE_SALT", "")
+
+    # JSON для оновлень і Bot API: auto (orjson, якщо встановлено), orjson або json
+    JSON_BACKEND: str = os.getenv("JSON_BACKEND", "auto").lower()
+
+    # Секрет вебхука (заголовок X-Telegram-Bot-Api-Secret-Token); порожній — похідний від токена бота
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    # Більші тіла відхиляються до розбору (оновлення Telegram — кілька КБ)
+    WEBHOOK_MAX_BODY: int = int(os.getenv("WEBHOOK_MAX_BODY", str(128 * 1024)))
+    # Скільки останніх update_id кожного бота пам'ятати для відсіювання повторів
+    WEBHOOK_DEDUP_WINDOW: int = int(os.getenv("WEBHOOK_DEDUP_WINDOW", "2048"))
+
+    # Токен для HTTP /debug (заголовок X-Debug-Token); порожній — маршрут вимкнено
+    DEBUG_TOKEN: str = os.getenv("DEBUG_TOKEN", "")
+
+    # Онлайн-бекапи БД (BACKUP_INTERVAL у секундах, 0 — вимкнено);
+    # копіювання кроками по BACKUP_STEP_PAGES сторінок з паузою між ними
+    BACKUP_DIR: str = os.getenv("BACKUP_DIR", "backups")
+    BACKUP_INTERVAL: int = int(os.getenv("BACKUP_INTERVAL", "3600"))
+    BACKUP_KEEP: int = int(os.getenv("BACKUP_KEEP", "24"))
+    BACKUP_STEP_PAGES: int = int(os.getenv("BACKUP_STEP_PAGES", "64"))
+    BACKUP_STEP_SLEEP_MS: int = int(os.getenv("BACKUP_STEP_SLEEP_MS", "10"))
+
+    # Доставка з outbox: одночасних надсилань і повідомлень за секунду на бота
+    # (ліміт Telegram для розсилок — близько 30/с)
+    DELIVERY_CONCURRENCY: int = int(os.getenv("DELIVERY_CONCURRENCY", "8"))
+    DELIVERY_RATE: float = float(os.getenv("DELIVERY_RATE", "25"))
 
     # Авто-видалення даних (секунди) після доставки відповіді
     DATA_TTL_SECONDS: int = int(os.getenv("DATA_TTL_SECONDS", "300"))
@@ -48,6 +125,137 @@ class Settings:
 
 settings = Settings()
 
+# Типи оновлень, які бот обробляє (allowed_updates і фільтр вебхука)
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+# ---- Налаштування, що перезавантажуються без рестарту ----
+
+# Базовий список заборонених слів (доповнюється через .env SPAM_WORDS)
+DEFAULT_BAD_WORDS = (
+    "спам", "реклама", "казино", "ставки", "крипта",
+)
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """Незмінний знімок налаштувань; замінюється цілком при перезавантаженні"""
+    ADMIN_IDS: FrozenSet[int]
+    SPAM_WORDS: Tuple[str, ...]
+    # Один скомпільований патерн замість перебору слів
+    SPAM_PATTERN: Optional[Pattern[str]]
+    # Публікація відповідей у канал
+    ANSWERS_CHANNEL_ID: str = ""
+    # Розділ даних у БД: 0 — єдиний бот, інакше ID бота з BOTS_FILE
+    BOT_ID: int = 0
+
+
+def _parse_admin_ids(raw: str) -> FrozenSet[int]:
+    return frozenset(int(x.strip()) for x in raw.split(",") if x.strip())
+
+
+def _parse_spam_words(raw: str) -> Tuple[str, ...]:
+    return tuple(word.strip().lower() for word in raw.split(",") if word.strip())
+
+
+def build_runtime_config(
+    admin_ids: str, spam_words: str, channel: str = "", bot_id: int = 0
+) -> RuntimeConfig:
+    words = _parse_spam_words(spam_words)
+    all_words = tuple(dict.fromkeys(DEFAULT_BAD_WORDS + words))
+    pattern = re.compile("|".join(map(re.escape, all_words))) if all_words else None
+    return RuntimeConfig(
+        ADMIN_IDS=_parse_admin_ids(admin_ids),
+        SPAM_WORDS=words,
+        SPAM_PATTERN=pattern,
+        ANSWERS_CHANNEL_ID=channel,
+        BOT_ID=bot_id,
+    )
+
+
+def _join(value) -> str:
+    return ",".join(map(str, value)) if isinstance(value, list) else str(value or "")
+
+
+def load_bots_file(path: str) -> Dict[str, RuntimeConfig]:
+    """Токен -> знімок налаштувань бота (ID бота — числова частина токена)"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {
+        entry["token"]: build_runtime_config(
+            _join(entry.get("admin_ids")),
+            _join(entry.get("spam_words")),
+            str(entry.get("channel") or ""),
+            bot_id=int(entry["token"].split(":", 1)[0]),
+        )
+        for entry in entries
+    }
+
+
+_runtime_config = build_runtime_config(
+    os.getenv("ADMIN_IDS", ""), os.getenv("SPAM_WORDS", ""), os.getenv("ANSWERS_CHANNEL_ID", "")
+)
+_bot_configs: Dict[int, RuntimeConfig] = {}
+BOT_TOKENS: List[str] = [settings.BOT_TOKEN]
+if settings.BOTS_FILE:
+    _loaded = load_bots_file(settings.BOTS_FILE)
+    _bot_configs = {config.BOT_ID: config for config in _loaded.values()}
+    BOT_TOKENS = list(_loaded)
+
+# Знімок бота, чиє оновлення зараз обробляється (режим кількох ботів)
+_active_config: ContextVar[Optional[RuntimeConfig]] = ContextVar("active_config", default=None)
+
+
+def current_config() -> RuntimeConfig:
+    """Поточний знімок (читання без блокувань — заміна посилання атомарна)"""
+    return _active_config.get() or _runtime_config
+
+
+def bot_partition(bot_id: int) -> int:
+    """Розділ даних бота: 0 в режимі одного бота"""
+    return bot_id if bot_id in _bot_configs else 0
+
+
+@contextmanager
+def bot_context(bot_id: int):
+    """Налаштування конкретного бота для коду всередині блоку (і задач, створених у ньому)"""
+    token = _active_config.set(_bot_configs.get(bot_id))
+    try:
+        yield
+    finally:
+        _active_config.reset(token)
+
+
+def reload_runtime_config() -> RuntimeConfig:
+    """Перечитати ENV_FILE (і BOTS_FILE) та атомарно підмінити знімки"""
+    global _runtime_config, _bot_configs
+    values = dotenv_values(ENV_FILE) if os.path.exists(ENV_FILE) else {}
+
+    def read(key: str) -> str:
+        # Пріоритет як у load_dotenv при старті: оточення процесу, потім файл
+        if key in _PROCESS_ENV:
+            return _PROCESS_ENV[key]
+        return values.get(key) or ""
+
+    new_config = build_runtime_config(read("ADMIN_IDS"), read("SPAM_WORDS"), read("ANSWERS_CHANNEL_ID"))
+    if settings.BOTS_FILE:
+        # Нові токени потребують рестарту — оновлюються лише налаштування відомих ботів.
+        # Бот, прибраний з файлу, обслуговується до рестарту — з попередніми налаштуваннями,
+        # інакше його оновлення пішли б у розділ 0 з адмінами з .env
+        loaded = load_bots_file(settings.BOTS_FILE)
+        updated = {
+            config.BOT_ID: config for token, config in loaded.items() if token in BOT_TOKENS
+        }
+        for bot_id in _bot_configs.keys() - updated.keys():
+            logger.warning(f"Бота {bot_id} немає в {settings.BOTS_FILE}: налаштування без змін до рестарту")
+        _bot_configs = {**_bot_configs, **updated}
+    _runtime_config = new_config
+    logger.info(
+        f"Конфігурацію перезавантажено: адмінів {len(new_config.ADMIN_IDS)}, "
+        f"спам-слів {len(new_config.SPAM_WORDS)}, ботів {len(BOT_TOKENS)}"
+    )
+    return new_config
+
 # Тексти інтерфейсу
 TEXTS = {
     "welcome": (
@@ -67,7 +275,7 @@ TEXTS = {
         "2️⃣ Адмін бачить лише текст питання та анонімний ID\n"
         "3️⃣ Після відповіді — технічний ID автоматично видаляється\n\n"
         "⏱ <b>Обмеження:</b>\n"
-        f"• Одне питання раз на {Settings().RATE_LIMIT_SECONDS} секунд\n"
+        f"• Одне питання раз на {settings.RATE_LIMIT_SECONDS} секунд\n"
         "• Максимальна довжина питання: 1000 символів\n\n"
         "💡 <i>Ми не можемо ідентифікувати вас жодним чином після видалення технічних даних.</i>"
     ),
@@ -97,18 +305,33 @@ TEXTS = {
     "question_too_long": "⚠️ Питання занадто довге. Максимум 1000 символів.",
     "spam_detected": "🚫 Повідомлення містить недозволений контент.",
     "no_active_question": "❓ Немає активного питання для відповіді.",
+    "callback_invalid": "⚠️ Кнопка застаріла або пошкоджена.",
     "admin_new_question": (
         "🆕 <b>Нове анонімне питання</b>\n"
         "🔢 ID: <code>{request_id}</code>\n\n"
         "❓ <b>Питання:</b>\n{question}\n\n"
         "↩️ Для відповіді натисніть кнопку нижче або використайте /reply {request_id}"
+        "{similar}"
+    ),
+    "admin_similar_questions": "\n\n👥 <b>+{count} схожих</b> питань очікують відповіді",
+    "admin_digest": "🗂 <b>Нові питання ({count})</b>\n\n{items}↩️ Оберіть питання для відповіді кнопками нижче",
+    "admin_digest_item": "🔢 <code>{request_id}</code>{similar}\n❓ {question}\n\n",
+    "admin_dashboard": (
+        "📌 <b>Панель питань</b>\n\n"
+        "⏳ Очікують відповіді: {pending}\n"
+        "⚡️ Режим сповіщень: {mode}\n"
+        "🕐 Оновлено: {updated}"
     ),
     "admin_stats": (
         "📊 <b>Статистика</b>\n\n"
         "📨 Всього питань: {total}\n"
         "✅ Відповіді надано: {answered}\n"
         "⏳ Очікують відповіді: {pending}\n"
+        "🕐 Останнє питання: {last_question}\n\n"
+        "<b>За {days} дн.</b>\n"
         "⌚ Сер. час відповіді: {avg_time}\n"
-        "🕐 Останнє питання: {last_question}"
+        "⏱ Час відповіді p50 / p90 / p99: {answer_percentiles}\n"
+        "📬 Доставка p50 / p90 / p99: {delivery_percentiles}\n"
+        "👍 Корисні відповіді: {useful}"
     ),
 }
@@ -1,15 +1,38 @@
 """
 Обробники для адміністраторів
 """
+import asyncio
+import html
 import logging
-from aiogram import Router, F, Bot
+import os
+import re
+import tempfile
+from datetime import datetime
+from functools import partial
+from typing import List
+from aiogram import Bot, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, CallbackQuery
-
-from config import settings, TEXTS
-from services.database import db
-from utils.keyboards import admin_menu_keyboard, back_to_menu_keyboard, rating_keyboard
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.types import Message, CallbackQuery, FSInputFile
+
+from config import current_config, TEXTS
+from services.database import db, SNIPPET_OPEN, SNIPPET_CLOSE
+from services.exporter import write_export, parse_date, EXPORT_FORMATS, EXPORT_STATUSES
+from services.introspection import collect_debug_info
+from services.notifier import notifier
+from services.outbox import delivery_worker
+from services.similarity import similarity_index
+from services.spam_service import spam_service
+from utils.keyboards import (
+    admin_menu_keyboard, back_to_menu_keyboard, search_pagination_keyboard,
+    pending_bulk_keyboard, bulk_confirm_keyboard
+)
+from utils.callbacks import (
+    CallbackRouter, AdminStatsCallback, AdminPendingCallback, AdminBackCallback,
+    AdminReplyCallback, AdminReplyAllCallback, AdminSearchCallback,
+    BulkAction, BulkSelectCallback, BulkConfirmCallback, BulkCancelCallback
+)
 from utils.states import AdminStates
 from utils.filters import IsAdmin
 
@@ -17,6 +40,9 @@ logger = logging.getLogger(__name__)
 router = Router()
 router.message.filter(IsAdmin())
 router.callback_query.filter(IsAdmin())
+callbacks = CallbackRouter(router)
+
+SEARCH_PAGE_SIZE = 5
 
 
 @router.message(Command("admin"))
@@ -29,17 +55,26 @@ async def cmd_admin(message: Message):
     )
 
 
-@router.callback_query(F.data == "admin_stats")
-async def show_stats(callback: CallbackQuery):
-    """Показати статистику"""
+async def render_stats() -> str:
+    """Текст статистики (кнопка і /stats)"""
     stats = await db.get_stats()
-    text = TEXTS["admin_stats"].format(
-        total=stats.get("total", 0),
-        answered=stats.get("answered", 0),
-        pending=stats.get("pending", 0),
-        avg_time=stats.get("avg_time", "—"),
-        last_question=stats.get("last_question", "—")
+    return TEXTS["admin_stats"].format(
+        total=stats.get("total") or 0,
+        answered=stats.get("answered") or 0,
+        pending=stats.get("pending") or 0,
+        last_question=stats.get("last_question") or "—",
+        days=stats["days"],
+        avg_time=stats["avg_time"],
+        answer_percentiles=stats["answer_percentiles"],
+        delivery_percentiles=stats["delivery_percentiles"],
+        useful=stats["useful"],
     )
+
+
+@callbacks(AdminStatsCallback)
+async def show_stats(callback: CallbackQuery):
+    """Показати статистику"""
+    text = await render_stats()
     await callback.message.edit_text(
         text,
         reply_markup=admin_menu_keyboard(),
@@ -48,7 +83,7 @@ async def show_stats(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_pending")
+@callbacks(AdminPendingCallback)
 async def show_pending(callback: CallbackQuery):
     """Показати питання без відповіді"""
     questions = await db.get_pending_questions()
@@ -66,21 +101,13 @@ async def show_pending(callback: CallbackQuery):
 
     if len(questions) > 10:
         text += f"<i>...та ще {len(questions) - 10} питань</i>"
+    text += "\n\n<i>Вибрані питання: /reject, /delete, /answerall ID… | all | search СЛОВА | similar ID</i>"
 
-    from utils.keyboards import InlineKeyboardMarkup, InlineKeyboardButton
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    builder = InlineKeyboardBuilder()
-    builder.row(
-        __import__('aiogram').types.InlineKeyboardButton(
-            text="🔙 Назад", callback_data="admin_back"
-        )
-    )
-
-    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=admin_menu_keyboard())
+    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=pending_bulk_keyboard())
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_back")
+@callbacks(AdminBackCallback)
 async def admin_back(callback: CallbackQuery):
     await callback.message.edit_text(
         "🔧 <b>Адмін панель</b>",
@@ -90,10 +117,10 @@ async def admin_back(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("admin_reply:"))
-async def start_reply(callback: CallbackQuery, state: FSMContext):
+@callbacks(AdminReplyCallback)
+async def start_reply(callback: CallbackQuery, state: FSMContext, callback_data: AdminReplyCallback):
     """Початок написання відповіді"""
-    request_id = callback.data.split(":")[1]
+    request_id = callback_data.request_id
 
     question_data = await db.get_question(request_id)
     if not question_data:
@@ -107,7 +134,9 @@ async def start_reply(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.writing_answer)
     await state.update_data(
         request_id=request_id,
-        question=question_data["question"]
+        request_ids=[request_id],
+        question=question_data["question"],
+        publish=True,
     )
 
     await callback.message.answer(
@@ -119,6 +148,37 @@ async def start_reply(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@callbacks(AdminReplyAllCallback)
+async def start_reply_all(
+    callback: CallbackQuery, state: FSMContext, callback_data: AdminReplyAllCallback
+):
+    """Одна відповідь для всіх схожих питань"""
+    request_id = callback_data.request_id
+
+    question_data = await db.get_question(request_id)
+    if not question_data or question_data["status"] != "pending":
+        await callback.answer("⚠️ Це питання вже має відповідь", show_alert=True)
+        return
+
+    request_ids = [request_id] + similarity_index.similar(request_id)
+
+    await state.set_state(AdminStates.writing_answer)
+    await state.update_data(
+        request_id=request_id,
+        request_ids=request_ids,
+        question=question_data["question"],
+        publish=True,
+    )
+
+    await callback.message.answer(
+        f"✍️ <b>Відповідь на {len(request_ids)} схожих питань (#{request_id}):</b>\n\n"
+        f"❓ {question_data['question']}\n\n"
+        f"Відповідь отримає кожен автор. Напишіть відповідь (або /cancel для скасування):",
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+
 @router.message(Command("reply"))
 async def cmd_reply(message: Message, state: FSMContext):
     """Відповідь через команду: /reply REQUEST_ID"""
@@ -141,7 +201,9 @@ async def cmd_reply(message: Message, state: FSMContext):
     await state.set_state(AdminStates.writing_answer)
     await state.update_data(
         request_id=request_id,
-        question=question_data["question"]
+        request_ids=[request_id],
+        question=question_data["question"],
+        publish=True,
     )
 
     await message.answer(
@@ -160,7 +222,7 @@ async def cancel_reply(message: Message, state: FSMContext):
 
 
 @router.message(AdminStates.writing_answer)
-async def receive_answer(message: Message, state: FSMContext, bot: Bot):
+async def receive_answer(message: Message, state: FSMContext):
     """Отримання та надсилання відповіді"""
     if not message.text:
         await message.answer("⚠️ Надішліть текстову відповідь.")
@@ -168,85 +230,332 @@ async def receive_answer(message: Message, state: FSMContext, bot: Bot):
 
     data = await state.get_data()
     request_id = data.get("request_id")
-    question = data.get("question", "")
 
     if not request_id:
         await message.answer("❌ Помилка стану. Спробуйте ще раз.")
         await state.clear()
         return
 
-    # Зберігаємо відповідь і отримуємо user_id
-    user_id = await db.save_answer(request_id, message.text)
+    # Відповідь і записи черги доставки зберігаються в одній транзакції
+    request_ids = data.get("request_ids") or [request_id]
+    recipients = await db.save_answers(
+        request_ids,
+        message.text,
+        # Масова шаблонна відповідь (/answerall) у канал не публікується
+        publish=data.get("publish", True) and bool(current_config().ANSWERS_CHANNEL_ID),
+        notify_chat_id=message.chat.id if len(request_ids) == 1 else None,
+    )
 
-    if not user_id:
+    if not recipients:
         await message.answer(f"❌ Не вдалося зберегти відповідь для #{request_id}")
         await state.clear()
         return
 
     await state.clear()
+    for recipient in recipients:
+        similarity_index.remove(recipient["request_id"])
 
-    # Надсилаємо відповідь користувачу
-    try:
-        await bot.send_message(
-            user_id,
-            TEXTS["answer_received"].format(
-                request_id=request_id,
-                question=question,
-                answer=message.text
-            ),
-            reply_markup=rating_keyboard(request_id),
+    # Доставку виконує фоновий воркер; user_id видаляється після підтвердженої доставки
+    delivery_worker.wake()
+
+    if len(recipients) > 1:
+        await message.answer(
+            f"✅ <b>Відповідь поставлено в чергу для {len(recipients)} користувачів</b>\n\n"
+            f"🔐 Дані користувачів буде видалено одразу після доставки.",
+            parse_mode="HTML"
+        )
+    else:
+        await message.answer(
+            f"✅ <b>Відповідь поставлено в чергу доставки!</b>\n\n"
+            f"🔢 ID запиту: <code>{request_id}</code>\n"
+            f"🔐 Дані користувача буде видалено одразу після доставки.",
             parse_mode="HTML"
         )
+    logger.info(f"Відповідь на #{request_id} збережено ({len(recipients)} запитів у черзі доставки)")
 
-        # Видаляємо user_id після доставки
-        await db.mark_delivered(request_id)
 
+# ---- Масові дії над питаннями без відповіді ----
+
+BULK_COMMANDS = {"reject": BulkAction.reject, "delete": BulkAction.delete, "answerall": BulkAction.answer}
+BULK_DONE = {BulkAction.reject: "🚫 Відхилено", BulkAction.delete: "🗑 Видалено"}
+BULK_PREVIEW = 5
+
+
+async def select_pending(selector: str) -> List[str]:
+    """Вибір питань без відповіді: all | search СЛОВА | similar ID | ID ID …"""
+    head, _, rest = selector.strip().partition(" ")
+    head = head.lower()
+    if head == "all":
+        return await db.filter_pending()
+    if head == "search":
+        return await db.search_pending(rest)
+    if head == "similar":
+        request_id = rest.strip().upper()
+        return await db.filter_pending([request_id] + similarity_index.similar(request_id))
+    return await db.filter_pending([token.upper() for token in re.findall(r"\b[0-9A-Fa-f]{8}\b", selector)])
+
+
+async def start_bulk(message: Message, state: FSMContext, action: BulkAction, request_ids: List[str]):
+    """Відповідь — через стан writing_answer; відхилення та видалення — після підтвердження"""
+    if not request_ids:
+        await message.answer("✅ Немає питань без відповіді за цим вибором.")
+        return
+
+    if action == BulkAction.answer:
+        await state.set_state(AdminStates.writing_answer)
+        await state.update_data(
+            request_id=request_ids[0],
+            request_ids=request_ids,
+            publish=False,
+        )
         await message.answer(
-            f"✅ <b>Відповідь надіслано!</b>\n\n"
-            f"🔢 ID запиту: <code>{request_id}</code>\n"
-            f"🔐 Дані користувача видалено з системи.",
+            f"✍️ <b>Одна відповідь для {len(request_ids)} питань</b>\n\n"
+            f"Відповідь отримає кожен автор. Напишіть відповідь (або /cancel для скасування):",
             parse_mode="HTML"
         )
-        logger.info(f"Відповідь на #{request_id} доставлена. user_id видалено.")
+        return
 
-    except Exception as e:
-        logger.error(f"Не вдалося доставити відповідь на #{request_id}: {e}")
+    await state.update_data(bulk_action=action.value, bulk_ids=request_ids)
+    questions = [await db.get_question(request_id) for request_id in request_ids[:BULK_PREVIEW]]
+    preview = "".join(
+        f"🔢 <code>{q['request_id']}</code> {html.escape(q['question'][:60])}\n" for q in questions if q
+    )
+    more = f"<i>...та ще {len(request_ids) - BULK_PREVIEW}</i>\n" if len(request_ids) > BULK_PREVIEW else ""
+    verb = "Відхилити (автори нічого не отримають)" if action == BulkAction.reject else "Видалити назавжди"
+    await message.answer(
+        f"⚠️ <b>{verb}: {len(request_ids)} питань?</b>\n\n{preview}{more}",
+        reply_markup=bulk_confirm_keyboard(action, len(request_ids)),
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command(*BULK_COMMANDS))
+async def cmd_bulk(message: Message, state: FSMContext):
+    """/reject, /delete, /answerall з вибором питань"""
+    parts = message.text.split(maxsplit=1)
+    command = parts[0].lstrip("/").split("@")[0]
+    if len(parts) < 2:
         await message.answer(
-            f"⚠️ Відповідь збережена, але не вдалося доставити користувачу.\n"
-            f"Можливо, він заблокував бот.\n"
-            f"ID: <code>{request_id}</code>",
+            f"Використання: <code>/{command} ID ID …</code>, <code>/{command} all</code>, "
+            f"<code>/{command} search слова</code> або <code>/{command} similar ID</code>",
             parse_mode="HTML"
         )
-        # Все одно видаляємо user_id
-        await db.mark_delivered(request_id)
-
-    # Публікація у канал (опціонально)
-    if settings.ANSWERS_CHANNEL_ID:
-        try:
-            await bot.send_message(
-                settings.ANSWERS_CHANNEL_ID,
-                f"❓ <b>Питання:</b>\n{question}\n\n"
-                f"💬 <b>Відповідь:</b>\n{message.text}",
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.warning(f"Не вдалося опублікувати у канал: {e}")
+        return
+    await start_bulk(message, state, BULK_COMMANDS[command], await select_pending(parts[1]))
+
+
+@callbacks(BulkSelectCallback)
+async def bulk_select(callback: CallbackQuery, state: FSMContext, callback_data: BulkSelectCallback):
+    """Кнопки списку очікуючих: дія над усіма питаннями без відповіді"""
+    await start_bulk(callback.message, state, callback_data.action, await db.filter_pending())
+    await callback.answer()
+
+
+@callbacks(BulkConfirmCallback)
+async def bulk_confirm(
+    callback: CallbackQuery, state: FSMContext, bot: Bot, callback_data: BulkConfirmCallback
+):
+    """Виконання підтвердженої дії однією транзакцією"""
+    data = await state.get_data()
+    request_ids = data.get("bulk_ids")
+    if not request_ids or data.get("bulk_action") != callback_data.action.value:
+        await callback.answer("⚠️ Вибір застарів, повторіть команду", show_alert=True)
+        return
+    await state.update_data(bulk_action=None, bulk_ids=None)
+
+    if callback_data.action == BulkAction.reject:
+        count = await db.reject_questions(request_ids)
+    else:
+        count = await db.delete_questions(request_ids)
+    for request_id in request_ids:
+        similarity_index.remove(request_id)
+
+    await callback.message.edit_text(f"{BULK_DONE[callback_data.action]}: {count} питань.")
+    await callback.answer()
+    await notifier.update_dashboards(bot)
+    logger.info(f"Масова дія {callback_data.action.value}: {count} питань")
+
+
+@callbacks(BulkCancelCallback)
+async def bulk_cancel(callback: CallbackQuery, state: FSMContext):
+    await state.update_data(bulk_action=None, bulk_ids=None)
+    await callback.message.edit_text("❌ Масову дію скасовано.")
+    await callback.answer()
 
 
 @router.message(Command("stats"))
 async def cmd_stats(message: Message):
     """Статистика через команду"""
-    stats = await db.get_stats()
-    text = TEXTS["admin_stats"].format(
-        total=stats.get("total", 0),
-        answered=stats.get("answered", 0),
-        pending=stats.get("pending", 0),
-        avg_time=stats.get("avg_time", "—"),
-        last_question=stats.get("last_question", "—")
-    )
+    text = await render_stats()
     await message.answer(text, parse_mode="HTML")
 
 
+async def render_search_page(terms: str, page: int):
+    """Текст та клавіатура однієї сторінки результатів пошуку"""
+    total, results = await db.search_questions(
+        terms, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE
+    )
+    if not total:
+        return f"🔍 За запитом «{html.escape(terms)}» нічого не знайдено.", None
+
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    text = f"🔍 <b>Знайдено {total}</b> (сторінка {page + 1}/{pages})\n\n"
+    for item in results:
+        snippet = html.escape(item["snippet"] or "")
+        snippet = snippet.replace(SNIPPET_OPEN, "<b>").replace(SNIPPET_CLOSE, "</b>")
+        text += (
+            f"🔢 <code>{item['request_id']}</code> · {item['status']}\n"
+            f"📝 {snippet}\n"
+            f"🕐 {item['created_at']}\n\n"
+        )
+
+    has_next = (page + 1) * SEARCH_PAGE_SIZE < total
+    return text, search_pagination_keyboard(page, has_next)
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, state: FSMContext):
+    """Пошук по питаннях та відповідях: /search ТЕРМІНИ"""
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2 or not parts[1].strip():
+        await message.answer("Використання: <code>/search слова для пошуку</code>", parse_mode="HTML")
+        return
+
+    terms = parts[1].strip()
+    # Запит зберігаємо у FSM — callback_data обмежена 64 байтами
+    await state.update_data(search_terms=terms)
+
+    text, keyboard = await render_search_page(terms, 0)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@callbacks(AdminSearchCallback)
+async def search_page(callback: CallbackQuery, state: FSMContext, callback_data: AdminSearchCallback):
+    """Перехід між сторінками результатів пошуку"""
+    data = await state.get_data()
+    terms = data.get("search_terms")
+    if not terms:
+        await callback.answer("⚠️ Пошук застарів, повторіть /search", show_alert=True)
+        return
+
+    text, keyboard = await render_search_page(terms, callback_data.page)
+    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
+
+
+@router.message(Command("spam", "ham"))
+async def cmd_label(message: Message):
+    """Позначити питання як спам (/spam ID) або нормальне (/ham ID) для класифікатора"""
+    parts = message.text.split(maxsplit=1)
+    command = parts[0].lstrip("/").split("@")[0]
+    if len(parts) < 2:
+        await message.answer(f"Використання: <code>/{command} REQUEST_ID</code>", parse_mode="HTML")
+        return
+
+    request_id = parts[1].strip().upper()
+    question_data = await db.get_question(request_id)
+    if not question_data:
+        await message.answer(f"❌ Питання #{request_id} не знайдено")
+        return
+
+    is_spam = command == "spam"
+    await db.add_spam_example(question_data["question"], is_spam)
+    spam_service.learn(question_data["question"], is_spam)
+    label = "спам" if is_spam else "не спам"
+    await message.answer(f"🏷 Питання #{request_id} позначено як «{label}»")
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message):
+    """Експорт історії: /export [csv|jsonl] [status=...] [from=YYYY-MM-DD] [to=YYYY-MM-DD]"""
+    fmt, filters = "csv", {}
+    try:
+        for arg in message.text.split()[1:]:
+            key, _, value = arg.partition("=")
+            if not value and key in EXPORT_FORMATS:
+                fmt = key
+            elif key == "status" and value in EXPORT_STATUSES:
+                filters["status"] = value
+            elif key in ("from", "to"):
+                filters["since" if key == "from" else "until"] = parse_date(value)
+            else:
+                raise ValueError(arg)
+    except ValueError:
+        await message.answer(
+            "Використання: <code>/export [csv|jsonl] [status=pending|answered|delivered] "
+            "[from=YYYY-MM-DD] [to=YYYY-MM-DD]</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    filename = f"questions_{datetime.now():%Y%m%d_%H%M}.{fmt}.gz"
+    fd, path = tempfile.mkstemp(suffix=".gz")
+    os.close(fd)
+    try:
+        # Запис файлу — у потоці, щоб не блокувати event loop
+        rows = db.export_rows(bot_id=current_config().BOT_ID, **filters)
+        count = await asyncio.get_running_loop().run_in_executor(None, partial(write_export, rows, path, fmt))
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📦 Експорт: {count} питань (без ID користувачів)"
+        )
+    except Exception as e:
+        logger.error(f"Помилка експорту: {e}")
+        await message.answer("❌ Не вдалося створити експорт")
+    finally:
+        os.remove(path)
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} МБ"
+
+
+@router.message(Command("debug"))
+async def cmd_debug(message: Message, fsm_storage: BaseStorage):
+    """Пам'ять, алокації, задачі, кеші та черги процесу"""
+    info = await collect_debug_info(fsm_storage)
+    caches, queues, storage = info["caches"], info["queues"], info["db"]
+    allocations = info["allocations"]
+
+    lines = [
+        f"🧠 RSS: {_mb(info['rss_bytes'])}",
+        f"⚙️ Задач asyncio: {info['tasks_total']}",
+    ]
+    lines += [f"  {item['count']} × {html.escape(item['coro'])}" for item in info["tasks"]]
+    if allocations["status"] == "started":
+        lines.append("📈 tracemalloc увімкнено — різниця буде при наступному /debug")
+    else:
+        lines.append(f"📈 Алокації (tracemalloc {_mb(allocations['traced_bytes'])}), з минулого /debug:")
+        lines += [
+            f"  {item['size_diff']:+,} Б ({item['count_diff']:+}) {html.escape(item['site'])}"
+            for item in allocations["top"]
+        ]
+    fsm = caches["fsm_storage"]
+    lines += [
+        f"🗂 flood_counter: {caches['flood_counter']}, FSM: {fsm.get('keys', '—')} "
+        f"(активних {fsm.get('active', '—')}), схожі: {caches['similarity_index']}, "
+        f"рейди: {_mb(caches['raid_detector_bytes'])}",
+        f"📬 Черги: БД {queues['db_lock']}, сповіщення {queues['notifier']}, "
+        f"спам {queues['spam']}, outbox {storage['outbox']}, rate_limits {storage['rate_limits']}",
+    ]
+    if storage["backend"] == "sqlite":
+        lines.append(
+            f"💾 БД {_mb(storage['file_bytes'])}, WAL {_mb(storage['wal_bytes'])}, "
+            f"сторінок {storage['page_count']} × {storage['page_size']} Б "
+            f"(вільних {storage['freelist_count']}), cache_size {storage['cache_size']}"
+        )
+    else:
+        lines.append(
+            f"💾 Пам'ять: знімок {_mb(storage['file_bytes'])} ({storage['snapshot_age']} с тому), "
+            f"журнал {_mb(storage['wal_bytes'])}, незаписаних операцій {storage['log_pending']}"
+        )
+    webhook = info["webhook"]
+    if webhook:
+        rejected = ", ".join(f"{reason} {count}" for reason, count in sorted(webhook["rejected"].items()))
+        lines.append(f"🌐 Вебхук: прийнято {webhook['accepted']}, відхилено: {rejected or '—'}")
+    await message.answer("<pre>" + "\n".join(lines) + "</pre>", parse_mode="HTML")
+
+
 @router.message(Command("cleanup"))
 async def cmd_cleanup(message: Message):
     """Очищення старих даних"""
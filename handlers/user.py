@@ -2,22 +2,29 @@
 Обробники для звичайних користувачів
 """
 import logging
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 
-from config import settings, TEXTS
+from config import settings, current_config, TEXTS
 from services.database import db
-from services.spam_filter import check_spam
+from services.notifier import notifier
+from services.similarity import similarity_index
+from services.spam_service import spam_service
 from utils.keyboards import (
     main_menu_keyboard, cancel_keyboard, confirm_question_keyboard,
-    back_to_menu_keyboard, rating_keyboard, admin_reply_keyboard
+    back_to_menu_keyboard, rating_keyboard
+)
+from utils.callbacks import (
+    CallbackRouter, BackToMenuCallback, HowItWorksCallback, AskQuestionCallback,
+    ConfirmSendCallback, EditQuestionCallback, CancelQuestionCallback, RateCallback
 )
 from utils.states import UserStates
 
 logger = logging.getLogger(__name__)
 router = Router()
+callbacks = CallbackRouter(router)
 
 
 async def show_main_menu(target, text: str = None):
@@ -37,14 +44,14 @@ async def cmd_start(message: Message, state: FSMContext):
     logger.info(f"Новий користувач запустив бот (id=***)")
 
 
-@router.callback_query(F.data == "back_to_menu")
+@callbacks(BackToMenuCallback)
 async def back_to_menu(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await show_main_menu(callback)
     await callback.answer()
 
 
-@router.callback_query(F.data == "how_it_works")
+@callbacks(HowItWorksCallback)
 async def how_it_works(callback: CallbackQuery):
     """Інформація про анонімність"""
     await callback.message.edit_text(
@@ -55,7 +62,7 @@ async def how_it_works(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data == "ask_question")
+@callbacks(AskQuestionCallback)
 async def start_question(callback: CallbackQuery, state: FSMContext):
     """Початок написання питання"""
     # Перевірка rate limit
@@ -101,7 +108,7 @@ async def receive_question(message: Message, state: FSMContext):
         return
 
     # Перевірка спаму
-    is_spam, reason = check_spam(message.text)
+    is_spam, reason = await spam_service.check(message.text)
     if is_spam:
         logger.warning(f"Спам заблоковано: {reason}")
         await message.answer(TEXTS["spam_detected"])
@@ -121,7 +128,7 @@ async def receive_question(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(F.data == "confirm_send", UserStates.confirming_question)
+@callbacks(ConfirmSendCallback, UserStates.confirming_question)
 async def confirm_send_question(callback: CallbackQuery, state: FSMContext, bot: Bot):
     """Підтвердження та надсилання питання"""
     data = await state.get_data()
@@ -143,6 +150,8 @@ async def confirm_send_question(callback: CallbackQuery, state: FSMContext, bot:
 
     # Зберігаємо в БД
     request_id = await db.create_question(callback.from_user.id, question)
+    similarity_index.add(request_id, question, current_config().BOT_ID)
+    similar = len(similarity_index.similar(request_id))
 
     await state.clear()
 
@@ -153,26 +162,14 @@ async def confirm_send_question(callback: CallbackQuery, state: FSMContext, bot:
         reply_markup=back_to_menu_keyboard()
     )
 
-    # Розсилаємо всім адмінам
-    for admin_id in settings.ADMIN_IDS:
-        try:
-            await bot.send_message(
-                admin_id,
-                TEXTS["admin_new_question"].format(
-                    request_id=request_id,
-                    question=question
-                ),
-                reply_markup=admin_reply_keyboard(request_id),
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.error(f"Не вдалося надіслати питання адміну {admin_id}: {e}")
-
-    logger.info(f"Питання #{request_id} надіслано анонімно (адмінів: {len(settings.ADMIN_IDS)})")
+    # Розсилаємо всім адмінам (під час сплесків — дайджестом)
+    await notifier.notify(bot, request_id, question, similar)
+
+    logger.info(f"Питання #{request_id} надіслано анонімно (адмінів: {len(current_config().ADMIN_IDS)})")
     await callback.answer()
 
 
-@router.callback_query(F.data == "edit_question", UserStates.confirming_question)
+@callbacks(EditQuestionCallback, UserStates.confirming_question)
 async def edit_question(callback: CallbackQuery, state: FSMContext):
     """Редагування питання"""
     await state.set_state(UserStates.writing_question)
@@ -187,7 +184,7 @@ async def edit_question(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data == "cancel_question")
+@callbacks(CancelQuestionCallback)
 async def cancel_question(callback: CallbackQuery, state: FSMContext):
     """Скасування питання"""
     await state.clear()
@@ -195,15 +192,11 @@ async def cancel_question(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("rate:"))
-async def rate_answer(callback: CallbackQuery):
+@callbacks(RateCallback)
+async def rate_answer(callback: CallbackQuery, callback_data: RateCallback):
     """Оцінка відповіді"""
-    parts = callback.data.split(":")
-    if len(parts) != 3:
-        return
-
-    request_id = parts[1]
-    rating = int(parts[2])
+    request_id = callback_data.request_id
+    rating = int(callback_data.useful)
 
     await db.save_rating(request_id, rating)
 
@@ -3,16 +3,34 @@
 """
 import asyncio
 import logging
-from aiohttp import web
+import signal
+from typing import List, Optional
 from aiogram import Bot, Dispatcher
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import settings
+from config import settings, ALLOWED_UPDATES, BOT_TOKENS
 from handlers import setup_routers
+from middlewares.api_monitor import api_monitor
+from middlewares.bot_context import BotContextMiddleware
+from middlewares.inflight import inflight
 from middlewares.throttling import ThrottlingMiddleware
 from middlewares.logging import LoggingMiddleware
+from middlewares.raid import RaidMiddleware
+from middlewares.tracing import TracingMiddleware, TracingRequestMiddleware, registered_commands
+from middlewares.traffic import TrafficCaptureMiddleware
+from services.backup import backup_scheduler
+from services.config_reloader import config_reloader
 from services.database import db
+from services.json_codec import JsonCodec, json_codec
+from services.notifier import notifier
+from services.outbox import delivery_worker
+from services.raid_detector import raid_detector
+from services.similarity import similarity_index
+from services.spam_service import spam_service
+from services.tracing import tracer
+from services.traffic import traffic_recorder
 
 
 logging.basicConfig(
@@ -26,73 +44,173 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def on_startup(bot: Bot) -> None:
+async def init_storage() -> None:
     await db.init()
     logger.info("База даних ініціалізована")
-
-    if settings.USE_WEBHOOK:
-        await bot.set_webhook(
-            url=f"{settings.WEBHOOK_URL}{settings.WEBHOOK_PATH}",
-            drop_pending_updates=True,
-            allowed_updates=["message", "callback_query"],
-        )
-        logger.info(f"Вебхук встановлено: {settings.WEBHOOK_URL}{settings.WEBHOOK_PATH}")
-    else:
-        await bot.delete_webhook(drop_pending_updates=True)
-        logger.info("Polling режим активовано")
-
-
-async def on_shutdown(bot: Bot) -> None:
+    similarity_index.rebuild(await db.get_pending_questions(all_bots=True))
+    spam_service.train(await db.get_spam_examples())
+
+
+def webhook_path(bot: Bot) -> str:
+    """Один бот — WEBHOOK_PATH; кілька — WEBHOOK_PATH/<токен> (див. services/webhook.py)"""
+    if settings.BOTS_FILE:
+        return f"{settings.WEBHOOK_PATH}/{bot.token}"
+    return settings.WEBHOOK_PATH
+
+
+async def setup_webhook(bot: Bot) -> None:
+    from services.webhook import secret_fingerprint, webhook_secret
+
+    # Відбиток секрету в URL: без нього вебхук, встановлений без секрету, не оновився б
+    url = f"{settings.WEBHOOK_URL}{webhook_path(bot)}?s={secret_fingerprint(bot)}"
+    # Після рестарту вебхук зазвичай вже налаштований — зайвий set_webhook не потрібен
+    info = await bot.get_webhook_info()
+    if info.url == url and set(info.allowed_updates or []) == set(ALLOWED_UPDATES):
+        logger.info(f"Вебхук бота {bot.id} вже встановлено")
+        return
+
+    await bot.set_webhook(
+        url=url,
+        drop_pending_updates=True,
+        allowed_updates=ALLOWED_UPDATES,
+        secret_token=webhook_secret(bot),
+    )
+    # URL у режимі кількох ботів містить токен — у лог не пишемо
+    logger.info(f"Вебхук бота {bot.id} встановлено")
+
+
+async def setup_polling(bot: Bot) -> None:
+    await bot.delete_webhook(drop_pending_updates=True)
+    logger.info("Polling режим активовано")
+
+
+async def on_startup(bots: List[Bot]) -> None:
+    # БД та Bot API незалежні — ініціалізуємо паралельно
+    setup = setup_webhook if settings.USE_WEBHOOK else setup_polling
+    await asyncio.gather(init_storage(), *(setup(bot) for bot in bots))
+    config_reloader.start()
+    delivery_worker.start(bots)
+    backup_scheduler.start()
+
+
+async def on_shutdown(bots: List[Bot]) -> None:
+    # Дочікуємось обробників (напр. receive_answer між save_answers і підтвердженням адміну)
+    await inflight.drain(settings.SHUTDOWN_TIMEOUT)
+    await config_reloader.stop()
+    await delivery_worker.stop()
+    await backup_scheduler.stop()
+    await notifier.close(bots)
+    spam_service.close()
     await db.close()
-    if settings.USE_WEBHOOK:
-        await bot.delete_webhook()
+    await tracer.close()
+    if traffic_recorder:
+        await traffic_recorder.close()
+    # Вебхук не видаляємо: після рестарту (або пробудження на Render) Telegram
+    # продовжує доставляти оновлення, а on_startup пропустить set_webhook
     logger.info("Бот зупинено")
 
 
-def create_bot_and_dispatcher():
-    bot = Bot(token=settings.BOT_TOKEN)
+def create_dispatcher() -> Dispatcher:
+    # Один диспетчер і одне FSM-сховище на всі боти (ключі сховища містять bot_id)
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
 
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
+    # Першими: налаштування бота потрібні всім наступним middleware та фільтрам
+    dp.update.outer_middleware(BotContextMiddleware())
+    if traffic_recorder:
+        # Записуємо всі оновлення, навіть ті, що відхиляться далі
+        dp.update.outer_middleware(TrafficCaptureMiddleware(traffic_recorder))
+    dp.update.outer_middleware(inflight)
+    # Кореневий спан після FSM-middleware диспетчера (стан вже відомий)
+    tracing = dp.update.outer_middleware(TracingMiddleware(tracer))
     dp.message.middleware(ThrottlingMiddleware(rate_limit=settings.RATE_LIMIT_SECONDS))
     dp.message.middleware(LoggingMiddleware())
+    dp.message.middleware(RaidMiddleware(raid_detector))
 
     setup_routers(dp)
+    tracing.commands = registered_commands(dp)
+
+    return dp
 
-    return bot, dp
+
+def create_bots_and_dispatcher(session: Optional[BaseSession] = None, codec: JsonCodec = json_codec):
+    """Усі боти з BOTS_FILE (або один з BOT_TOKEN) на одному пулі з'єднань"""
+    # Вебхук розбирає тіло тим самим кодеком (bot.session.json_loads)
+    session = session or AiohttpSession(json_loads=codec.loads, json_dumps=codec.dumps)
+    session.middleware(api_monitor)
+    session.middleware(TracingRequestMiddleware(tracer))
+    bots = [Bot(token=token, session=session) for token in BOT_TOKENS]
+    return bots, create_dispatcher()
+
+
+def create_bot_and_dispatcher(session: Optional[BaseSession] = None, codec: JsonCodec = json_codec):
+    """session — для відтворення трафіку проти фейкового Bot API (benchmarks/bench_replay.py)"""
+    bots, dp = create_bots_and_dispatcher(session, codec)
+    return bots[0], dp
 
 
 async def run_polling():
-    bot, dp = create_bot_and_dispatcher()
+    bots, dp = create_bots_and_dispatcher()
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(*bots)
     finally:
-        await bot.session.close()
+        await bots[0].session.close()
 
 
 async def run_webhook():
-    bot, dp = create_bot_and_dispatcher()
-
-    app = web.Application()
-    handler = SimpleRequestHandler(dispatcher=dp, bot=bot)
-    handler.register(app, path=settings.WEBHOOK_PATH)
-    setup_application(app, dp, bot=bot)
+    # aiohttp.web потрібен лише у вебхук-режимі — імпортуємо ліниво
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import setup_application
+    from middlewares.inflight import webhook_drain_middleware
+    from services.health import setup_health_routes
+    from services.webhook import ConfiguredBotsRequestHandler, GuardedRequestHandler
+
+    bots, dp = create_bots_and_dispatcher()
+
+    app = web.Application(middlewares=[webhook_drain_middleware(inflight, settings.WEBHOOK_PATH)])
+    setup_health_routes(app, storage=dp.storage)
+    if settings.BOTS_FILE:
+        handler = ConfiguredBotsRequestHandler(dispatcher=dp, bots=bots)
+        handler.register(app, path=f"{settings.WEBHOOK_PATH}/{{bot_token}}")
+    else:
+        handler = GuardedRequestHandler(dispatcher=dp, bot=bots[0])
+        handler.register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bots=bots)
 
-    runner = web.AppRunner(app)
+    runner = web.AppRunner(app, shutdown_timeout=settings.SHUTDOWN_TIMEOUT)
     await runner.setup()
-    site = web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+    site = web.TCPSite(
+        runner,
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        reuse_port=settings.WEBHOOK_REUSE_PORT,
+    )
     await site.start()
 
     logger.info(f"Вебсервер запущено на {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}")
 
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
     try:
-        await asyncio.Event().wait()
+        await stop_event.wait()
+        logger.info("Отримано сигнал зупинки, завершуємо обробку")
+        # Нові з'єднання більше не приймаються (з SO_REUSEPORT їх отримає новий процес),
+        # а запити на вебхук з відкритих з'єднань отримують 503 і будуть доставлені повторно
+        await site.stop()
+        await inflight.drain(settings.SHUTDOWN_TIMEOUT)
     finally:
+        # cleanup викликає on_shutdown: скидання дайджестів, checkpoint і закриття БД
         await runner.cleanup()
-        await bot.session.close()
+        await bots[0].session.close()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,18 @@
 from .throttling import ThrottlingMiddleware
 from .logging import LoggingMiddleware
+from .api_monitor import ApiMonitorMiddleware, api_monitor
+from .bot_context import BotContextMiddleware
+from .inflight import InFlightMiddleware, inflight
+from .raid import RaidMiddleware
+from .tracing import TracingMiddleware, TracingRequestMiddleware
+from .traffic import TrafficCaptureMiddleware
 
-__all__ = ["ThrottlingMiddleware", "LoggingMiddleware"]
+__all__ = [
+    "ThrottlingMiddleware", "LoggingMiddleware",
+    "ApiMonitorMiddleware", "api_monitor",
+    "BotContextMiddleware",
+    "InFlightMiddleware", "inflight",
+    "RaidMiddleware",
+    "TracingMiddleware", "TracingRequestMiddleware",
+    "TrafficCaptureMiddleware",
+]
@@ -0,0 +1,37 @@
+"""
+Middleware сесії бота: час останнього успішного виклику Bot API
+"""
+import time
+from typing import Any, Dict, Optional
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+
+class ApiMonitorMiddleware(BaseRequestMiddleware):
+    """Фіксує успішні та невдалі виклики Bot API (для /ready)"""
+
+    def __init__(self):
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.errors = 0
+
+    async def __call__(self, make_request, bot, method):
+        try:
+            response = await make_request(bot, method)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(method).__name__}: {type(e).__name__}"
+            raise
+        self.last_success = time.monotonic()
+        return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "last_success_ago": (
+                round(time.monotonic() - self.last_success, 1) if self.last_success else None
+            ),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+api_monitor = ApiMonitorMiddleware()
@@ -0,0 +1,21 @@
+"""
+Middleware вибору налаштувань бота (режим кількох ботів з BOTS_FILE)
+"""
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import bot_context
+
+
+class BotContextMiddleware(BaseMiddleware):
+    """Адміни, спам-слова, канал і розділ БД — того бота, що отримав оновлення"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with bot_context(data["bot"].id):
+            return await handler(event, data)
@@ -0,0 +1,67 @@
+"""
+Middleware обліку оновлень в обробці (для плавної зупинки)
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Рахує оновлення в обробці; drain() чекає їх завершення"""
+
+    def __init__(self):
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.active += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Перестати приймати нові оновлення і дочекатися поточних. True — якщо встигли"""
+        self.draining = True
+        if self.active:
+            logger.info(f"Очікуємо завершення {self.active} оновлень (до {timeout} с)")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Не дочекалися {self.active} оновлень до дедлайну")
+            return False
+
+
+def webhook_drain_middleware(tracker: InFlightMiddleware, path: str):
+    """
+    aiohttp-middleware: під час зупинки вебхук відповідає 503,
+    і Telegram повторно доставляє оновлення новому процесу
+    """
+    from aiohttp import web
+
+    @web.middleware
+    async def reject_while_draining(request: web.Request, handler):
+        # path — префікс: у режимі кількох ботів шляхи мають вигляд path/<токен>
+        if tracker.draining and request.path.startswith(path):
+            return web.Response(status=503, text="Shutting down")
+        return await handler(request)
+
+    return reject_while_draining
+
+
+inflight = InFlightMiddleware()
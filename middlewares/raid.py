@@ -0,0 +1,40 @@
+"""
+Middleware захисту від рейдів (однаковий текст з багатьох акаунтів)
+"""
+import logging
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from config import TEXTS
+from services.raid_detector import RaidDetector
+from utils.states import UserStates
+
+logger = logging.getLogger(__name__)
+
+
+class RaidMiddleware(BaseMiddleware):
+    """Блокує тексти питань, які масово надсилаються з різних акаунтів"""
+
+    def __init__(self, detector: RaidDetector):
+        self.detector = detector
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Перевіряємо лише тексти питань (стан writing_question), а не команди та кнопки
+        if (
+            isinstance(event, Message)
+            and event.text
+            and event.from_user
+            and data.get("raw_state") == UserStates.writing_question.state
+            and self.detector.observe(event.text, event.from_user.id)
+        ):
+            logger.warning("Рейд: масово повторюваний текст заблоковано")
+            await event.answer(TEXTS["spam_detected"])
+            return
+
+        return await handler(event, data)
@@ -0,0 +1,72 @@
+"""
+Middleware трасування: кореневий спан на оновлення та дочірні спани для викликів Bot API
+"""
+from typing import Callable, Dict, Any, Awaitable, FrozenSet
+from aiogram import BaseMiddleware, Router
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.filters import Command
+from aiogram.types import Update
+
+from services.tracing import Tracer
+
+# Атрибут command для тексту на "/", що не є зареєстрованою командою (вільний текст не експортується)
+OTHER_COMMAND = "other"
+
+
+def registered_commands(router: Router) -> FrozenSet[str]:
+    """Текстові команди фільтрів Command у всіх обробниках повідомлень роутера і вкладених"""
+    commands = set()
+    for nested in router.chain_tail:
+        for handler in nested.message.handlers:
+            for filter_object in handler.filters or ():
+                command_filter = filter_object.callback
+                if isinstance(command_filter, Command):
+                    # prefix — набір допустимих символів префікса, regex-команди не враховуються
+                    commands.update(
+                        prefix + command
+                        for prefix in command_filter.prefix
+                        for command in command_filter.commands if isinstance(command, str)
+                    )
+    return frozenset(commands)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Кореневий спан "update". Атрибути — лише тип оновлення, стан FSM,
+    зареєстрована команда або префікс callback (без ID користувачів і текстів)
+    """
+
+    def __init__(self, tracer: Tracer, commands: FrozenSet[str] = frozenset()):
+        self.tracer = tracer
+        # Заповнюється після підключення роутерів (registered_commands)
+        self.commands = commands
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.tracer.enabled:
+            return await handler(event, data)
+
+        attributes = {"update.type": event.event_type, "fsm.state": data.get("raw_state") or ""}
+        if event.message and event.message.text and event.message.text.startswith("/"):
+            command = event.message.text.split(maxsplit=1)[0].split("@")[0]
+            attributes["command"] = command if command in self.commands else OTHER_COMMAND
+        elif event.callback_query and event.callback_query.data:
+            attributes["callback"] = event.callback_query.data.split(":", 1)[0]
+
+        with self.tracer.root("update", **attributes):
+            return await handler(event, data)
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Дочірній спан на кожен вихідний виклик Bot API (лише назва методу)"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def __call__(self, make_request, bot, method):
+        with self.tracer.span(f"bot.{type(method).__name__}"):
+            return await make_request(bot, method)
@@ -0,0 +1,28 @@
+"""
+Middleware запису знеособленого трафіку (вмикається TRAFFIC_CAPTURE_PATH)
+"""
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from services.traffic import TrafficRecorder
+
+
+class TrafficCaptureMiddleware(BaseMiddleware):
+    """Записує кожне вхідне оновлення до обробки (в т.ч. відхилені далі)"""
+
+    def __init__(self, recorder: TrafficRecorder):
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        self.recorder.record(
+            event.model_dump(mode="json", exclude_none=True, by_alias=True),
+            user.id if user else None,
+        )
+        return await handler(event, data)
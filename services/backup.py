@@ -0,0 +1,227 @@
+"""
+Онлайн-бекапи БД: backup API SQLite малими кроками, перевірка цілісності,
+стиснуті знімки з ротацією та відновлення
+
+CLI:
+  python -m services.backup list
+  python -m services.backup backup
+  python -m services.backup restore backups/bot_data-20240101-120000-000000.db.gz --force
+"""
+import argparse
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from config import settings
+from services.database import db
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".db.gz"
+
+
+def snapshot_path(directory: str, db_path: str) -> str:
+    """Ім'я з мікросекундами: два бекапи в одну секунду не перезаписують один одного"""
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(directory, f"{stem}-{datetime.now():%Y%m%d-%H%M%S-%f}{SNAPSHOT_SUFFIX}")
+
+
+def list_snapshots(directory: str) -> List[str]:
+    """Знімки від найстарішого до найновішого (ім'я містить час)"""
+    return sorted(glob.glob(os.path.join(directory, f"*{SNAPSHOT_SUFFIX}")))
+
+
+def integrity_check(path: str) -> str:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def compress(source: str, target: str):
+    """gzip у тимчасовий файл і атомарне перейменування (недописаний знімок не з'явиться)"""
+    partial = target + ".part"
+    with open(source, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(partial, target)
+
+
+def rotate(directory: str, keep: int) -> List[str]:
+    snapshots = list_snapshots(directory)
+    removed = snapshots[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def finalize(raw_path: str, directory: str, db_path: str, keep: int) -> str:
+    """Перевірка цілісності, стиснення та ротація (виконується в потоці)"""
+    try:
+        result = integrity_check(raw_path)
+        if result != "ok":
+            raise RuntimeError(f"integrity_check: {result}")
+        target = snapshot_path(directory, db_path)
+        compress(raw_path, target)
+    finally:
+        for path in (raw_path, raw_path + "-wal", raw_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    rotate(directory, keep)
+    return target
+
+
+def restore(snapshot: str, db_path: str, force: bool = False) -> str:
+    """
+    Відновлення БД зі знімка. Бот має бути зупинений: файли WAL/SHM видаляються,
+    щоб старий журнал не застосувався до відновленої БД
+    """
+    if os.path.exists(db_path) and not force:
+        raise FileExistsError(f"{db_path} існує — додайте --force (попередньо зупинивши бота)")
+
+    staged = db_path + ".restore"
+    with gzip.open(snapshot, "rb") as src, open(staged, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    result = integrity_check(staged)
+    if result != "ok":
+        os.remove(staged)
+        raise RuntimeError(f"Знімок пошкоджено: {result}")
+
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(staged, db_path)
+    return db_path
+
+
+class BackupScheduler:
+    """Періодичний бекап у фоні; записи бота продовжуються під час копіювання"""
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 3600,
+        keep: int = 24,
+        step_pages: int = 64,
+        step_sleep: float = 0.01,
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.step_pages = step_pages
+        self.step_sleep = step_sleep
+        self.last_path: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._current: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        raw_path = os.path.join(self.directory, f".in-progress-{os.getpid()}.db")
+        started = time.monotonic()
+        steps = await db.backup_to(raw_path, pages=self.step_pages, sleep=self.step_sleep)
+        path = await asyncio.get_running_loop().run_in_executor(
+            None, finalize, raw_path, self.directory, db.db_path, self.keep
+        )
+        self.last_path = path
+        self.last_duration = time.monotonic() - started
+        logger.info(f"Бекап БД: {path} ({steps} кроків, {self.last_duration:.1f} с)")
+        return path
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Потік копіювання не скасовується — stop() дочікується бекапу окремо
+            self._current = asyncio.create_task(self.run_once())
+            try:
+                await asyncio.shield(self._current)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Бекап БД не вдався: {e}")
+            self._current = None
+
+    def start(self):
+        if db.backend != "sqlite":
+            logger.info(f"Бекапи SQLite вимкнено: сховище {db.backend} зберігає власні знімки")
+            return
+        if self.interval > 0 and self.directory:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Зупинка до закриття БД: поточний бекап (якщо триває) дописується до кінця"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._current:
+            if not self._current.done():
+                logger.info("Очікування завершення поточного бекапу")
+            try:
+                await self._current
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Бекап БД не вдався: {e}")
+        self._current = None
+
+
+backup_scheduler = BackupScheduler(
+    settings.BACKUP_DIR,
+    interval=settings.BACKUP_INTERVAL,
+    keep=settings.BACKUP_KEEP,
+    step_pages=settings.BACKUP_STEP_PAGES,
+    step_sleep=settings.BACKUP_STEP_SLEEP_MS / 1000,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бекапи та відновлення БД")
+    parser.add_argument("--db", default=db.db_path, help="шлях до SQLite")
+    parser.add_argument("--dir", default=settings.BACKUP_DIR, help="каталог знімків")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="список знімків")
+    commands.add_parser("backup", help="разовий знімок (бот може працювати)")
+    restore_parser = commands.add_parser("restore", help="відновити БД зі знімка")
+    restore_parser.add_argument("snapshot")
+    restore_parser.add_argument("--force", action="store_true", help="перезаписати існуючу БД")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in list_snapshots(args.dir):
+            print(f"{path}  {os.path.getsize(path) / 1024:.0f} КБ")
+    elif args.command == "backup":
+        if db.backend != "sqlite":
+            parser.exit(1, f"DB_BACKEND={db.backend}: знімки сховища — {db.db_path}.snapshot\n")
+        db.db_path = args.db
+        backup_scheduler.directory = args.dir
+
+        async def run():
+            await db.init()
+            try:
+                print(await backup_scheduler.run_once())
+            finally:
+                await db.close()
+
+        asyncio.run(run())
+    else:
+        try:
+            print(f"Відновлено: {restore(args.snapshot, args.db, force=args.force)}")
+        except (FileExistsError, RuntimeError) as e:
+            parser.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
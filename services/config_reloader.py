@@ -0,0 +1,72 @@
+"""
+Перезавантаження конфігурації без рестарту: SIGHUP або зміна ENV_FILE / BOTS_FILE
+"""
+import asyncio
+import logging
+import os
+import signal
+from typing import Optional, Tuple
+
+from config import ENV_FILE, settings, reload_runtime_config
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """Слідкує за ENV_FILE і BOTS_FILE (опитування mtime) та обробляє SIGHUP"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._mtime = self._read_mtime()
+
+    @staticmethod
+    def _read_mtime() -> Tuple[Optional[float], ...]:
+        mtimes = []
+        for path in filter(None, (ENV_FILE, settings.BOTS_FILE)):
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def reload(self):
+        try:
+            reload_runtime_config()
+        except Exception as e:
+            # Помилка у файлі не повинна зупиняти бота — лишається попередній знімок
+            logger.error(f"Не вдалося перезавантажити конфігурацію: {e}")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._read_mtime()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                logger.info("Виявлено зміну файлів конфігурації")
+                self.reload()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, self.reload)
+            except (NotImplementedError, RuntimeError):
+                logger.warning("SIGHUP недоступний — лише відстеження змін файлу")
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if hasattr(signal, "SIGHUP"):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+config_reloader = ConfigReloader(interval=settings.CONFIG_RELOAD_INTERVAL)
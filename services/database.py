@@ -1,35 +1,369 @@
 """
-Сервіс бази даних - SQLite для тимчасових даних
+Сервіс бази даних: інтерфейс сховища і бекенд SQLite для тимчасових даних.
+Бекенд у пам'яті з журналом операцій — services/memory_store.py (DB_BACKEND=memory)
 """
 import asyncio
+import json
 import logging
+import os
+import re
 import sqlite3
+import time
+import unicodedata
 import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from itertools import chain
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from config import settings, current_config
+from services.exporter import iter_questions
+from services.quantiles import DDSketch
+from services.tracing import current_span, traced_methods
 
 logger = logging.getLogger(__name__)
 
+# Маркери підсвітки у сніпетах (замінюються на HTML вже після екранування тексту)
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+
+# Токени FTS5 unicode61: літери й цифри; підкреслення — роздільник
+SEARCH_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _latin_fold_table() -> Dict[int, str]:
+    """remove_diacritics 2 знімає діакритику лише латиниці (кирилиця — й, ї — без змін)"""
+    table = {}
+    for code in chain(range(0xC0, 0x250), range(0x1E00, 0x1F00)):
+        char = chr(code)
+        if not unicodedata.name(char, "").startswith("LATIN"):
+            continue
+        base = "".join(c for c in unicodedata.normalize("NFD", char) if not unicodedata.combining(c))
+        if len(base) == 1 and base != char:
+            table[code] = base.lower()
+    return table
+
+
+_LATIN_FOLD = _latin_fold_table()
+
+
+def fold_token(token: str) -> str:
+    """Токен так, як його індексує FTS5: нижній регістр, латиниця без діакритики"""
+    return token.lower().translate(_LATIN_FOLD)
+
+
+def search_terms(text: str) -> List[str]:
+    """Слова для пошуку так, як їх бачить токенізатор FTS5 (unicode61 remove_diacritics 2)"""
+    return [fold_token(token) for token in SEARCH_TOKEN.findall(text)]
+
+
+def build_fts_query(terms: str) -> str:
+    """Перетворення довільного вводу на безпечний FTS5-запит (префіксний AND)"""
+    tokens = search_terms(terms)
+    # Префіксний пошук частково компенсує відмінювання українських слів
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Тривалість для статистики: секунди, хвилини, години або дні"""
+    if seconds is None:
+        return "—"
+    if seconds < 60:
+        return f"{seconds:.1f} с" if seconds < 10 else f"{seconds:.0f} с"
+    mins = int(seconds // 60)
+    if mins < 60:
+        return f"{mins} хв"
+    hours = mins // 60
+    return f"{hours} год {mins % 60} хв" if hours < 24 else f"{hours // 24} дн {hours % 24} год"
+
+
+def _today() -> str:
+    """День для щоденних метрик (UTC, як CURRENT_TIMESTAMP)"""
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _observe_latency(conn: sqlite3.Connection, column: str, samples):
+    """
+    Додавання затримок (bot_id, секунди) до сьогоднішнього скетчу кожного бота
+    в поточній транзакції: читається і перезаписується один рядок, незалежно від розміру таблиць
+    """
+    by_bot: Dict[int, List[float]] = {}
+    for bot_id, seconds in samples:
+        if seconds is not None:
+            by_bot.setdefault(bot_id, []).append(max(seconds, 0.0))
+    day = _today()
+    for bot_id, values in by_bot.items():
+        row = conn.execute(
+            f"SELECT {column} FROM daily_metrics WHERE bot_id = ? AND day = ?", (bot_id, day)
+        ).fetchone()
+        sketch = DDSketch.from_json(row[0]) if row and row[0] else DDSketch()
+        for value in values:
+            sketch.add(value)
+        conn.execute(
+            f"""INSERT INTO daily_metrics (bot_id, day, {column}) VALUES (?, ?, ?)
+                ON CONFLICT(bot_id, day) DO UPDATE SET {column} = excluded.{column}""",
+            (bot_id, day, sketch.to_json())
+        )
+
+
+@traced_methods("db")
+class Database(ABC):
+    """
+    Інтерфейс сховища. Методи діють у розділі бота поточного оновлення (_bot()),
+    якщо не сказано інше; словники питань мають колонки таблиці questions
+    """
+
+    backend = ""
+    db_path = ""
+
+    @staticmethod
+    def _bot() -> int:
+        """Розділ даних бота, чиє оновлення обробляється (0 — режим одного бота)"""
+        return current_config().BOT_ID
+
+    @abstractmethod
+    async def init(self):
+        """Відкриття сховища (і відновлення стану після перезапуску)"""
+
+    @abstractmethod
+    async def close(self):
+        """Дочекатися поточних операцій, зберегти все на диск і закрити"""
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        """Сховище відкрите і відповідає"""
+
+    @property
+    @abstractmethod
+    def queue_depth(self) -> int:
+        """Операції, що чекають на запис"""
+
+    # ---- Rate Limiting ----
+
+    @abstractmethod
+    async def check_rate_limit(self, user_id: int, limit_seconds: int) -> Optional[int]:
+        """Секунди до наступного дозволу або None, якщо ліміт не діє"""
+
+    @abstractmethod
+    async def update_rate_limit(self, user_id: int):
+        """Оновлення часу останнього запиту"""
+
+    # ---- Questions ----
+
+    @abstractmethod
+    async def create_question(self, user_id: int, question: str) -> str:
+        """Нове питання (і оновлення ліміту автора). Повертає request_id"""
+
+    @abstractmethod
+    async def get_question(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Питання за ID"""
+
+    @abstractmethod
+    async def get_pending_questions(self, all_bots: bool = False) -> list:
+        """Питання без відповіді у порядку надходження (all_bots — усіх ботів)"""
+
+    @abstractmethod
+    async def count_pending(self) -> int:
+        """Кількість питань без відповіді"""
+
+    async def save_answer(self, request_id: str, answer: str) -> Optional[int]:
+        """Збереження відповіді (з постановкою в чергу доставки). Повертає user_id"""
+        recipients = await self.save_answers([request_id], answer)
+        return recipients[0]["user_id"] if recipients else None
+
+    @abstractmethod
+    async def save_answers(
+        self,
+        request_ids: List[str],
+        answer: str,
+        publish: bool = False,
+        notify_chat_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Одна відповідь для кількох питань атомарно разом із записами outbox і скетчем
+        затримки відповіді. publish — ще й публікація в канал (одна, для першого питання).
+        Повертає отримувачів: request_id, user_id та текст питання
+        """
+
+    @abstractmethod
+    async def filter_pending(self, request_ids: Optional[List[str]] = None) -> List[str]:
+        """ID питань без відповіді з переданих (None — усі), у порядку надходження"""
+
+    @abstractmethod
+    async def search_pending(self, terms: str) -> List[str]:
+        """ID питань без відповіді, що відповідають пошуковому запиту"""
+
+    @abstractmethod
+    async def reject_questions(self, request_ids: List[str]) -> int:
+        """Відхилення питань без відповіді з видаленням user_id. Повертає кількість"""
+
+    @abstractmethod
+    async def delete_questions(self, request_ids: List[str]) -> int:
+        """Видалення питань без відповіді. Повертає кількість"""
+
+    @abstractmethod
+    async def save_rating(self, request_id: str, rating: int):
+        """Перша оцінка відповіді разом із щоденним лічильником"""
+
+    # ---- Черга доставки (outbox) ----
+
+    @abstractmethod
+    async def fetch_outbox_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Записи outbox усіх ботів, час спроби яких настав, разом з даними для надсилання"""
+
+    @abstractmethod
+    async def complete_outbox(
+        self, outbox_ids: List[int], wipe_request_ids: List[str], delivered_ids: List[int] = ()
+    ):
+        """
+        Завершення записів outbox атомарно: видалення з черги та user_id.
+        delivered_ids — успішно надіслані записи, їхня затримка доставки йде в скетч
+        """
+
+    @abstractmethod
+    async def reschedule_outbox(self, retries: List[Tuple[int, float, str]]):
+        """Відкладення записів outbox: (id, час наступної спроби, помилка)"""
+
+    @abstractmethod
+    async def count_outbox(self) -> int:
+        """Кількість записів outbox усіх ботів"""
+
+    # ---- Спам-класифікатор і панелі адмінів ----
+
+    @abstractmethod
+    async def add_spam_example(self, text: str, is_spam: bool):
+        """Приклад, позначений адміном (без user_id)"""
+
+    @abstractmethod
+    async def get_spam_examples(self, limit: int = 10000) -> List[Tuple[str, bool]]:
+        """Останні позначені приклади (text, is_spam)"""
+
+    @abstractmethod
+    async def get_dashboard(self, admin_id: int) -> Optional[int]:
+        """message_id закріпленої панелі адміна"""
+
+    @abstractmethod
+    async def set_dashboard(self, admin_id: int, message_id: int):
+        """Збереження message_id панелі адміна"""
+
+    # ---- Пошук ----
+
+    @abstractmethod
+    async def search_questions(
+        self, terms: str, limit: int = 5, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Пошук по питаннях і відповідях (префіксний AND, як build_fts_query).
+        Повертає (кількість збігів, сторінка: request_id, status, created_at, snippet)
+        """
+
+    @abstractmethod
+    async def rebuild_search_index(self):
+        """Повна перебудова пошукового індексу"""
+
+    # ---- Статистика, експорт, обслуговування ----
+
+    @abstractmethod
+    async def count_questions(self) -> Dict[str, Any]:
+        """total, answered, pending і last_question (created_at останнього питання)"""
+
+    @abstractmethod
+    async def get_daily_metrics(self, since: str) -> List[Dict[str, Any]]:
+        """
+        Щоденні метрики з дня since (YYYY-MM-DD, UTC): answer і delivery (DDSketch або None),
+        rated_useful, rated_total. Повернуті скетчі не змінюються викликачем
+        """
+
+    async def get_stats(self, days: int = 7) -> Dict[str, Any]:
+        """
+        Статистика для адміна. Перцентилі затримок і частка корисних відповідей — за останні
+        days днів, зі злиття щоденних скетчів (без сортування таблиці питань)
+        """
+        stats = await self.count_questions()
+
+        since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86400))
+        answer, delivery = DDSketch(), DDSketch()
+        useful = rated = 0
+        for day in await self.get_daily_metrics(since):
+            if day["answer"]:
+                answer.merge(day["answer"])
+            if day["delivery"]:
+                delivery.merge(day["delivery"])
+            useful += day["rated_useful"]
+            rated += day["rated_total"]
+
+        stats["days"] = days
+        stats["avg_time"] = format_duration(answer.mean)
+        for name, sketch in (("answer", answer), ("delivery", delivery)):
+            stats[f"{name}_percentiles"] = " / ".join(
+                format_duration(sketch.quantile(q)) for q in (0.5, 0.9, 0.99)
+            ) if sketch.count else "—"
+        stats["useful"] = f"{useful * 100 // rated}% ({useful} з {rated})" if rated else "—"
+
+        last = stats.get("last_question")
+        if last:
+            try:
+                dt = datetime.fromisoformat(last)
+                stats["last_question"] = dt.strftime("%d.%m.%Y %H:%M")
+            except Exception:
+                pass
+
+        return stats
+
+    @abstractmethod
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        """
+        Стан сховища для /debug: backend, rate_limits, outbox, questions,
+        file_bytes і wal_bytes (основний файл і журнал) та поля свого бекенду
+        """
+
+    @abstractmethod
+    def export_rows(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        status: Optional[str] = None,
+        bot_id: Optional[int] = None,
+    ) -> Iterator[Tuple]:
+        """
+        Рядки EXPORT_COLUMNS (services/exporter.py) за created_at; ітератор
+        можна читати з іншого потоку
+        """
+
+    @abstractmethod
+    async def cleanup_old_data(self, days: int = 7):
+        """Очищення закритих питань і лімітів, старших за days днів"""
+
+
+@traced_methods("db")
+class SQLiteDatabase(Database):
+    backend = "sqlite"
 
-class Database:
     def __init__(self, db_path: str = "bot_data.db"):
         self.db_path = db_path
         self._conn: Optional[sqlite3.Connection] = None
         self._lock = asyncio.Lock()
+        self._waiting = 0
 
     async def init(self):
         """Ініціалізація бази даних"""
         async with self._lock:
             self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self._conn.row_factory = sqlite3.Row
+            # WAL: читачі не блокують запис, а коміти не потребують fsync основного файлу
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
             await asyncio.get_event_loop().run_in_executor(None, self._create_tables)
             logger.info(f"БД ініціалізовано: {self.db_path}")
 
     def _create_tables(self):
         cursor = self._conn.cursor()
+        self._migrate(cursor)
         cursor.executescript("""
             CREATE TABLE IF NOT EXISTS questions (
                 request_id TEXT PRIMARY KEY,
+                bot_id INTEGER NOT NULL DEFAULT 0,
                 -- user_id зберігається тимчасово для доставки відповіді
                 user_id INTEGER NOT NULL,
                 question TEXT NOT NULL,
@@ -42,8 +376,10 @@ class Database:
             );
 
             CREATE TABLE IF NOT EXISTS rate_limits (
-                user_id INTEGER PRIMARY KEY,
-                last_request TIMESTAMP NOT NULL
+                bot_id INTEGER NOT NULL DEFAULT 0,
+                user_id INTEGER NOT NULL,
+                last_request TIMESTAMP NOT NULL,
+                PRIMARY KEY (bot_id, user_id)
             );
 
             CREATE TABLE IF NOT EXISTS admin_stats (
@@ -53,27 +389,169 @@ class Database:
                 total_answers INTEGER DEFAULT 0
             );
 
+            -- Черга доставки: записується в одній транзакції з відповіддю,
+            -- user_id видаляється лише після підтвердженої доставки
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_id TEXT NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'answer',
+                -- чат адміна для повідомлення про остаточну невдачу
+                notify_chat_id INTEGER,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                -- час відповіді (unix), для затримки доставки
+                enqueued_at REAL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(next_attempt_at);
+
+            -- Приклади для спам-класифікатора, позначені адмінами (без user_id)
+            CREATE TABLE IF NOT EXISTS spam_examples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                is_spam INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            -- Закріплене повідомлення-панель кожного адміна
+            CREATE TABLE IF NOT EXISTS admin_dashboards (
+                bot_id INTEGER NOT NULL DEFAULT 0,
+                admin_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                PRIMARY KEY (bot_id, admin_id)
+            );
+
+            -- Щоденні скетчі затримок (services/quantiles.py) і лічильники оцінок.
+            -- Не пов'язані з питаннями, тож переживають cleanup_old_data
+            CREATE TABLE IF NOT EXISTS daily_metrics (
+                bot_id INTEGER NOT NULL DEFAULT 0,
+                day TEXT NOT NULL,
+                answer_sketch TEXT,
+                delivery_sketch TEXT,
+                rated_useful INTEGER NOT NULL DEFAULT 0,
+                rated_total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bot_id, day)
+            );
+
             CREATE INDEX IF NOT EXISTS idx_status ON questions(status);
             CREATE INDEX IF NOT EXISTS idx_created ON questions(created_at);
+            CREATE INDEX IF NOT EXISTS idx_bot_status ON questions(bot_id, status);
         """)
+        self._create_search_index(cursor)
         self._conn.commit()
 
+    def _migrate(self, cursor: sqlite3.Cursor):
+        """Міграції БД попередніх версій: розділення даних за ботами, час постановки в outbox"""
+        def columns(table: str) -> set:
+            return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+        existing = columns("questions")
+        if existing and "bot_id" not in existing:
+            cursor.execute("ALTER TABLE questions ADD COLUMN bot_id INTEGER NOT NULL DEFAULT 0")
+            logger.info("Міграція: додано questions.bot_id")
+        # Змінився первинний ключ; дані тимчасові (ліміти та ID панелей), тож таблиці перестворюються
+        for table in ("rate_limits", "admin_dashboards"):
+            existing = columns(table)
+            if existing and "bot_id" not in existing:
+                cursor.execute(f"DROP TABLE {table}")
+        existing = columns("outbox")
+        if existing and "enqueued_at" not in existing:
+            cursor.execute("ALTER TABLE outbox ADD COLUMN enqueued_at REAL")
+
+    def _create_search_index(self, cursor: sqlite3.Cursor):
+        """
+        Повнотекстовий індекс FTS5 по питаннях та відповідях.
+        Зовнішній content (без дублювання тексту) синхронізується тригерами,
+        тому всі шляхи запису в questions оновлюють індекс автоматично.
+        Після VACUUM rowid можуть змінитись — тоді потрібен rebuild_search_index().
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_fts'"
+        ).fetchone()
+        cursor.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                question, answer,
+                content = 'questions', content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+                INSERT INTO questions_fts(rowid, question, answer)
+                VALUES (new.rowid, new.question, new.answer);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+                INSERT INTO questions_fts(questions_fts, rowid, question, answer)
+                VALUES ('delete', old.rowid, old.question, old.answer);
+            END;
+
+            -- Лише зміни тексту: доставка / save_rating не чіпають індекс
+            CREATE TRIGGER IF NOT EXISTS questions_fts_au
+            AFTER UPDATE OF question, answer ON questions BEGIN
+                INSERT INTO questions_fts(questions_fts, rowid, question, answer)
+                VALUES ('delete', old.rowid, old.question, old.answer);
+                INSERT INTO questions_fts(rowid, question, answer)
+                VALUES (new.rowid, new.question, new.answer);
+            END;
+        """)
+        if not exists:
+            # Існуюча БД: індексуємо вже збережені питання
+            cursor.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+            logger.info("Пошуковий індекс побудовано для існуючих питань")
+
+    @property
+    def queue_depth(self) -> int:
+        """Кількість операцій, що чекають або виконуються під блокуванням"""
+        return self._waiting
+
+    @asynccontextmanager
+    async def _locked(self):
+        self._waiting += 1
+        span = current_span()
+        started = time.perf_counter() if span else 0.0
+        try:
+            async with self._lock:
+                if span:
+                    span.add("db.lock_wait_ms", (time.perf_counter() - started) * 1000)
+                yield
+        finally:
+            self._waiting -= 1
+
     async def _execute(self, query: str, params=()) -> sqlite3.Cursor:
-        async with self._lock:
+        async with self._locked():
             return await asyncio.get_event_loop().run_in_executor(
                 None, lambda: self._conn.execute(query, params)
             )
 
     async def _commit(self):
-        async with self._lock:
+        async with self._locked():
             await asyncio.get_event_loop().run_in_executor(None, self._conn.commit)
 
+    async def _transaction(self, func, *args):
+        """Виконання func(conn, *args) в одній транзакції (commit або rollback)"""
+        def run():
+            with self._conn:
+                return func(self._conn, *args)
+
+        async with self._locked():
+            return await asyncio.get_event_loop().run_in_executor(None, run)
+
+    async def ping(self) -> bool:
+        """Перевірка з'єднання з БД"""
+        if not self._conn:
+            return False
+        cursor = await self._execute("SELECT 1")
+        return cursor.fetchone()[0] == 1
+
     # ---- Rate Limiting ----
 
     async def check_rate_limit(self, user_id: int, limit_seconds: int) -> Optional[int]:
         """Перевірка ліміту. Повертає секунди до наступного дозволу або None якщо OK"""
         cursor = await self._execute(
-            "SELECT last_request FROM rate_limits WHERE user_id = ?", (user_id,)
+            "SELECT last_request FROM rate_limits WHERE bot_id = ? AND user_id = ?",
+            (self._bot(), user_id)
         )
         row = cursor.fetchone()
         if not row:
@@ -88,9 +566,9 @@ class Database:
     async def update_rate_limit(self, user_id: int):
         """Оновлення часу останнього запиту"""
         await self._execute(
-            """INSERT INTO rate_limits (user_id, last_request) VALUES (?, ?)
-               ON CONFLICT(user_id) DO UPDATE SET last_request = excluded.last_request""",
-            (user_id, datetime.now().isoformat())
+            """INSERT INTO rate_limits (bot_id, user_id, last_request) VALUES (?, ?, ?)
+               ON CONFLICT(bot_id, user_id) DO UPDATE SET last_request = excluded.last_request""",
+            (self._bot(), user_id, datetime.now().isoformat())
         )
         await self._commit()
 
@@ -100,9 +578,9 @@ class Database:
         """Створення нового питання. Повертає request_id"""
         request_id = str(uuid.uuid4())[:8].upper()
         await self._execute(
-            """INSERT INTO questions (request_id, user_id, question, status)
-               VALUES (?, ?, ?, 'pending')""",
-            (request_id, user_id, question)
+            """INSERT INTO questions (request_id, bot_id, user_id, question, status)
+               VALUES (?, ?, ?, ?, 'pending')""",
+            (request_id, self._bot(), user_id, question)
         )
         await self._commit()
         await self.update_rate_limit(user_id)
@@ -111,101 +589,406 @@ class Database:
     async def get_question(self, request_id: str) -> Optional[Dict[str, Any]]:
         """Отримання питання за ID"""
         cursor = await self._execute(
-            "SELECT * FROM questions WHERE request_id = ?", (request_id,)
+            "SELECT * FROM questions WHERE request_id = ? AND bot_id = ?",
+            (request_id, self._bot())
         )
         row = cursor.fetchone()
         return dict(row) if row else None
 
-    async def get_pending_questions(self) -> list:
-        """Список питань без відповіді"""
+    async def get_pending_questions(self, all_bots: bool = False) -> list:
+        """Список питань без відповіді (all_bots — усіх ботів, напр. для індексів при старті)"""
+        if all_bots:
+            cursor = await self._execute(
+                "SELECT * FROM questions WHERE status = 'pending' ORDER BY created_at, rowid"
+            )
+        else:
+            cursor = await self._execute(
+                "SELECT * FROM questions WHERE bot_id = ? AND status = 'pending' ORDER BY created_at, rowid",
+                (self._bot(),)
+            )
+        return [dict(row) for row in cursor.fetchall()]
+
+    async def count_pending(self) -> int:
+        """Кількість питань без відповіді (по індексу, без читання рядків)"""
         cursor = await self._execute(
-            "SELECT * FROM questions WHERE status = 'pending' ORDER BY created_at"
+            "SELECT COUNT(*) AS pending FROM questions WHERE bot_id = ? AND status = 'pending'",
+            (self._bot(),)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return cursor.fetchone()["pending"]
 
-    async def save_answer(self, request_id: str, answer: str) -> Optional[int]:
-        """Збереження відповіді. Повертає user_id для доставки"""
+    async def save_answers(
+        self,
+        request_ids: List[str],
+        answer: str,
+        publish: bool = False,
+        notify_chat_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Одна відповідь для кількох питань в одній транзакції разом із записами outbox.
+        publish — також поставити в чергу публікацію в канал (одну, для першого питання).
+        Повертає отримувачів: request_id, user_id та текст питання.
+        Час очікування кожного питання додається до скетчу затримки відповіді
+        """
+        def run(conn: sqlite3.Connection, bot_id: int):
+            rows = conn.execute(
+                """SELECT request_id, user_id, question,
+                          (julianday('now') - julianday(created_at)) * 86400 AS waited
+                   FROM questions
+                   WHERE bot_id = ? AND status = 'pending'
+                     AND request_id IN (SELECT value FROM json_each(?))""",
+                (bot_id, json.dumps(request_ids))
+            ).fetchall()
+            answered = [row["request_id"] for row in rows]
+            conn.executemany(
+                """UPDATE questions SET answer = ?, status = 'answered',
+                   answered_at = CURRENT_TIMESTAMP WHERE request_id = ?""",
+                [(answer, request_id) for request_id in answered]
+            )
+            now = time.time()
+            outbox = [(request_id, "answer", notify_chat_id, now, now) for request_id in answered]
+            if publish and answered:
+                main_id = request_ids[0] if request_ids[0] in answered else answered[0]
+                outbox.append((main_id, "channel", None, now, now))
+            conn.executemany(
+                """INSERT INTO outbox (request_id, kind, notify_chat_id, next_attempt_at, enqueued_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                outbox
+            )
+            _observe_latency(conn, "answer_sketch", [(bot_id, row["waited"]) for row in rows])
+            return [dict(row) for row in rows]
+
+        if not request_ids:
+            return []
+        return await self._transaction(run, self._bot())
+
+    async def filter_pending(self, request_ids: Optional[List[str]] = None) -> List[str]:
+        """ID питань без відповіді з переданих (None — усі), у порядку надходження"""
+        bot_id = self._bot()
+        if request_ids is None:
+            cursor = await self._execute(
+                "SELECT request_id FROM questions WHERE bot_id = ? AND status = 'pending' ORDER BY created_at, rowid",
+                (bot_id,)
+            )
+            return [row["request_id"] for row in cursor.fetchall()]
+
+        if not request_ids:
+            return []
+        # Один параметр-масив замість IN (?, ?, ...) — без ліміту кількості параметрів
         cursor = await self._execute(
-            "SELECT user_id FROM questions WHERE request_id = ? AND status = 'pending'",
-            (request_id,)
+            """SELECT request_id FROM questions
+               WHERE bot_id = ? AND status = 'pending'
+                 AND request_id IN (SELECT value FROM json_each(?))
+               ORDER BY created_at, rowid""",
+            (bot_id, json.dumps(request_ids))
         )
-        row = cursor.fetchone()
-        if not row:
-            return None
+        return [row["request_id"] for row in cursor.fetchall()]
+
+    async def search_pending(self, terms: str) -> List[str]:
+        """ID питань без відповіді, що відповідають пошуковому запиту"""
+        fts_query = build_fts_query(terms)
+        if not fts_query:
+            return []
+        cursor = await self._execute(
+            """SELECT q.request_id FROM questions_fts
+               JOIN questions q ON q.rowid = questions_fts.rowid
+               WHERE questions_fts MATCH ? AND q.bot_id = ? AND q.status = 'pending'
+               ORDER BY q.created_at, q.rowid""",
+            (fts_query, self._bot())
+        )
+        return [row["request_id"] for row in cursor.fetchall()]
+
+    async def reject_questions(self, request_ids: List[str]) -> int:
+        """
+        Відхилення питань без відповіді однією транзакцією: user_id видаляється одразу,
+        автор нічого не отримує. delivered_at — час закриття (для cleanup_old_data)
+        """
+        def run(conn: sqlite3.Connection, bot_id: int):
+            return conn.executemany(
+                """UPDATE questions SET status = 'rejected', user_id = -1,
+                   delivered_at = CURRENT_TIMESTAMP
+                   WHERE request_id = ? AND bot_id = ? AND status = 'pending'""",
+                [(request_id, bot_id) for request_id in request_ids]
+            ).rowcount
+
+        if not request_ids:
+            return 0
+        rejected = await self._transaction(run, self._bot())
+        logger.info(f"[АНОНІМНІСТЬ] Відхилено {rejected} питань, user_id видалено")
+        return rejected
+
+    async def delete_questions(self, request_ids: List[str]) -> int:
+        """Видалення питань без відповіді однією транзакцією (індекс пошуку — тригером)"""
+        def run(conn: sqlite3.Connection, bot_id: int):
+            return conn.executemany(
+                "DELETE FROM questions WHERE request_id = ? AND bot_id = ? AND status = 'pending'",
+                [(request_id, bot_id) for request_id in request_ids]
+            ).rowcount
+
+        if not request_ids:
+            return 0
+        return await self._transaction(run, self._bot())
+
+    async def save_rating(self, request_id: str, rating: int):
+        """Збереження рейтингу відповіді (лише першої оцінки) разом із щоденним лічильником"""
+        def run(conn: sqlite3.Connection, bot_id: int):
+            rated = conn.execute(
+                "UPDATE questions SET rating = ? WHERE request_id = ? AND bot_id = ? AND rating IS NULL",
+                (rating, request_id, bot_id)
+            ).rowcount
+            if rated:
+                conn.execute(
+                    """INSERT INTO daily_metrics (bot_id, day, rated_useful, rated_total) VALUES (?, ?, ?, 1)
+                       ON CONFLICT(bot_id, day) DO UPDATE SET
+                           rated_useful = rated_useful + excluded.rated_useful,
+                           rated_total = rated_total + 1""",
+                    (bot_id, _today(), rating)
+                )
+
+        await self._transaction(run, self._bot())
+
+    # ---- Черга доставки (outbox) ----
+
+    async def fetch_outbox_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Записи outbox усіх ботів, час спроби яких настав, разом з даними для надсилання"""
+        cursor = await self._execute(
+            """SELECT o.id, o.request_id, o.kind, o.notify_chat_id, o.attempts, o.last_error,
+                      q.bot_id, q.user_id, q.question, q.answer
+               FROM outbox o
+               JOIN questions q ON q.request_id = o.request_id
+               WHERE o.next_attempt_at <= ?
+               ORDER BY o.next_attempt_at
+               LIMIT ?""",
+            (time.time(), limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    async def complete_outbox(
+        self, outbox_ids: List[int], wipe_request_ids: List[str], delivered_ids: List[int] = ()
+    ):
+        """
+        Завершення записів outbox однією транзакцією: видалення з черги
+        та видалення user_id (після доставки або остаточної невдачі).
+        delivered_ids — успішно надіслані записи, їхня затримка доставки йде в скетч
+        """
+        def run(conn: sqlite3.Connection):
+            if delivered_ids:
+                rows = conn.execute(
+                    """SELECT q.bot_id, ? - o.enqueued_at FROM outbox o
+                       JOIN questions q ON q.request_id = o.request_id
+                       WHERE o.kind = 'answer' AND o.id IN (SELECT value FROM json_each(?))""",
+                    (time.time(), json.dumps(list(delivered_ids)))
+                ).fetchall()
+                _observe_latency(conn, "delivery_sketch", rows)
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in outbox_ids])
+            conn.executemany(
+                """UPDATE questions SET status = 'delivered',
+                   delivered_at = CURRENT_TIMESTAMP,
+                   user_id = -1
+                   WHERE request_id = ?""",
+                [(request_id,) for request_id in wipe_request_ids]
+            )
+
+        if not outbox_ids:
+            return
+        await self._transaction(run)
+        if wipe_request_ids:
+            logger.info(f"[АНОНІМНІСТЬ] user_id видалено для {len(wipe_request_ids)} запитів")
+
+    async def reschedule_outbox(self, retries: List[Tuple[int, float, str]]):
+        """Відкладення записів outbox: (id, час наступної спроби, помилка)"""
+        def run(conn: sqlite3.Connection):
+            conn.executemany(
+                """UPDATE outbox SET attempts = attempts + 1,
+                   next_attempt_at = ?, last_error = ? WHERE id = ?""",
+                [(next_at, error, outbox_id) for outbox_id, next_at, error in retries]
+            )
+
+        if retries:
+            await self._transaction(run)
+
+    async def count_outbox(self) -> int:
+        cursor = await self._execute("SELECT COUNT(*) AS total FROM outbox")
+        return cursor.fetchone()["total"]
+
+    # ---- Приклади для спам-класифікатора ----
 
-        user_id = row["user_id"]
+    async def add_spam_example(self, text: str, is_spam: bool):
         await self._execute(
-            """UPDATE questions SET answer = ?, status = 'answered',
-               answered_at = CURRENT_TIMESTAMP WHERE request_id = ?""",
-            (answer, request_id)
+            "INSERT INTO spam_examples (text, is_spam) VALUES (?, ?)",
+            (text, int(is_spam))
         )
         await self._commit()
-        return user_id
 
-    async def mark_delivered(self, request_id: str):
-        """Позначення відповіді як доставленої та видалення user_id"""
+    async def get_spam_examples(self, limit: int = 10000) -> List[Tuple[str, bool]]:
+        """Останні позначені приклади (text, is_spam)"""
+        cursor = await self._execute(
+            "SELECT text, is_spam FROM spam_examples ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [(row["text"], bool(row["is_spam"])) for row in cursor.fetchall()]
+
+    # ---- Панелі адмінів ----
+
+    async def get_dashboard(self, admin_id: int) -> Optional[int]:
+        """message_id закріпленої панелі адміна"""
+        cursor = await self._execute(
+            "SELECT message_id FROM admin_dashboards WHERE bot_id = ? AND admin_id = ?",
+            (self._bot(), admin_id)
+        )
+        row = cursor.fetchone()
+        return row["message_id"] if row else None
+
+    async def set_dashboard(self, admin_id: int, message_id: int):
         await self._execute(
-            """UPDATE questions SET status = 'delivered',
-               delivered_at = CURRENT_TIMESTAMP,
-               user_id = -1
-               WHERE request_id = ?""",
-            (request_id,)
+            """INSERT INTO admin_dashboards (bot_id, admin_id, message_id) VALUES (?, ?, ?)
+               ON CONFLICT(bot_id, admin_id) DO UPDATE SET message_id = excluded.message_id""",
+            (self._bot(), admin_id, message_id)
         )
         await self._commit()
-        logger.info(f"[АНОНІМНІСТЬ] user_id видалено для запиту {request_id}")
 
-    async def save_rating(self, request_id: str, rating: int):
-        """Збереження рейтингу відповіді"""
-        await self._execute(
-            "UPDATE questions SET rating = ? WHERE request_id = ?",
-            (rating, request_id)
+    # ---- Пошук ----
+
+    async def search_questions(
+        self, terms: str, limit: int = 5, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Повнотекстовий пошук. Повертає (кількість збігів, сторінка за bm25, за рівних — новіші)"""
+        fts_query = build_fts_query(terms)
+        if not fts_query:
+            return 0, []
+
+        bot_id = self._bot()
+        cursor = await self._execute(
+            """SELECT COUNT(*) AS total FROM questions_fts
+               JOIN questions q ON q.rowid = questions_fts.rowid
+               WHERE questions_fts MATCH ? AND q.bot_id = ?""",
+            (fts_query, bot_id)
+        )
+        total = cursor.fetchone()["total"]
+        if not total:
+            return 0, []
+
+        cursor = await self._execute(
+            """SELECT q.request_id, q.status, q.created_at,
+                      snippet(questions_fts, -1, ?, ?, '…', 16) AS snippet
+               FROM questions_fts
+               JOIN questions q ON q.rowid = questions_fts.rowid
+               WHERE questions_fts MATCH ? AND q.bot_id = ?
+               ORDER BY rank, q.rowid DESC
+               LIMIT ? OFFSET ?""",
+            (SNIPPET_OPEN, SNIPPET_CLOSE, fts_query, bot_id, limit, offset)
         )
+        return total, [dict(row) for row in cursor.fetchall()]
+
+    async def rebuild_search_index(self):
+        """Повна перебудова пошукового індексу"""
+        await self._execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
         await self._commit()
+        logger.info("Пошуковий індекс перебудовано")
 
     # ---- Статистика ----
 
-    async def get_stats(self) -> Dict[str, Any]:
-        """Статистика для адміна"""
+    async def count_questions(self) -> Dict[str, Any]:
         cursor = await self._execute("""
             SELECT
                 COUNT(*) as total,
-                SUM(CASE WHEN status IN ('answered', 'delivered') THEN 1 ELSE 0 END) as answered,
-                SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
-                AVG(CASE
-                    WHEN answered_at IS NOT NULL
-                    THEN CAST((julianday(answered_at) - julianday(created_at)) * 86400 AS INTEGER)
-                    ELSE NULL
-                END) as avg_seconds,
+                COALESCE(SUM(status IN ('answered', 'delivered')), 0) as answered,
+                COALESCE(SUM(status = 'pending'), 0) as pending,
                 MAX(created_at) as last_question
             FROM questions
-        """)
+            WHERE bot_id = ?
+        """, (self._bot(),))
         row = cursor.fetchone()
-        stats = dict(row) if row else {}
+        return dict(row) if row else {}
 
-        avg = stats.get("avg_seconds")
-        if avg:
-            mins = int(avg // 60)
-            stats["avg_time"] = f"{mins} хв" if mins < 60 else f"{mins // 60} год {mins % 60} хв"
-        else:
-            stats["avg_time"] = "—"
+    async def get_daily_metrics(self, since: str) -> List[Dict[str, Any]]:
+        cursor = await self._execute(
+            """SELECT answer_sketch, delivery_sketch, rated_useful, rated_total
+               FROM daily_metrics WHERE bot_id = ? AND day >= ?""",
+            (self._bot(), since)
+        )
+        return [
+            {
+                "answer": DDSketch.from_json(row["answer_sketch"]) if row["answer_sketch"] else None,
+                "delivery": DDSketch.from_json(row["delivery_sketch"]) if row["delivery_sketch"] else None,
+                "rated_useful": row["rated_useful"],
+                "rated_total": row["rated_total"],
+            }
+            for row in cursor.fetchall()
+        ]
 
-        last = stats.get("last_question")
-        if last:
-            try:
-                dt = datetime.fromisoformat(last)
-                stats["last_question"] = dt.strftime("%d.%m.%Y %H:%M")
-            except Exception:
-                pass
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        """Розміри файлів БД/WAL, сторінки, кеш та кількість рядків службових таблиць"""
+        def collect(conn):
+            def pragma(name: str):
+                return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+            return {
+                "page_size": pragma("page_size"),
+                "page_count": pragma("page_count"),
+                "freelist_count": pragma("freelist_count"),
+                "cache_size": pragma("cache_size"),
+                "rate_limits": conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0],
+                "outbox": conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0],
+                "questions": conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0],
+            }
 
+        stats = await self._transaction(collect)
+        stats["backend"] = self.backend
+        for key, path in (("file_bytes", self.db_path), ("wal_bytes", self.db_path + "-wal")):
+            stats[key] = os.path.getsize(path) if os.path.exists(path) else 0
         return stats
 
+    async def backup_to(self, target_path: str, pages: int = 64, sleep: float = 0.01) -> int:
+        """
+        Онлайн-копія через backup API кроками по pages сторінок з паузою sleep між ними.
+        Джерело — окреме read-only з'єднання (self._conn — лише під self._lock) з однією
+        транзакцією читання на всі кроки: копія — стан на її початок, а записи бота (WAL)
+        не чекають і не перезапускають копіювання. Копія — у режимі журналу DELETE
+        (без файлів -wal/-shm поруч). Повертає кількість кроків
+        """
+        steps = 0
+
+        def progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+            # sleep у Connection.backup діє лише при BUSY/LOCKED — паузу між кроками робимо тут
+            if remaining and sleep > 0:
+                time.sleep(sleep)
+
+        def run():
+            source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            target = sqlite3.connect(target_path)
+            try:
+                # Транзакція читання, відкрита до backup, не закривається між кроками
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                source.backup(target, pages=pages, progress=progress)
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+            return steps
+
+        return await asyncio.get_event_loop().run_in_executor(None, run)
+
+    def export_rows(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        status: Optional[str] = None,
+        bot_id: Optional[int] = None,
+    ) -> Iterator[Tuple]:
+        """Окреме read-only з'єднання відкривається вже в потоці, що читає рядки"""
+        return iter_questions(self.db_path, since=since, until=until, status=status, bot_id=bot_id)
+
     async def cleanup_old_data(self, days: int = 7):
         """Очищення старих доставлених даних"""
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        # delivered_at — CURRENT_TIMESTAMP (UTC), last_request — локальний isoformat
         await self._execute(
-            "DELETE FROM questions WHERE status = 'delivered' AND delivered_at < ?",
-            (cutoff,)
+            """DELETE FROM questions WHERE status IN ('delivered', 'rejected')
+               AND delivered_at < datetime('now', ?)""",
+            (f"-{days} days",)
         )
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         await self._execute(
             "DELETE FROM rate_limits WHERE last_request < ?",
             (cutoff,)
@@ -214,9 +997,34 @@ class Database:
         logger.info(f"Очищено старі дані старше {days} днів")
 
     async def close(self):
-        if self._conn:
-            self._conn.close()
-            logger.info("З'єднання з БД закрито")
+        """Дочекатися поточних операцій, перенести WAL в основний файл і закрити з'єднання"""
+        if not self._conn:
+            return
+        async with self._locked():
+            conn, self._conn = self._conn, None
+            try:
+                conn.commit()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                logger.error(f"Не вдалося виконати checkpoint БД: {e}")
+            conn.close()
+        logger.info("З'єднання з БД закрито")
+
+
+def create_database(backend: str, path: str) -> Database:
+    """Бекенд сховища за назвою: sqlite або memory"""
+    if backend == "sqlite":
+        return SQLiteDatabase(path)
+    if backend == "memory":
+        from services.memory_store import MemoryDatabase
+        return MemoryDatabase(
+            path,
+            flush_interval=settings.STORE_FLUSH_MS / 1000,
+            snapshot_interval=settings.STORE_SNAPSHOT_INTERVAL,
+            log_max_bytes=settings.STORE_LOG_MAX_MB << 20,
+            lock_timeout=settings.STORE_LOCK_TIMEOUT,
+        )
+    raise ValueError(f"Невідомий DB_BACKEND: {backend}")
 
 
-db = Database()
+db = create_database(settings.DB_BACKEND, settings.DB_PATH)
@@ -0,0 +1,136 @@
+"""
+Потоковий експорт історії питань у CSV / JSON Lines (без user_id)
+
+CLI: python -m services.exporter --format jsonl --out export.jsonl.gz --since 2024-01-01
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# user_id ніколи не експортується
+EXPORT_COLUMNS = (
+    "request_id", "question", "answer", "status",
+    "created_at", "answered_at", "delivered_at", "rating",
+)
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_STATUSES = ("pending", "answered", "delivered", "rejected")
+CHUNK_SIZE = 1000
+
+
+def parse_date(value: str) -> str:
+    """Перевірка дати у форматі YYYY-MM-DD"""
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def iter_questions(
+    db_path: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    status: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    bot_id: Optional[int] = None,
+) -> Iterator[Tuple]:
+    """
+    Рядки питань порціями через курсор окремого read-only з'єднання:
+    пам'ять не залежить від розміру таблиці, а WAL не блокує запис бота
+    """
+    conditions, params = [], []
+    if since:
+        conditions.append("created_at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("created_at < date(?, '+1 day')")
+        params.append(until)
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if bot_id is not None:
+        conditions.append("bot_id = ?")
+        params.append(bot_id)
+
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM questions"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at, rowid"
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def export_questions(
+    db_path: str,
+    out_path: str,
+    fmt: str = "csv",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    status: Optional[str] = None,
+    compress: bool = True,
+    bot_id: Optional[int] = None,
+) -> int:
+    """Експорт з файлу SQLite (CLI). Повертає кількість рядків"""
+    rows = iter_questions(db_path, since=since, until=until, status=status, bot_id=bot_id)
+    return write_export(rows, out_path, fmt, compress)
+
+
+def write_export(rows: Iterable[Tuple], out_path: str, fmt: str = "csv", compress: bool = True) -> int:
+    """Запис рядків EXPORT_COLUMNS у файл (gzip на льоту). Повертає кількість рядків"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Невідомий формат: {fmt}")
+
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(out_path, "wt", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n")
+                count += 1
+
+    logger.info(f"Експортовано {count} питань ({fmt})")
+    return count
+
+
+def main():
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Експорт історії питань (без user_id)")
+    parser.add_argument("--db", default=settings.DB_PATH, help="шлях до SQLite")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--out", required=True, help="файл результату")
+    parser.add_argument("--since", type=parse_date, help="з дати YYYY-MM-DD")
+    parser.add_argument("--until", type=parse_date, help="по дату YYYY-MM-DD включно")
+    parser.add_argument("--status", choices=EXPORT_STATUSES)
+    parser.add_argument("--no-gzip", action="store_true", help="без стиснення")
+    parser.add_argument("--bot-id", type=int, help="лише питання одного бота (режим BOTS_FILE)")
+    args = parser.parse_args()
+
+    count = export_questions(
+        args.db, args.out, fmt=args.format,
+        since=args.since, until=args.until, status=args.status,
+        compress=not args.no_gzip, bot_id=args.bot_id,
+    )
+    print(f"Експортовано {count} питань у {args.out}")
+
+
+if __name__ == "__main__":
+    main()
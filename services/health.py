@@ -0,0 +1,67 @@
+"""
+Liveness (/health), readiness (/ready) та діагностичний (/debug) ендпоінти вебхук-сервера
+"""
+import asyncio
+import hmac
+import time
+from aiohttp import web
+
+from config import settings
+
+from middlewares.api_monitor import api_monitor
+from middlewares.inflight import inflight
+from services.database import db
+from services.introspection import collect_debug_info
+from services.notifier import notifier
+
+_started_at = time.monotonic()
+
+READY_DB_TIMEOUT = 2.0
+
+
+async def health(request: web.Request) -> web.Response:
+    """Процес живий і event loop відповідає"""
+    return web.json_response({"status": "ok", "uptime": round(time.monotonic() - _started_at)})
+
+
+async def ready(request: web.Request) -> web.Response:
+    """Готовність приймати оновлення: БД доступна і Bot API відповідав"""
+    try:
+        db_ok = await asyncio.wait_for(db.ping(), timeout=READY_DB_TIMEOUT)
+    except Exception:
+        db_ok = False
+
+    api = api_monitor.snapshot()
+    is_ready = db_ok and api["last_success_ago"] is not None and not inflight.draining
+    return web.json_response(
+        {
+            "status": "ready" if is_ready else "not_ready",
+            "db": db_ok,
+            "draining": inflight.draining,
+            "in_flight": inflight.active,
+            "db_queue_depth": db.queue_depth,
+            "notify_queue_depth": notifier.queue_depth,
+            "outbox_depth": await db.count_outbox() if db_ok else None,
+            "bot_api": api,
+        },
+        status=200 if is_ready else 503,
+    )
+
+
+def debug_handler(storage):
+    """Те саме, що /debug в боті; доступ лише з X-Debug-Token"""
+    async def debug(request: web.Request) -> web.Response:
+        token = request.headers.get("X-Debug-Token", "")
+        # surrogateescape: байти заголовка, що не є UTF-8, aiohttp декодує як сурогати
+        if not hmac.compare_digest(token.encode(errors="surrogateescape"), settings.DEBUG_TOKEN.encode()):
+            return web.json_response({"error": "forbidden"}, status=403)
+        return web.json_response(await collect_debug_info(storage))
+
+    return debug
+
+
+def setup_health_routes(app: web.Application, storage=None):
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    if settings.DEBUG_TOKEN:
+        app.router.add_get("/debug", debug_handler(storage))
@@ -0,0 +1,118 @@
+"""
+Діагностика процесу без SSH: пам'ять, tracemalloc, задачі asyncio,
+розміри кешів і черг, стан файлів БД (для /debug та HTTP /debug)
+"""
+import asyncio
+import resource
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from middlewares.throttling import _flood_counter
+from services.database import db
+from services.notifier import notifier
+from services.raid_detector import raid_detector
+from services.similarity import similarity_index
+from services.spam_service import spam_service
+
+TOP_ALLOCATIONS = 10
+TOP_TASKS = 15
+TRACEMALLOC_FRAMES = 1
+
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def rss_bytes() -> int:
+    """Поточний RSS з /proc (Linux), інакше пікове значення з getrusage"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def allocation_diff() -> Dict[str, Any]:
+    """
+    Топ місць алокацій з моменту попереднього виклику.
+    Перший виклик лише вмикає tracemalloc (він сповільнює алокації, тож не активний з старту)
+    """
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        _last_snapshot = tracemalloc.take_snapshot()
+        return {"status": "started", "top": []}
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats = snapshot.compare_to(_last_snapshot, "lineno")
+    _last_snapshot = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "status": "tracing",
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:TOP_ALLOCATIONS]
+        ],
+    }
+
+
+def task_summary() -> List[Dict[str, Any]]:
+    """Живі задачі asyncio, згруповані за корутиною"""
+    groups = Counter()
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        groups[getattr(coro, "__qualname__", type(coro).__name__)] += 1
+    return [{"coro": name, "count": count} for name, count in groups.most_common(TOP_TASKS)]
+
+
+def fsm_storage_size(storage) -> Dict[str, int]:
+    """Записи MemoryStorage (ключі лишаються і після скидання стану)"""
+    records = getattr(storage, "storage", None)
+    if records is None:
+        return {}
+    return {
+        "keys": len(records),
+        "active": sum(1 for record in records.values() if record.state or record.data),
+    }
+
+
+def webhook_stats() -> Optional[Dict[str, Any]]:
+    """Лічильники прийому вебхука (aiohttp.web у режимі polling не імпортуємо)"""
+    if not settings.USE_WEBHOOK:
+        return None
+    from services.webhook import webhook_guard
+    return webhook_guard.stats()
+
+
+async def collect_debug_info(storage=None) -> Dict[str, Any]:
+    return {
+        "rss_bytes": rss_bytes(),
+        "tasks_total": len(asyncio.all_tasks()),
+        "tasks": task_summary(),
+        "allocations": allocation_diff(),
+        "caches": {
+            "flood_counter": len(_flood_counter),
+            "fsm_storage": fsm_storage_size(storage),
+            "similarity_index": len(similarity_index),
+            "raid_detector_bytes": raid_detector.memory_bytes,
+        },
+        "queues": {
+            "db_lock": db.queue_depth,
+            "notifier": notifier.queue_depth,
+            "spam": spam_service.queue_depth,
+        },
+        "db": await db.get_storage_stats(),
+        "webhook": webhook_stats(),
+    }
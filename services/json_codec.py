@@ -0,0 +1,44 @@
+"""
+JSON-кодек для оновлень і викликів Bot API: orjson, якщо встановлено, інакше stdlib json
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass(frozen=True)
+class JsonCodec:
+    name: str
+    loads: Callable[[Any], Any]
+    # aiogram і aiohttp очікують str
+    dumps: Callable[..., str]
+
+
+def _orjson_dumps(value: Any, **kwargs) -> str:
+    return orjson.dumps(value).decode()
+
+
+STDLIB = JsonCodec("json", json.loads, json.dumps)
+ORJSON = JsonCodec("orjson", orjson.loads, _orjson_dumps) if orjson else None
+
+
+def load_codec(backend: str = "auto") -> JsonCodec:
+    """auto — найшвидший доступний; недоступний явно вказаний бекенд — stdlib з попередженням"""
+    if backend in ("auto", "orjson") and ORJSON:
+        return ORJSON
+    if backend == "orjson":
+        logger.warning("JSON_BACKEND=orjson, але orjson не встановлено — використовується json")
+    return STDLIB
+
+
+json_codec = load_codec(settings.JSON_BACKEND)
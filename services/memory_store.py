@@ -0,0 +1,787 @@
+"""
+Сховище в пам'яті для невеликих розгортань (DB_BACKEND=memory): без executor і SQL на операцію.
+Кожна зміна — логічна операція: застосовується до стану одразу і дописується в журнал
+(JSON Lines), який записується пачками з fsync кожні STORE_FLUSH_MS. Зміни питань і outbox
+(груповий коміт) повертаються лише після fsync свого запису, як коміт у SQLite. Знімок стану
+періодично замінює журнал; при старті стан відновлюється зі знімка та решти журналу
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокування журналу недоступне
+    fcntl = None
+
+from services.database import Database, SEARCH_TOKEN, SNIPPET_OPEN, SNIPPET_CLOSE, fold_token, search_terms
+from services.exporter import EXPORT_COLUMNS
+from services.json_codec import json_codec
+from services.quantiles import DDSketch
+from services.tracing import traced_methods
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SNIPPET_TOKENS = 16
+# Параметри bm25() FTS5 за замовчуванням
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _timestamp(ts: Optional[float]) -> Optional[str]:
+    """Час у форматі CURRENT_TIMESTAMP SQLite (UTC) — словники такі самі, як у SQLiteDatabase"""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts)) if ts is not None else None
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+class _Question:
+    __slots__ = (
+        "request_id", "bot_id", "user_id", "question", "answer", "status",
+        "created_at", "answered_at", "delivered_at", "rating",
+    )
+
+    def __init__(self, request_id: str, bot_id: int, user_id: int, question: str, created_at: float):
+        self.request_id = request_id
+        self.bot_id = bot_id
+        self.user_id = user_id
+        self.question = question
+        self.answer: Optional[str] = None
+        self.status = "pending"
+        self.created_at = created_at
+        self.answered_at: Optional[float] = None
+        self.delivered_at: Optional[float] = None
+        self.rating: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id, "bot_id": self.bot_id, "user_id": self.user_id,
+            "question": self.question, "answer": self.answer, "status": self.status,
+            "created_at": _timestamp(self.created_at), "answered_at": _timestamp(self.answered_at),
+            "delivered_at": _timestamp(self.delivered_at), "rating": self.rating,
+        }
+
+    def dump(self) -> list:
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def load(cls, row: list) -> "_Question":
+        record = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, row):
+            setattr(record, name, value)
+        return record
+
+
+class _OutboxItem:
+    __slots__ = ("id", "request_id", "kind", "notify_chat_id", "attempts", "next_attempt_at", "last_error", "enqueued_at")
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def dump(self) -> list:
+        return [getattr(self, name) for name in self.__slots__]
+
+
+class _DailyMetrics:
+    __slots__ = ("answer", "delivery", "rated_useful", "rated_total")
+
+    def __init__(self):
+        self.answer = DDSketch()
+        self.delivery = DDSketch()
+        self.rated_useful = 0
+        self.rated_total = 0
+
+
+@traced_methods("db")
+class MemoryDatabase(Database):
+    """
+    Питання — записи зі __slots__ в словнику (порядок вставки = порядок надходження)
+    та індекси (bot_id, status). Журнал: [seq, операція, аргументи...]; знімок зберігає
+    seq останньої врахованої операції, тож повтор пропускає вже врахований хвіст журналу
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        db_path: str = "bot_data.db",
+        flush_interval: float = 0.05,
+        snapshot_interval: float = 600,
+        log_max_bytes: int = 16 << 20,
+        lock_timeout: float = 60,
+    ):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.log_max_bytes = log_max_bytes
+        self.lock_timeout = lock_timeout
+        self._reset()
+        self._pending: List[str] = []
+        # Очікувачі fsync поточної пачки (груповий коміт) і сигнал записати її негайно
+        self._waiters: List[asyncio.Future] = []
+        self._flush_wanted = asyncio.Event()
+        self._log = None
+        self._log_bytes = 0
+        self._snapshot_at = time.monotonic()
+        self._io_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _reset(self):
+        self._seq = 0
+        self._questions: Dict[str, _Question] = {}
+        self._by_status: Dict[Tuple[int, str], Dict[str, _Question]] = {}
+        self._rate_limits: Dict[Tuple[int, int], float] = {}
+        self._outbox: Dict[int, _OutboxItem] = {}
+        self._outbox_seq = 0
+        self._spam_examples: List[Tuple[str, bool]] = []
+        self._dashboards: Dict[Tuple[int, int], int] = {}
+        self._daily: Dict[Tuple[int, str], _DailyMetrics] = {}
+
+    @property
+    def log_path(self) -> str:
+        return self.db_path + ".log"
+
+    @property
+    def snapshot_path(self) -> str:
+        return self.db_path + ".snapshot"
+
+    # ---- Журнал і знімки ----
+
+    async def init(self):
+        """Знімок + повтор журналу, далі фонові запис журналу та знімки"""
+        async with self._io_lock:
+            log = open(self.log_path, "ab")
+            try:
+                await self._lock_log(log)
+                replayed = await asyncio.get_event_loop().run_in_executor(None, self._load)
+            except BaseException:
+                log.close()
+                raise
+            self._log = log
+            self._log_bytes = self._log.tell()
+            self._snapshot_at = time.monotonic()
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Сховище в пам'яті: {len(self._questions)} питань, "
+            f"повторено {replayed} операцій журналу ({self.db_path})"
+        )
+
+    async def _lock_log(self, log):
+        """
+        Ексклюзивне блокування журналу до close(). Два процеси на одному DB_PATH
+        (передача порту з WEBHOOK_REUSE_PORT) інакше писали б в один журнал з однаковими seq,
+        а знімок старого обрізав би журнал нового. Новий процес чекає, поки старий закриє сховище
+        """
+        if fcntl is None:
+            logger.warning("fcntl недоступний: сховище не захищене від другого процесу на тому ж DB_PATH")
+            return
+        deadline = time.monotonic() + self.lock_timeout
+        waiting = False
+        while True:
+            try:
+                fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(
+                        f"{self.log_path} зайнятий іншим процесом понад {self.lock_timeout:g} с"
+                    )
+                if not waiting:
+                    logger.info(f"{self.log_path} зайнятий іншим процесом, очікування його зупинки")
+                    waiting = True
+                await asyncio.sleep(0.1)
+
+    def _load(self) -> int:
+        self._reset()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                self._restore(json_codec.loads(f.read()))
+
+        replayed = 0
+        if not os.path.exists(self.log_path):
+            return replayed
+        with open(self.log_path, "rb+") as f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("запис без кінця рядка")
+                    seq, op, *args = json_codec.loads(line)
+                except ValueError:
+                    # Обірваний останній запис (збій під час запису) — відкидається
+                    logger.warning(f"Журнал пошкоджено після {offset} байт, хвіст відкинуто")
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                if seq <= self._seq:
+                    continue
+                getattr(self, f"_op_{op}")(*args)
+                self._seq = seq
+                replayed += 1
+        return replayed
+
+    def _apply(self, op: str, *args):
+        """Застосувати операцію до стану і поставити її в чергу запису журналу"""
+        result = getattr(self, f"_op_{op}")(*args)
+        self._seq += 1
+        self._pending.append(json_codec.dumps([self._seq, op, *args]))
+        return result
+
+    async def _commit(self, op: str, *args):
+        """_apply, що повертається після fsync запису: операції, які чекають разом, пишуться однією пачкою"""
+        result = self._apply(op, *args)
+        if self._flusher is None:
+            await self.flush()
+            return result
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._flush_wanted.set()
+        await waiter
+        return result
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                await self.flush()
+                snapshot_due = time.monotonic() - self._snapshot_at >= self.snapshot_interval
+                if self._log_bytes > self.log_max_bytes or (snapshot_due and self._log_bytes):
+                    await self.snapshot()
+            except Exception as e:
+                logger.error(f"Помилка запису журналу сховища: {e}")
+
+    async def flush(self):
+        """Записати накопичені операції однією пачкою з fsync"""
+        async with self._io_lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        waiters, self._waiters = self._waiters, []
+        data = ("\n".join(batch) + "\n").encode()
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._write_log, data)
+        except Exception as e:
+            # Операції лишаються в черзі для наступної спроби, але їхні виклики не підтверджуються
+            self._pending[:0] = batch
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            raise
+        self._log_bytes += len(data)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _write_log(self, data: bytes):
+        self._log.write(data)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+    async def snapshot(self):
+        """
+        Знімок стану з атомарною заміною файлу, після чого журнал обрізається (стиснення).
+        Операції, що надійшли під час запису знімка, лишаються в черзі журналу
+        """
+        async with self._io_lock:
+            await self._flush_locked()
+            # Копія стану — на event loop (атомарно щодо операцій), серіалізація і запис — у потоці
+            state = self._dump()
+            size = await asyncio.get_event_loop().run_in_executor(None, self._write_snapshot, state)
+            self._log_bytes = 0
+            self._snapshot_at = time.monotonic()
+        logger.info(f"Знімок сховища: {size / 1024:.0f} КБ, seq {state['seq']}")
+
+    def _write_snapshot(self, state: Dict[str, Any]) -> int:
+        data = json_codec.dumps(state).encode()
+        staged = self.snapshot_path + ".tmp"
+        with open(staged, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staged, self.snapshot_path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.snapshot_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        # Усе з журналу вже у знімку: збій до цього місця лише повторить пропущені записи
+        self._log.truncate(0)
+        os.fsync(self._log.fileno())
+        return len(data)
+
+    def _dump(self) -> Dict[str, Any]:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "seq": self._seq,
+            "outbox_seq": self._outbox_seq,
+            "questions": [q.dump() for q in self._questions.values()],
+            "rate_limits": [[bot_id, user_id, ts] for (bot_id, user_id), ts in self._rate_limits.items()],
+            "outbox": [item.dump() for item in self._outbox.values()],
+            "spam_examples": [[text, is_spam] for text, is_spam in self._spam_examples],
+            "dashboards": [[bot_id, admin_id, message_id] for (bot_id, admin_id), message_id in self._dashboards.items()],
+            "daily": [
+                [bot_id, day, m.answer.to_json(), m.delivery.to_json(), m.rated_useful, m.rated_total]
+                for (bot_id, day), m in self._daily.items()
+            ],
+        }
+
+    def _restore(self, state: Dict[str, Any]):
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Невідома версія знімка: {state.get('version')}")
+        self._seq = state["seq"]
+        self._outbox_seq = state["outbox_seq"]
+        for row in state["questions"]:
+            self._index(_Question.load(row))
+        self._rate_limits = {(bot_id, user_id): ts for bot_id, user_id, ts in state["rate_limits"]}
+        self._outbox = {row[0]: _OutboxItem(*row) for row in state["outbox"]}
+        self._spam_examples = [(text, bool(is_spam)) for text, is_spam in state["spam_examples"]]
+        self._dashboards = {(bot_id, admin_id): message_id for bot_id, admin_id, message_id in state["dashboards"]}
+        for bot_id, day, answer, delivery, useful, total in state["daily"]:
+            metrics = self._daily[(bot_id, day)] = _DailyMetrics()
+            metrics.answer = DDSketch.from_json(answer)
+            metrics.delivery = DDSketch.from_json(delivery)
+            metrics.rated_useful, metrics.rated_total = useful, total
+
+    async def close(self):
+        """Останній знімок (журнал після нього порожній) і закриття файлу"""
+        if self._log is None:
+            return
+        if self._flusher:
+            # Скасування не посеред запису пачки: її очікувачі інакше не отримали б підтвердження
+            async with self._io_lock:
+                self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            if self._pending or self._log_bytes or not os.path.exists(self.snapshot_path):
+                await self.snapshot()
+        except Exception as e:
+            logger.error(f"Не вдалося зберегти знімок сховища: {e}")
+            await self.flush()
+        self._log.close()
+        self._log = None
+        logger.info("Сховище в пам'яті закрито")
+
+    async def ping(self) -> bool:
+        return self._log is not None
+
+    @property
+    def queue_depth(self) -> int:
+        """Операції, ще не записані в журнал"""
+        return len(self._pending)
+
+    # ---- Індекси ----
+
+    def _index(self, q: _Question):
+        self._questions[q.request_id] = q
+        self._by_status.setdefault((q.bot_id, q.status), {})[q.request_id] = q
+
+    def _set_status(self, q: _Question, status: str):
+        self._by_status[(q.bot_id, q.status)].pop(q.request_id, None)
+        q.status = status
+        self._by_status.setdefault((q.bot_id, status), {})[q.request_id] = q
+
+    def _remove(self, q: _Question):
+        self._by_status[(q.bot_id, q.status)].pop(q.request_id, None)
+        del self._questions[q.request_id]
+
+    def _with_status(self, bot_id: int, status: str) -> Dict[str, _Question]:
+        return self._by_status.get((bot_id, status), {})
+
+    def _metrics(self, bot_id: int, ts: float) -> _DailyMetrics:
+        key = (bot_id, _day(ts))
+        if key not in self._daily:
+            self._daily[key] = _DailyMetrics()
+        return self._daily[key]
+
+    # ---- Операції журналу (аргументи — лише JSON-значення, результат детермінований) ----
+
+    def _op_rate(self, bot_id: int, user_id: int, ts: float):
+        self._rate_limits[(bot_id, user_id)] = ts
+
+    def _op_create(self, request_id: str, bot_id: int, user_id: int, question: str, ts: float):
+        self._index(_Question(request_id, bot_id, user_id, question, ts))
+        self._rate_limits[(bot_id, user_id)] = ts
+
+    def _op_answer(
+        self, bot_id: int, request_ids: List[str], answer: str,
+        publish: bool, notify_chat_id: Optional[int], ts: float,
+    ) -> List[Dict[str, Any]]:
+        pending = self._with_status(bot_id, "pending")
+        answered = [pending[request_id] for request_id in dict.fromkeys(request_ids) if request_id in pending]
+        metrics = self._metrics(bot_id, ts) if answered else None
+        for q in answered:
+            q.answer = answer
+            q.answered_at = ts
+            self._set_status(q, "answered")
+            self._enqueue(q.request_id, "answer", notify_chat_id, ts)
+            metrics.answer.add(max(ts - q.created_at, 0.0))
+        if publish and answered:
+            self._enqueue(answered[0].request_id, "channel", None, ts)
+        return [{"request_id": q.request_id, "user_id": q.user_id, "question": q.question} for q in answered]
+
+    def _enqueue(self, request_id: str, kind: str, notify_chat_id: Optional[int], ts: float):
+        self._outbox_seq += 1
+        self._outbox[self._outbox_seq] = _OutboxItem(
+            self._outbox_seq, request_id, kind, notify_chat_id, 0, ts, None, ts
+        )
+
+    def _op_reject(self, bot_id: int, request_ids: List[str], ts: float) -> int:
+        pending = self._with_status(bot_id, "pending")
+        rejected = [pending[request_id] for request_id in dict.fromkeys(request_ids) if request_id in pending]
+        for q in rejected:
+            q.user_id = -1
+            q.delivered_at = ts
+            self._set_status(q, "rejected")
+        return len(rejected)
+
+    def _op_delete(self, bot_id: int, request_ids: List[str]) -> int:
+        pending = self._with_status(bot_id, "pending")
+        deleted = [pending[request_id] for request_id in dict.fromkeys(request_ids) if request_id in pending]
+        for q in deleted:
+            self._remove(q)
+        return len(deleted)
+
+    def _op_deliver(self, request_ids: List[str], ts: float):
+        for request_id in request_ids:
+            q = self._questions.get(request_id)
+            if q is not None:
+                q.user_id = -1
+                q.delivered_at = ts
+                self._set_status(q, "delivered")
+
+    def _op_rating(self, bot_id: int, request_id: str, rating: int, ts: float):
+        q = self._questions.get(request_id)
+        if q is None or q.bot_id != bot_id or q.rating is not None:
+            return
+        q.rating = rating
+        metrics = self._metrics(bot_id, ts)
+        metrics.rated_useful += rating
+        metrics.rated_total += 1
+
+    def _op_complete(self, outbox_ids: List[int], wipe_request_ids: List[str], delivered_ids: List[int], ts: float):
+        for outbox_id in delivered_ids:
+            item = self._outbox.get(outbox_id)
+            q = self._questions.get(item.request_id) if item else None
+            if q is not None and item.kind == "answer" and item.enqueued_at is not None:
+                self._metrics(q.bot_id, ts).delivery.add(max(ts - item.enqueued_at, 0.0))
+        for outbox_id in outbox_ids:
+            self._outbox.pop(outbox_id, None)
+        self._op_deliver(wipe_request_ids, ts)
+
+    def _op_reschedule(self, retries: List[list]):
+        for outbox_id, next_at, error in retries:
+            item = self._outbox.get(outbox_id)
+            if item is not None:
+                item.attempts += 1
+                item.next_attempt_at = next_at
+                item.last_error = error
+
+    def _op_spam(self, text: str, is_spam: bool):
+        self._spam_examples.append((text, is_spam))
+
+    def _op_dashboard(self, bot_id: int, admin_id: int, message_id: int):
+        self._dashboards[(bot_id, admin_id)] = message_id
+
+    def _op_cleanup(self, cutoff: float):
+        for q in list(self._questions.values()):
+            if q.status in ("delivered", "rejected") and q.delivered_at is not None and q.delivered_at < cutoff:
+                self._remove(q)
+        self._rate_limits = {key: ts for key, ts in self._rate_limits.items() if ts >= cutoff}
+
+    # ---- Rate Limiting ----
+
+    async def check_rate_limit(self, user_id: int, limit_seconds: int) -> Optional[int]:
+        last_request = self._rate_limits.get((self._bot(), user_id))
+        if last_request is None:
+            return None
+        elapsed = time.time() - last_request
+        if elapsed < limit_seconds:
+            return int(limit_seconds - elapsed)
+        return None
+
+    async def update_rate_limit(self, user_id: int):
+        self._apply("rate", self._bot(), user_id, time.time())
+
+    # ---- Questions ----
+
+    async def create_question(self, user_id: int, question: str) -> str:
+        request_id = str(uuid.uuid4())[:8].upper()
+        await self._commit("create", request_id, self._bot(), user_id, question, time.time())
+        return request_id
+
+    async def get_question(self, request_id: str) -> Optional[Dict[str, Any]]:
+        q = self._questions.get(request_id)
+        return q.as_dict() if q is not None and q.bot_id == self._bot() else None
+
+    async def get_pending_questions(self, all_bots: bool = False) -> list:
+        if not all_bots:
+            return [q.as_dict() for q in self._with_status(self._bot(), "pending").values()]
+        pending = chain.from_iterable(
+            questions.values() for (_, status), questions in self._by_status.items() if status == "pending"
+        )
+        return [q.as_dict() for q in sorted(pending, key=lambda q: q.created_at)]
+
+    async def count_pending(self) -> int:
+        return len(self._with_status(self._bot(), "pending"))
+
+    async def save_answers(
+        self,
+        request_ids: List[str],
+        answer: str,
+        publish: bool = False,
+        notify_chat_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        if not request_ids:
+            return []
+        return await self._commit("answer", self._bot(), request_ids, answer, publish, notify_chat_id, time.time())
+
+    async def filter_pending(self, request_ids: Optional[List[str]] = None) -> List[str]:
+        pending = self._with_status(self._bot(), "pending")
+        if request_ids is None:
+            return list(pending)
+        wanted = set(request_ids)
+        return [request_id for request_id in pending if request_id in wanted]
+
+    async def search_pending(self, terms: str) -> List[str]:
+        prefixes = search_terms(terms)
+        if not prefixes:
+            return []
+        return [
+            q.request_id for q in self._with_status(self._bot(), "pending").values()
+            if _matches(q, prefixes)
+        ]
+
+    async def reject_questions(self, request_ids: List[str]) -> int:
+        if not request_ids:
+            return 0
+        rejected = await self._commit("reject", self._bot(), request_ids, time.time())
+        logger.info(f"[АНОНІМНІСТЬ] Відхилено {rejected} питань, user_id видалено")
+        return rejected
+
+    async def delete_questions(self, request_ids: List[str]) -> int:
+        if not request_ids:
+            return 0
+        return await self._commit("delete", self._bot(), request_ids)
+
+    async def save_rating(self, request_id: str, rating: int):
+        self._apply("rating", self._bot(), request_id, rating, time.time())
+
+    # ---- Черга доставки (outbox) ----
+
+    async def fetch_outbox_due(self, limit: int) -> List[Dict[str, Any]]:
+        now = time.time()
+        due = sorted(
+            (item for item in self._outbox.values()
+             if item.next_attempt_at <= now and item.request_id in self._questions),
+            key=lambda item: item.next_attempt_at,
+        )[:limit]
+        batch = []
+        for item in due:
+            q = self._questions[item.request_id]
+            batch.append({
+                "id": item.id, "request_id": item.request_id, "kind": item.kind,
+                "notify_chat_id": item.notify_chat_id, "attempts": item.attempts,
+                "last_error": item.last_error,
+                "bot_id": q.bot_id, "user_id": q.user_id, "question": q.question, "answer": q.answer,
+            })
+        return batch
+
+    async def complete_outbox(
+        self, outbox_ids: List[int], wipe_request_ids: List[str], delivered_ids: List[int] = ()
+    ):
+        if not outbox_ids:
+            return
+        await self._commit("complete", outbox_ids, wipe_request_ids, list(delivered_ids), time.time())
+        if wipe_request_ids:
+            logger.info(f"[АНОНІМНІСТЬ] user_id видалено для {len(wipe_request_ids)} запитів")
+
+    async def reschedule_outbox(self, retries: List[Tuple[int, float, str]]):
+        if retries:
+            self._apply("reschedule", [list(retry) for retry in retries])
+
+    async def count_outbox(self) -> int:
+        return len(self._outbox)
+
+    # ---- Спам-класифікатор і панелі адмінів ----
+
+    async def add_spam_example(self, text: str, is_spam: bool):
+        self._apply("spam", text, bool(is_spam))
+
+    async def get_spam_examples(self, limit: int = 10000) -> List[Tuple[str, bool]]:
+        return self._spam_examples[::-1][:limit]
+
+    async def get_dashboard(self, admin_id: int) -> Optional[int]:
+        return self._dashboards.get((self._bot(), admin_id))
+
+    async def set_dashboard(self, admin_id: int, message_id: int):
+        self._apply("dashboard", self._bot(), admin_id, message_id)
+
+    # ---- Пошук ----
+
+    async def search_questions(
+        self, terms: str, limit: int = 5, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Перебір усіх записів з оцінкою bm25, як rank у FTS5: статистика (кількість рядків,
+        середня довжина, рядки з кожним словом) — по всій таблиці, як в індексі. За рівних — новіші
+        """
+        prefixes = search_terms(terms)
+        if not prefixes:
+            return 0, []
+        bot_id = self._bot()
+        total_tokens = 0
+        rows_with = [0] * len(prefixes)
+        found = []
+        for position, q in enumerate(self._questions.values()):
+            words = _words(q)
+            total_tokens += len(words)
+            hits = [sum(1 for word in words if word.startswith(prefix)) for prefix in prefixes]
+            for i, count in enumerate(hits):
+                if count:
+                    rows_with[i] += 1
+            if q.bot_id == bot_id and all(hits):
+                found.append((hits, len(words), position, q))
+        if not found:
+            return 0, []
+
+        rows = len(self._questions)
+        idf = [math.log((rows - n + 0.5) / (n + 0.5)) for n in rows_with]
+        idf = [value if value > 0 else 1e-6 for value in idf]
+        avgdl = total_tokens / rows
+        found.sort(key=lambda item: (_bm25(item[0], item[1], idf, avgdl), -item[2]))
+        page = [
+            {
+                "request_id": q.request_id, "status": q.status, "created_at": _timestamp(q.created_at),
+                "snippet": _snippet(q, prefixes),
+            }
+            for _, _, _, q in found[offset:offset + limit]
+        ]
+        return len(found), page
+
+    async def rebuild_search_index(self):
+        """Індексу немає: пошук перебирає записи"""
+
+    # ---- Статистика, експорт, обслуговування ----
+
+    async def count_questions(self) -> Dict[str, Any]:
+        bot_id = self._bot()
+        counts = {status: len(questions) for (bot, status), questions in self._by_status.items() if bot == bot_id}
+        # Словник упорядкований за надходженням: останнє питання бота — з кінця
+        last = next((q for q in reversed(self._questions.values()) if q.bot_id == bot_id), None)
+        return {
+            "total": sum(counts.values()),
+            "answered": counts.get("answered", 0) + counts.get("delivered", 0),
+            "pending": counts.get("pending", 0),
+            "last_question": _timestamp(last.created_at) if last else None,
+        }
+
+    async def get_daily_metrics(self, since: str) -> List[Dict[str, Any]]:
+        bot_id = self._bot()
+        return [
+            {
+                "answer": metrics.answer, "delivery": metrics.delivery,
+                "rated_useful": metrics.rated_useful, "rated_total": metrics.rated_total,
+            }
+            for (bot, day), metrics in self._daily.items() if bot == bot_id and day >= since
+        ]
+
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        def size(path: str) -> int:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        return {
+            "backend": self.backend,
+            "rate_limits": len(self._rate_limits),
+            "outbox": len(self._outbox),
+            "questions": len(self._questions),
+            "file_bytes": size(self.snapshot_path),
+            "wal_bytes": size(self.log_path),
+            "log_pending": len(self._pending),
+            "seq": self._seq,
+            "snapshot_age": round(time.monotonic() - self._snapshot_at),
+        }
+
+    def export_rows(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        status: Optional[str] = None,
+        bot_id: Optional[int] = None,
+    ) -> Iterator[Tuple]:
+        """Рядки збираються одразу (у потоці експорту стан змінювався б під час перебору)"""
+        next_day = (datetime.strptime(until, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d") if until else None
+        rows = []
+        for q in sorted(self._questions.values(), key=lambda q: q.created_at):
+            record = q.as_dict()
+            if (since and record["created_at"] < since) or (next_day and record["created_at"] >= next_day):
+                continue
+            if (status and q.status != status) or (bot_id is not None and q.bot_id != bot_id):
+                continue
+            rows.append(tuple(record[column] for column in EXPORT_COLUMNS))
+        return iter(rows)
+
+    async def cleanup_old_data(self, days: int = 7):
+        self._apply("cleanup", time.time() - days * 86400)
+        logger.info(f"Очищено старі дані старше {days} днів")
+
+
+def _words(q: _Question) -> List[str]:
+    return search_terms(q.question) + (search_terms(q.answer) if q.answer else [])
+
+
+def _matches(q: _Question, prefixes: List[str]) -> bool:
+    """Кожне шукане слово — префікс хоча б одного слова питання чи відповіді"""
+    words = _words(q)
+    return all(any(word.startswith(prefix) for word in words) for prefix in prefixes)
+
+
+def _bm25(hits: List[int], size: int, idf: List[float], avgdl: float) -> float:
+    """Формула fts5_bm25 (від'ємна, менша — релевантніша) з тим самим порядком операцій"""
+    score = 0.0
+    for freq, weight in zip(hits, idf):
+        score += weight * ((freq * (BM25_K1 + 1.0)) / (freq + BM25_K1 * (1 - BM25_B + BM25_B * size / avgdl)))
+    return -1.0 * score
+
+
+def _snippet(q: _Question, prefixes: List[str]) -> str:
+    """Фрагмент до SNIPPET_TOKENS слів навколо першого збігу з маркерами, як snippet() FTS5"""
+    for text in (q.question, q.answer or ""):
+        words = list(SEARCH_TOKEN.finditer(text))
+        hits = [i for i, word in enumerate(words) if fold_token(word.group()).startswith(tuple(prefixes))]
+        if hits:
+            break
+    else:
+        return ""
+
+    start = max(0, min(hits[0] - 2, len(words) - SNIPPET_TOKENS))
+    end = min(len(words), start + SNIPPET_TOKENS)
+    parts, cursor = [], words[start].start()
+    for i in range(start, end):
+        word = words[i]
+        parts.append(text[cursor:word.start()])
+        parts.append(SNIPPET_OPEN + word.group() + SNIPPET_CLOSE if i in hits else word.group())
+        cursor = word.end()
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(words) else text[cursor:]
+    return prefix + "".join(parts) + suffix
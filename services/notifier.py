@@ -0,0 +1,179 @@
+"""
+Адаптивні сповіщення адмінів: миттєво при низькому навантаженні,
+дайджестами та закріпленою панеллю під час сплесків
+"""
+import asyncio
+import html
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from config import settings, current_config, bot_context, TEXTS
+from services.database import db
+from services.tracing import tracer
+from utils.keyboards import admin_reply_keyboard, admin_digest_keyboard
+
+logger = logging.getLogger(__name__)
+
+DIGEST_CHUNK = 10           # Питань в одному повідомленні дайджесту
+DIGEST_PREVIEW_LENGTH = 300  # Щоб дайджест вмістився в ліміт 4096 символів
+
+
+class _DigestState:
+    __slots__ = ("recent", "buffer", "flush_task")
+
+    def __init__(self):
+        self.recent: Deque[float] = deque()
+        self.buffer: List[Dict] = []
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class AdminNotifier:
+    """
+    Розсилка нових питань адмінам.
+    Якщо за вікно надійшло більше burst_threshold питань, нові питання
+    накопичуються і раз на вікно надсилаються одним дайджестом кожному адміну,
+    а закріплена панель редагується замість надсилання нових повідомлень.
+    Стан сплеску і буфер ведуться окремо для кожного бота.
+    """
+
+    def __init__(self, burst_threshold: int = 10, window: float = 60):
+        self.burst_threshold = burst_threshold
+        self.window = window
+        self._states: Dict[int, _DigestState] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(state.buffer) for state in self._states.values())
+
+    def _state(self, bot: Bot) -> _DigestState:
+        state = self._states.get(bot.id)
+        if state is None:
+            state = self._states[bot.id] = _DigestState()
+        return state
+
+    def _is_burst(self, state: _DigestState) -> bool:
+        now = time.monotonic()
+        state.recent.append(now)
+        while state.recent and now - state.recent[0] > self.window:
+            state.recent.popleft()
+        return len(state.recent) > self.burst_threshold
+
+    async def notify(self, bot: Bot, request_id: str, question: str, similar: int = 0):
+        """Сповіщення про нове питання"""
+        state = self._state(bot)
+        if not self._is_burst(state) and not state.buffer:
+            await self._send_instant(bot, request_id, question, similar)
+            return
+
+        state.buffer.append({"request_id": request_id, "question": question, "similar": similar})
+        if state.flush_task is None or state.flush_task.done():
+            logger.info("Сплеск питань: сповіщення перемкнено в режим дайджесту")
+            # Задача успадковує контекст оновлення — налаштування саме цього бота
+            state.flush_task = asyncio.create_task(self._flush_later(bot))
+
+    async def _send_instant(self, bot: Bot, request_id: str, question: str, similar: int):
+        text = TEXTS["admin_new_question"].format(
+            request_id=request_id,
+            question=question,
+            similar=TEXTS["admin_similar_questions"].format(count=similar) if similar else ""
+        )
+        admin_ids = current_config().ADMIN_IDS
+        with tracer.span("notify.admins", admins=len(admin_ids)):
+            for admin_id in admin_ids:
+                try:
+                    await bot.send_message(
+                        admin_id,
+                        text,
+                        reply_markup=admin_reply_keyboard(request_id, similar),
+                        parse_mode="HTML"
+                    )
+                except Exception as e:
+                    logger.error(f"Не вдалося надіслати питання адміну {admin_id}: {e}")
+
+    async def _flush_later(self, bot: Bot):
+        await asyncio.sleep(self.window)
+        await self.flush(bot)
+
+    async def flush(self, bot: Bot):
+        """Надсилання накопиченого дайджесту та оновлення панелей"""
+        state = self._state(bot)
+        items, state.buffer = state.buffer, []
+        if not items:
+            return
+
+        for start in range(0, len(items), DIGEST_CHUNK):
+            chunk = items[start:start + DIGEST_CHUNK]
+            text = TEXTS["admin_digest"].format(
+                count=len(chunk),
+                items="".join(self._format_item(item) for item in chunk)
+            )
+            keyboard = admin_digest_keyboard([item["request_id"] for item in chunk])
+            for admin_id in current_config().ADMIN_IDS:
+                try:
+                    await bot.send_message(admin_id, text, reply_markup=keyboard, parse_mode="HTML")
+                except Exception as e:
+                    logger.error(f"Не вдалося надіслати дайджест адміну {admin_id}: {e}")
+
+        logger.info(f"Дайджест надіслано: {len(items)} питань")
+        await self.update_dashboards(bot)
+
+    @staticmethod
+    def _format_item(item: Dict) -> str:
+        question = item["question"]
+        if len(question) > DIGEST_PREVIEW_LENGTH:
+            question = question[:DIGEST_PREVIEW_LENGTH] + "..."
+        similar = f" · 👥 +{item['similar']}" if item["similar"] else ""
+        return TEXTS["admin_digest_item"].format(
+            request_id=item["request_id"],
+            similar=similar,
+            question=html.escape(question)
+        )
+
+    async def update_dashboards(self, bot: Bot):
+        """Редагування закріпленої панелі кожного адміна (створюється за потреби)"""
+        burst = len(self._state(bot).recent) > self.burst_threshold
+        text = TEXTS["admin_dashboard"].format(
+            pending=await db.count_pending(),
+            mode="дайджест" if burst else "миттєвий",
+            updated=datetime.now().strftime("%H:%M:%S")
+        )
+        for admin_id in current_config().ADMIN_IDS:
+            message_id = await db.get_dashboard(admin_id)
+            if message_id:
+                try:
+                    await bot.edit_message_text(
+                        text, chat_id=admin_id, message_id=message_id, parse_mode="HTML"
+                    )
+                    continue
+                except Exception as e:
+                    if isinstance(e, TelegramBadRequest) and "not modified" in str(e):
+                        continue
+                    # Панель видалена або недоступна — створюємо нову
+                    logger.debug(f"Панель адміна {admin_id} не оновлено: {e}")
+            try:
+                message = await bot.send_message(admin_id, text, parse_mode="HTML")
+                await db.set_dashboard(admin_id, message.message_id)
+                await bot.pin_chat_message(admin_id, message.message_id, disable_notification=True)
+            except Exception as e:
+                logger.error(f"Не вдалося створити панель адміна {admin_id}: {e}")
+
+    async def close(self, bots: List[Bot]):
+        """Надсилання залишку дайджестів при зупинці"""
+        for bot in bots:
+            state = self._state(bot)
+            if state.flush_task and not state.flush_task.done():
+                state.flush_task.cancel()
+            with bot_context(bot.id):
+                await self.flush(bot)
+
+
+notifier = AdminNotifier(
+    burst_threshold=settings.NOTIFY_BURST_THRESHOLD,
+    window=settings.NOTIFY_DIGEST_WINDOW,
+)
@@ -0,0 +1,243 @@
+"""
+Фонова доставка відповідей з черги outbox з повторними спробами
+"""
+import asyncio
+import html
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+)
+
+from config import settings, current_config, bot_context, bot_partition, TEXTS
+from services.database import db
+from utils.keyboards import rating_keyboard
+
+logger = logging.getLogger(__name__)
+
+# Помилки, після яких повторна спроба не допоможе (бот заблоковано, чат не існує)
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramNotFound)
+# Серед BadRequest остаточні лише ці; решта (напр. розбір HTML) — вада повідомлення, не отримувача
+PERMANENT_BAD_REQUESTS = ("chat not found", "blocked")
+
+
+def is_permanent(error: TelegramBadRequest) -> bool:
+    message = error.message.lower()
+    return any(marker in message for marker in PERMANENT_BAD_REQUESTS)
+
+
+class SendPacer:
+    """Рівномірні інтервали між надсиланнями одного бота (rate повідомлень за секунду, 0 — без ліміту)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class DeliveryWorker:
+    """
+    Забирає записи outbox пачками і надсилає їх.
+    Тимчасові помилки — експоненційна затримка з джитером, RetryAfter — затримка від Telegram,
+    постійні помилки або вичерпані спроби — запис завершується з видаленням user_id.
+    Інші BadRequest — запис відкладається як для невідомого бота, user_id лишається, адміну звіт.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        idle_interval: float = 5.0,
+        base_delay: float = 5.0,
+        max_delay: float = 3600.0,
+        max_attempts: int = 10,
+        concurrency: int = 8,
+        rate: float = 25.0,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.idle_interval = idle_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._bots: Dict[int, Bot] = {}
+        self._pacers: Dict[int, SendPacer] = {}
+
+    def start(self, bots: List[Bot]):
+        """Одна черга на всі боти процесу; запис надсилається ботом свого розділу"""
+        self._stopping = False
+        self._bots = {bot_partition(bot.id): bot for bot in bots}
+        self._pacers = {partition: SendPacer(self.rate) for partition in self._bots}
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Нові записи в черзі — не чекати наступного опитування"""
+        self._wakeup.set()
+
+    async def stop(self):
+        """Завершити поточну пачку і зупинитися (решта лишається в outbox)"""
+        if not self._task:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                batch = await db.fetch_outbox_due(self.batch_size)
+            except Exception as e:
+                logger.error(f"Помилка читання outbox: {e}")
+                batch = []
+
+            if batch:
+                try:
+                    await self._process(batch)
+                except Exception as e:
+                    logger.error(f"Помилка обробки outbox: {e}", exc_info=True)
+                    await asyncio.sleep(self.idle_interval)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.base_delay * (2 ** attempts), self.max_delay)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _process(self, batch: List[Dict]):
+        """Пачка надсилається паралельно (не більше concurrency), з темпом SendPacer на бота"""
+        done: List[int] = []
+        delivered: List[int] = []
+        wipe: List[str] = []
+        retries: List[Tuple[int, float, str]] = []
+        failed: List[Dict] = []
+        rejected: List[Tuple[Dict, str]] = []
+        limit = asyncio.Semaphore(self.concurrency)
+        # Після RetryAfter решту пачки не надсилаємо до кінця паузи
+        paused_until = 0.0
+
+        async def deliver(item: Dict):
+            nonlocal paused_until
+            bot = self._bots.get(item["bot_id"])
+            if bot is None:
+                # Бота прибрано з BOTS_FILE — запис чекає, доки його не повернуть
+                retries.append((item["id"], time.time() + self.max_delay, "UnknownBot"))
+                return
+            async with limit:
+                if not paused_until:
+                    await self._pacers[item["bot_id"]].wait()
+                if paused_until:
+                    retries.append((item["id"], paused_until, "RetryAfter"))
+                    return
+                try:
+                    with bot_context(item["bot_id"]):
+                        await self._send(bot, item)
+                    delivered.append(item["id"])
+                except TelegramRetryAfter as e:
+                    paused_until = max(paused_until, time.time() + e.retry_after)
+                    retries.append((item["id"], paused_until, "RetryAfter"))
+                    return
+                except PERMANENT_ERRORS as e:
+                    logger.warning(f"Доставка #{item['request_id']} неможлива: {e}")
+                    failed.append(item)
+                except TelegramBadRequest as e:
+                    if not is_permanent(e):
+                        logger.error(f"Telegram відхилив повідомлення #{item['request_id']}: {e.message}")
+                        retries.append((item["id"], time.time() + self.max_delay, "BadRequest"))
+                        # Звіт адміну лише при першому відкладенні, не на кожній повторній спробі
+                        if item["last_error"] != "BadRequest":
+                            rejected.append((item, e.message))
+                        return
+                    logger.warning(f"Доставка #{item['request_id']} неможлива: {e}")
+                    failed.append(item)
+                except Exception as e:
+                    if item["attempts"] + 1 < self.max_attempts:
+                        delay = self._backoff(item["attempts"])
+                        logger.warning(
+                            f"Доставка #{item['request_id']} не вдалась ({type(e).__name__}), "
+                            f"повтор через {delay:.0f} с"
+                        )
+                        retries.append((item["id"], time.time() + delay, type(e).__name__))
+                        return
+                    logger.error(f"Доставка #{item['request_id']}: вичерпано спроби ({e})")
+                    failed.append(item)
+
+            done.append(item["id"])
+            if item["kind"] == "answer":
+                wipe.append(item["request_id"])
+
+        await asyncio.gather(*(deliver(item) for item in batch))
+        await db.complete_outbox(done, wipe, delivered)
+        await db.reschedule_outbox(retries)
+
+        for item in failed:
+            await self._report_failure(
+                self._bots[item["bot_id"]], item, "Можливо, він заблокував бот."
+            )
+        for item, error in rejected:
+            await self._report_failure(
+                self._bots[item["bot_id"]], item,
+                f"Telegram відхилив повідомлення: <code>{html.escape(error)}</code>\n"
+                f"Дані збережено, доставка повторюватиметься"
+            )
+
+    async def _send(self, bot: Bot, item: Dict):
+        if item["kind"] == "channel":
+            channel = current_config().ANSWERS_CHANNEL_ID
+            if channel:
+                await bot.send_message(
+                    channel,
+                    f"❓ <b>Питання:</b>\n{html.escape(item['question'])}\n\n"
+                    f"💬 <b>Відповідь:</b>\n{html.escape(item['answer'])}",
+                    parse_mode="HTML"
+                )
+            return
+
+        await bot.send_message(
+            item["user_id"],
+            TEXTS["answer_received"].format(
+                request_id=item["request_id"],
+                question=html.escape(item["question"]),
+                answer=html.escape(item["answer"])
+            ),
+            reply_markup=rating_keyboard(item["request_id"]),
+            parse_mode="HTML"
+        )
+        logger.info(f"Відповідь на #{item['request_id']} доставлена")
+
+    async def _report_failure(self, bot: Bot, item: Dict, reason: str):
+        if item["kind"] != "answer" or not item["notify_chat_id"]:
+            return
+        try:
+            await bot.send_message(
+                item["notify_chat_id"],
+                f"⚠️ Відповідь збережена, але не вдалося доставити користувачу.\n"
+                f"{reason}\n"
+                f"ID: <code>{item['request_id']}</code>",
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            logger.warning(f"Не вдалося повідомити адміна про невдалу доставку: {e}")
+
+
+delivery_worker = DeliveryWorker(concurrency=settings.DELIVERY_CONCURRENCY, rate=settings.DELIVERY_RATE)
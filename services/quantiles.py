@@ -0,0 +1,101 @@
+"""
+DDSketch — потоковий квантильний скетч з відносною похибкою alpha.
+Кошики логарифмічної шкали: O(1) на значення, обмежена пам'ять,
+скетчі різних днів зливаються без втрати точності
+"""
+import json
+import math
+from typing import Dict, Optional
+
+
+class DDSketch:
+    """
+    Значення v потрапляє в кошик ceil(log_gamma(v)), gamma = (1 + alpha) / (1 - alpha);
+    будь-який квантиль повертається з відносною похибкою не більше alpha.
+    Значення, менші за min_value, рахуються нулями
+    """
+
+    __slots__ = ("alpha", "max_bins", "_log_gamma", "bins", "zeros", "count", "sum", "min", "max")
+
+    min_value = 1e-3
+
+    def __init__(self, alpha: float = 0.01, max_bins: int = 2048):
+        self.alpha = alpha
+        self.max_bins = max_bins
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.bins: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < self.min_value:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Злиття найменших кошиків — точність втрачається лише на нижніх квантилях"""
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def merge(self, other: "DDSketch"):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Різна точність скетчів: {self.alpha} і {other.alpha}")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оцінка q-квантиля (0..1); None — скетч порожній"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Середина кошика (gamma^(i-1), gamma^i] з відносною похибкою alpha
+                value = 2 * math.exp(index * self._log_gamma) / (math.exp(self._log_gamma) + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "alpha": self.alpha, "zeros": self.zeros, "count": self.count, "sum": self.sum,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "bins": self.bins,
+        })
+
+    @classmethod
+    def from_json(cls, data: str, max_bins: int = 2048) -> "DDSketch":
+        raw = json.loads(data)
+        sketch = cls(raw["alpha"], max_bins)
+        sketch.bins = {int(index): count for index, count in raw["bins"].items()}
+        sketch.zeros = raw["zeros"]
+        sketch.count = raw["count"]
+        sketch.sum = raw["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = raw["min"], raw["max"]
+        return sketch
@@ -0,0 +1,127 @@
+"""
+Виявлення скоординованих рейдів: однаковий текст від багатьох акаунтів.
+Count-min sketch з часовим згасанням — фіксована пам'ять, O(1) на повідомлення,
+без збереження ID користувачів чи текстів
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+from array import array
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def fingerprint(text: str) -> bytes:
+    """Відбиток нормалізованого тексту (регістр, пунктуація та пробіли ігноруються)"""
+    norm = _NON_WORD.sub(" ", text.lower()).strip()
+    return hashlib.blake2b(norm.encode(), digest_size=16).digest()
+
+
+class _Generation:
+    """Одне часове вікно: count-min sketch + Bloom-фільтр пар (відбиток, відправник)"""
+
+    __slots__ = ("counts", "seen")
+
+    def __init__(self, depth: int, width: int, bloom_bits: int):
+        self.counts = array("I", bytes(4 * depth * width))
+        self.seen = bytearray(bloom_bits // 8)
+
+
+class RaidDetector:
+    """
+    Рахує, скільки різних відправників надіслали той самий відбиток за останні 1-2 вікна.
+    Дві генерації ротуються кожні window секунд (старіші дані просто забуваються).
+    Пари (відбиток, user_id) зберігаються лише як біти Bloom-фільтра з випадковою сіллю,
+    тож відновити з них ID неможливо.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 20,
+        window: float = 600,
+        depth: int = 4,
+        width: int = 1 << 14,
+        bloom_bits: int = 1 << 20,
+        min_length: int = 20,
+    ):
+        self.threshold = threshold
+        self.window = window
+        self.depth = depth
+        self.width = width
+        self.bloom_bits = bloom_bits
+        self.min_length = min_length
+        self._salt = os.urandom(16)
+        self._current = _Generation(depth, width, bloom_bits)
+        self._previous = _Generation(depth, width, bloom_bits)
+        self._rotated_at = time.monotonic()
+        self.blocked = 0
+
+    def _rotate(self):
+        now = time.monotonic()
+        elapsed = now - self._rotated_at
+        if elapsed < self.window:
+            return
+        if elapsed >= 2 * self.window:
+            self._previous = _Generation(self.depth, self.width, self.bloom_bits)
+        else:
+            self._previous = self._current
+        self._current = _Generation(self.depth, self.width, self.bloom_bits)
+        self._rotated_at = now
+
+    def _cells(self, fp: bytes):
+        # 16 байт відбитка = 4 незалежні 32-бітні хеші для рядків sketch
+        for row in range(self.depth):
+            h = int.from_bytes(fp[(row * 4) % 16:(row * 4) % 16 + 4], "little")
+            yield row * self.width + h % self.width
+
+    def _bloom_bits(self, fp: bytes, user_id: int):
+        digest = hashlib.blake2b(
+            fp + user_id.to_bytes(8, "little", signed=True), key=self._salt, digest_size=12
+        ).digest()
+        for i in range(0, 12, 4):
+            yield int.from_bytes(digest[i:i + 4], "little") % self.bloom_bits
+
+    def _first_time(self, generation: _Generation, bits) -> bool:
+        """Позначити пару у Bloom-фільтрі; True — якщо її ще не було"""
+        new = False
+        for bit in bits:
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not generation.seen[byte] & mask:
+                generation.seen[byte] |= mask
+                new = True
+        return new
+
+    def observe(self, text: str, user_id: int) -> bool:
+        """Врахувати повідомлення. True — відбиток перевищив поріг (рейд)"""
+        if len(text) < self.min_length:
+            return False
+        self._rotate()
+
+        fp = fingerprint(text)
+        cells = list(self._cells(fp))
+        bits = list(self._bloom_bits(fp, user_id))
+
+        current, previous = self._current, self._previous
+        if self._first_time(current, bits):
+            for cell in cells:
+                current.counts[cell] += 1
+
+        estimate = min(current.counts[cell] + previous.counts[cell] for cell in cells)
+        if estimate >= self.threshold:
+            self.blocked += 1
+            return True
+        return False
+
+    @property
+    def memory_bytes(self) -> int:
+        per_generation = 4 * self.depth * self.width + self.bloom_bits // 8
+        return 2 * per_generation
+
+
+raid_detector = RaidDetector(threshold=settings.RAID_THRESHOLD, window=settings.RAID_WINDOW)
@@ -0,0 +1,141 @@
+"""
+Пошук схожих питань (MinHash + LSH) для відповіді одним повідомленням
+"""
+import hashlib
+import logging
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64               # Довжина MinHash-підпису
+BANDS = 16                  # LSH: 16 смуг по 4 значення
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4            # Символьні n-грами нормалізованого тексту
+SIMILARITY_THRESHOLD = 0.6  # Мінімальна оцінка схожості Жаккара
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _seeded_params() -> List[Tuple[int, int]]:
+    """Детерміновані параметри хеш-функцій (однакові між перезапусками)"""
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash:{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _MERSENNE or 1
+        b = int.from_bytes(digest[8:], "little") % _MERSENNE
+        params.append((a, b))
+    return params
+
+
+_PARAMS = _seeded_params()
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def shingles(text: str) -> Set[int]:
+    """Хеші символьних n-грам тексту"""
+    norm = normalize(text)
+    if len(norm) <= SHINGLE_SIZE:
+        grams = {norm} if norm else set()
+    else:
+        grams = {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "little")
+        for g in grams
+    }
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """MinHash-підпис тексту"""
+    hashes = shingles(text)
+    if not hashes:
+        return ()
+    return tuple(
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes)
+        for a, b in _PARAMS
+    )
+
+
+def estimate_similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class SimilarityIndex:
+    """
+    Інкрементальний LSH-індекс питань, що очікують відповіді.
+    Пошук зачіпає лише кошики BANDS смуг, тож вартість не залежить від розміру черги.
+    Ключ кошика містить bot_id — питання різних ботів ніколи не вважаються схожими.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._owners: Dict[str, int] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(sig: Tuple[int, ...], bot_id: int) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for band in range(BANDS):
+            yield band, (bot_id, *sig[band * ROWS:(band + 1) * ROWS])
+
+    def add(self, request_id: str, text: str, bot_id: int = 0):
+        sig = signature(text)
+        if not sig:
+            return
+        self.remove(request_id)
+        self._signatures[request_id] = sig
+        self._owners[request_id] = bot_id
+        for band, key in self._bands(sig, bot_id):
+            self._buckets[band].setdefault(key, set()).add(request_id)
+
+    def remove(self, request_id: str):
+        sig = self._signatures.pop(request_id, None)
+        if not sig:
+            return
+        for band, key in self._bands(sig, self._owners.pop(request_id, 0)):
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                continue
+            bucket.discard(request_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def similar(self, request_id: str) -> List[str]:
+        """Схожі питання (без самого request_id), від найближчого"""
+        sig = self._signatures.get(request_id)
+        if not sig:
+            return []
+
+        candidates: Set[str] = set()
+        for band, key in self._bands(sig, self._owners.get(request_id, 0)):
+            candidates.update(self._buckets[band].get(key, ()))
+        candidates.discard(request_id)
+
+        scored = [
+            (estimate_similarity(sig, self._signatures[other]), other)
+            for other in candidates
+        ]
+        return [other for score, other in sorted(scored, reverse=True) if score >= self.threshold]
+
+    def rebuild(self, questions: Iterable[Dict]):
+        """Повна перебудова з питань, що очікують відповіді (при старті)"""
+        self._signatures.clear()
+        self._owners.clear()
+        for buckets in self._buckets:
+            buckets.clear()
+        for question in questions:
+            self.add(question["request_id"], question["question"], question.get("bot_id", 0))
+        logger.info(f"Індекс схожих питань побудовано: {len(self)} питань")
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,89 @@
+"""
+Легкий токенний класифікатор спаму (наївний Баєс з хешуванням ознак),
+що навчається на прикладах, позначених адмінами
+"""
+import math
+import re
+import zlib
+from array import array
+from typing import Iterable, List, Tuple
+
+FEATURES = 1 << 12          # Розмір хешованого простору токенів
+MIN_EXAMPLES = 5            # Мінімум прикладів кожного класу для активації
+SPAM_THRESHOLD = 0.9        # Ймовірність спаму для блокування
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def token_indices(text: str) -> List[int]:
+    """Індекси хешованих ознак (унікальні токени тексту)"""
+    return [
+        zlib.crc32(token.encode()) % FEATURES
+        for token in set(_TOKEN.findall(text.lower()))
+    ]
+
+
+class ClassifierModel:
+    """
+    Незмінний знімок моделі: вектор ваг логарифму відношення правдоподібностей.
+    Оцінка тексту — сума ваг за індексами його токенів; знімок можна
+    передавати в пул потоків чи процесів.
+    """
+
+    __slots__ = ("weights", "bias", "ready")
+
+    def __init__(self, weights: array, bias: float, ready: bool):
+        self.weights = weights
+        self.bias = bias
+        self.ready = ready
+
+    def __getstate__(self):
+        return self.weights, self.bias, self.ready
+
+    def __setstate__(self, state):
+        self.weights, self.bias, self.ready = state
+
+    def spam_probability(self, text: str) -> float:
+        weights = self.weights
+        score = self.bias + sum(weights[i] for i in token_indices(text))
+        if score < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-score))
+
+
+class TokenClassifier:
+    """Лічильники токенів по класах; після кожного навчання будується новий ClassifierModel"""
+
+    def __init__(self):
+        self._counts = {True: array("d", bytes(8 * FEATURES)), False: array("d", bytes(8 * FEATURES))}
+        self._tokens = {True: 0.0, False: 0.0}
+        self._docs = {True: 0, False: 0}
+        self.model = ClassifierModel(array("d", bytes(8 * FEATURES)), 0.0, False)
+
+    def add(self, text: str, is_spam: bool):
+        indices = token_indices(text)
+        counts = self._counts[is_spam]
+        for i in indices:
+            counts[i] += 1
+        self._tokens[is_spam] += len(indices)
+        self._docs[is_spam] += 1
+
+    def fit(self, examples: Iterable[Tuple[str, bool]]) -> ClassifierModel:
+        for text, is_spam in examples:
+            self.add(text, is_spam)
+        return self.rebuild()
+
+    def rebuild(self) -> ClassifierModel:
+        """Перерахунок ваг (зі згладжуванням Лапласа) і атомарна заміна моделі"""
+        spam, ham = self._counts[True], self._counts[False]
+        spam_total = self._tokens[True] + FEATURES
+        ham_total = self._tokens[False] + FEATURES
+        weights = array("d", (
+            math.log((spam[i] + 1) / spam_total) - math.log((ham[i] + 1) / ham_total)
+            for i in range(FEATURES)
+        ))
+        docs_spam, docs_ham = self._docs[True], self._docs[False]
+        bias = math.log((docs_spam + 1) / (docs_ham + 1))
+        ready = docs_spam >= MIN_EXAMPLES and docs_ham >= MIN_EXAMPLES
+        self.model = ClassifierModel(weights, bias, ready)
+        return self.model
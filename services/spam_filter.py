@@ -2,12 +2,9 @@
 Фільтр спаму та недозволених слів
 """
 import re
-from config import settings
-
-# Базовий список (доповнюється через .env SPAM_WORDS)
-DEFAULT_BAD_WORDS = [
-    "спам", "реклама", "казино", "ставки", "крипта",
-]
+from typing import List, Optional, Pattern, Tuple
+from config import current_config
+from services.spam_classifier import ClassifierModel, SPAM_THRESHOLD
 
 # URL-патерн
 URL_PATTERN = re.compile(
@@ -15,18 +12,22 @@ URL_PATTERN = re.compile(
 )
 
 
-def check_spam(text: str) -> tuple[bool, str]:
+def check_spam(text: str, pattern: Optional[Pattern[str]] = None) -> tuple[bool, str]:
     """
     Перевірка тексту на спам.
+    pattern — патерн заборонених слів (за замовчуванням з поточної конфігурації;
+    передається явно при виконанні в іншому процесі).
     Повертає (is_spam: bool, reason: str)
     """
     text_lower = text.lower()
 
     # Перевірка лайливих слів
-    all_bad_words = DEFAULT_BAD_WORDS + settings.SPAM_WORDS
-    for word in all_bad_words:
-        if word and word in text_lower:
-            return True, f"Заборонене слово: {word}"
+    if pattern is None:
+        pattern = current_config().SPAM_PATTERN
+    if pattern:
+        match = pattern.search(text_lower)
+        if match:
+            return True, f"Заборонене слово: {match.group(0)}"
 
     # Перевірка посилань (опціонально)
     if URL_PATTERN.search(text):
@@ -42,3 +43,18 @@ def check_spam(text: str) -> tuple[bool, str]:
         return True, "Занадто багато великих літер"
 
     return False, ""
+
+
+def evaluate_batch(
+    texts: List[str],
+    pattern: Optional[Pattern[str]],
+    model: ClassifierModel,
+) -> List[Tuple[bool, str]]:
+    """Правила + класифікатор для пачки текстів (виконується в пулі потоків або процесів)"""
+    results = []
+    for text in texts:
+        is_spam, reason = check_spam(text, pattern)
+        if not is_spam and model.ready and model.spam_probability(text) >= SPAM_THRESHOLD:
+            is_spam, reason = True, "Класифікатор: схоже на спам"
+        results.append((is_spam, reason))
+    return results
@@ -0,0 +1,148 @@
+"""
+Оцінка спаму поза event loop: пул потоків або процесів,
+пакетування повідомлень, що надходять разом, і жорсткий ліміт часу
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+
+from config import settings, current_config
+from services.spam_classifier import TokenClassifier
+from services.spam_filter import evaluate_batch
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class SpamService:
+    """
+    check() ставить текст у пачку; пачка збирається batch_window секунд
+    (або до max_batch текстів) і оцінюється одним завданням у пулі.
+    Якщо відповідь не готова за budget секунд — рішення за політикою fail_open.
+    """
+
+    def __init__(
+        self,
+        executor: str = "thread",
+        workers: int = 2,
+        budget: float = 0.5,
+        fail_open: bool = True,
+        batch_window: float = 0.005,
+        max_batch: int = 32,
+    ):
+        self.executor_kind = executor
+        self.workers = workers
+        self.budget = budget
+        self.fail_open = fail_open
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.classifier = TokenClassifier()
+        self.timeouts = 0
+        self._pool: Optional[Executor] = None
+        self._pending: List[Tuple[str, Optional[Pattern[str]], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.executor_kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="spam")
+        return self._pool
+
+    @property
+    def queue_depth(self) -> int:
+        """Тексти, що чекають пачки, та пачки в обробці"""
+        return len(self._pending) + len(self._tasks)
+
+    def _policy_result(self, why: str) -> Tuple[bool, str]:
+        if self.fail_open:
+            logger.warning(f"Спам-перевірку пропущено ({why}), повідомлення дозволено")
+            return False, ""
+        logger.warning(f"Спам-перевірку не завершено ({why}), повідомлення відхилено")
+        return True, "Перевірку не завершено вчасно"
+
+    async def check(self, text: str) -> Tuple[bool, str]:
+        """Повертає (is_spam, reason) не пізніше ніж за budget секунд"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Патерн бота, чиє повідомлення перевіряється (у пачці можуть бути різні боти)
+        self._pending.append((text, current_config().SPAM_PATTERN, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        with tracer.span("spam.check") as span:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=self.budget)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if span:
+                    span.attributes["timeout"] = True
+                return self._policy_result("перевищено ліміт часу")
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        groups: Dict[Optional[Pattern[str]], List[Tuple[str, asyncio.Future]]] = {}
+        for text, pattern, future in batch:
+            groups.setdefault(pattern, []).append((text, future))
+        for pattern, group in groups.items():
+            task = asyncio.ensure_future(self._evaluate(group, pattern))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate(self, batch: List[Tuple[str, asyncio.Future]], pattern: Optional[Pattern[str]]):
+        texts = [text for text, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(),
+                evaluate_batch,
+                texts,
+                pattern,
+                self.classifier.model,
+            )
+        except Exception as e:
+            logger.error(f"Помилка оцінки спаму: {e}")
+            if isinstance(e, BrokenProcessPool):
+                # Процес пулу впав — наступна пачка створить новий пул
+                self._pool = None
+            result = self._policy_result("помилка оцінки")
+            results = [result] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def train(self, examples: List[Tuple[str, bool]]):
+        """Повне навчання на прикладах з БД (при старті)"""
+        model = self.classifier.fit(examples)
+        logger.info(f"Спам-класифікатор навчено на {len(examples)} прикладах (активний: {model.ready})")
+
+    def learn(self, text: str, is_spam: bool):
+        """Додати один позначений адміном приклад"""
+        self.classifier.add(text, is_spam)
+        self.classifier.rebuild()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+spam_service = SpamService(
+    executor=settings.SPAM_EXECUTOR,
+    workers=settings.SPAM_WORKERS,
+    budget=settings.SPAM_TIME_BUDGET_MS / 1000,
+    fail_open=settings.SPAM_FAIL_OPEN,
+)
@@ -0,0 +1,263 @@
+"""
+Трасування оновлень: кореневий спан на оновлення, дочірні спани для БД та Bot API,
+tail-based семплювання (повільні та помилкові трейси зберігаються завжди).
+Спани не містять ID користувачів і текстів повідомлень.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_SPANS_PER_TRACE = 256
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans", "finished")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List["Span"] = []
+        self.finished = False
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def add(self, key: str, value: float):
+        """Накопичення числового атрибута (напр. час очікування блокування)"""
+        self.attributes[key] = round(self.attributes.get(key, 0) + value, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class JsonlExporter:
+    """Один рядок JSON на трейс у локальний файл (запис у потоці)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def export(self, root: Span):
+        line = json.dumps({
+            "trace_id": root.trace.trace_id,
+            "root": root.name,
+            "duration_ms": round(root.duration_ms, 3),
+            "spans": [span.to_dict() for span in root.trace.spans],
+        }, ensure_ascii=False)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, line)
+
+
+class OtlpHttpExporter:
+    """OTLP/HTTP JSON (POST /v1/traces) для колектора або сумісної заглушки"""
+
+    def __init__(self, url: str, service_name: str = "anonymous-bot"):
+        self.url = url
+        self.service_name = service_name
+        self._session = None
+
+    @staticmethod
+    def _attributes(values: Dict[str, Any]) -> List[Dict]:
+        result = []
+        for key, value in values.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            result.append({"key": key, "value": typed})
+        return result
+
+    async def export(self, root: Span):
+        import aiohttp
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        spans = [
+            {
+                "traceId": root.trace.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": self._attributes(span.attributes),
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            for span in root.trace.spans
+        ]
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "anonymous-bot"}, "spans": spans}],
+        }]}
+        async with self._session.post(self.url, json=payload) as response:
+            if response.status >= 300:
+                logger.warning(f"OTLP колектор відповів {response.status}")
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+
+
+class Tracer:
+    """
+    Спани створюються лише всередині трейсу оновлення (фонові задачі не трасуються).
+    Рішення про збереження приймається після завершення кореневого спану.
+    """
+
+    def __init__(self, enabled: bool, exporter=None, slow_ms: float = 1000, sample_rate: float = 0.01):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.exported = 0
+        self.dropped = 0
+        self._tasks = set()
+
+    @contextmanager
+    def root(self, name: str, **attributes):
+        if not self.enabled:
+            yield None
+            return
+        span = Span(Trace(), name, None, attributes)
+        span.trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            span.trace.finished = True
+            _current_span.reset(token)
+            self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        if parent is None or parent.trace.finished or len(parent.trace.spans) >= MAX_SPANS_PER_TRACE:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        parent.trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+
+    def _finish(self, root: Span):
+        keep = (
+            root.error is not None
+            or any(span.error for span in root.trace.spans)
+            or root.duration_ms >= self.slow_ms
+            or random.random() < self.sample_rate
+        )
+        if not keep or self.exporter is None:
+            self.dropped += 1
+            return
+        self.exported += 1
+        task = asyncio.ensure_future(self._export(root))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _export(self, root: Span):
+        try:
+            await self.exporter.export(root)
+        except Exception as e:
+            logger.warning(f"Не вдалося експортувати трейс: {e}")
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if hasattr(self.exporter, "close"):
+            await self.exporter.close()
+
+
+def traced_methods(prefix: str):
+    """Декоратор класу: дочірній спан для кожного публічного async-методу"""
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _wrap(f"{prefix}.{name}", method))
+        return cls
+    return decorate
+
+
+def _wrap(span_name: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return await method(*args, **kwargs)
+        with tracer.span(span_name):
+            return await method(*args, **kwargs)
+    return wrapper
+
+
+def _create_exporter(target: str):
+    if not target:
+        return None
+    if target.startswith(("http://", "https://")):
+        return OtlpHttpExporter(target)
+    return JsonlExporter(target)
+
+
+tracer = Tracer(
+    enabled=settings.TRACE_ENABLED,
+    exporter=_create_exporter(settings.TRACE_EXPORT),
+    slow_ms=settings.TRACE_SLOW_MS,
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+)
@@ -0,0 +1,144 @@
+"""
+Запис знеособленого потоку оновлень для відтворення (benchmarks/bench_replay.py).
+ID замінюються стабільними псевдонімами, текст — заповнювачем тієї ж довжини,
+зберігаються лише команди, callback-дані та інтервали між оновленнями
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings, current_config
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY = 100
+_REQUEST_ID = re.compile(r"^[0-9A-F]{8}$")
+_FILLER_ALPHABET = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+
+
+class Redactor:
+    """Детермінована заміна ID і текстів (однаковий вхід — однаковий результат)"""
+
+    def __init__(self, salt: bytes):
+        self.salt = salt
+
+    def pseudonym(self, value: int) -> int:
+        digest = hashlib.blake2b(str(value).encode(), key=self.salt, digest_size=8).digest()
+        # Додатне число в межах звичайних Telegram ID
+        return int.from_bytes(digest, "little") % (1 << 40) + 1
+
+    def filler(self, text: str) -> str:
+        """Заповнювач тієї ж довжини з тими ж пробілами; однакові тексти дають однаковий результат"""
+        seed = hashlib.blake2b(text.encode(), key=self.salt, digest_size=8).digest()
+        rng = random.Random(seed)
+        return "".join(ch if ch.isspace() else rng.choice(_FILLER_ALPHABET) for ch in text)
+
+    def text(self, text: str) -> str:
+        if not text.startswith("/"):
+            return self.filler(text)
+        # Команда та ID запитів лишаються, решта аргументів замінюється
+        parts = re.split(r"(\s+)", text)
+        return "".join(
+            part if i == 0 or part.isspace() or _REQUEST_ID.match(part) else self.filler(part)
+            for i, part in enumerate(parts)
+        )
+
+    def user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": self.pseudonym(user["id"]), "is_bot": user.get("is_bot", False), "first_name": "user"}
+
+    def chat(self, chat: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": self.pseudonym(chat["id"]), "type": chat["type"]}
+
+    def message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "message_id": message["message_id"],
+            "date": message["date"],
+            "chat": self.chat(message["chat"]),
+        }
+        if message.get("from"):
+            result["from"] = self.user(message["from"])
+        if message.get("text") is not None:
+            result["text"] = self.text(message["text"])
+        return result
+
+    def update(self, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Лише повідомлення та callback; інші типи бот не обробляє"""
+        if update.get("message"):
+            return {"update_id": update["update_id"], "message": self.message(update["message"])}
+        callback = update.get("callback_query")
+        if callback:
+            result = {
+                "id": callback["id"],
+                "from": self.user(callback["from"]),
+                "chat_instance": "0",
+            }
+            if callback.get("data") is not None:
+                result["data"] = callback["data"]
+            if callback.get("message"):
+                result["message"] = self.message(callback["message"])
+            return {"update_id": update["update_id"], "callback_query": result}
+        return None
+
+
+class TrafficRecorder:
+    """Буферизований запис рядків {"dt", "admin", "update"} у JSONL-файл"""
+
+    def __init__(self, path: str, salt: bytes):
+        self.path = path
+        self.redactor = Redactor(salt)
+        self.recorded = 0
+        self._buffer: List[str] = []
+        self._last: Optional[float] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def record(self, update: Dict[str, Any], user_id: Optional[int]):
+        redacted = self.redactor.update(update)
+        if redacted is None:
+            return
+        now = time.monotonic()
+        dt = 0.0 if self._last is None else now - self._last
+        self._last = now
+        self._buffer.append(json.dumps({
+            "dt": round(dt, 4),
+            "admin": user_id in current_config().ADMIN_IDS,
+            "update": redacted,
+        }, ensure_ascii=False))
+        self.recorded += 1
+        if len(self._buffer) >= FLUSH_EVERY:
+            task = asyncio.ensure_future(self.flush())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _write(self, lines: List[str]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self):
+        lines, self._buffer = self._buffer, []
+        if lines:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        if self.recorded:
+            logger.info(f"Записано {self.recorded} знеособлених оновлень у {self.path}")
+
+
+def _create_recorder() -> Optional[TrafficRecorder]:
+    if not settings.TRAFFIC_CAPTURE_PATH:
+        return None
+    # Без солі псевдоніми стабільні лише в межах одного запуску
+    salt = settings.TRAFFIC_CAPTURE_SALT
+    salt = hashlib.sha256(salt.encode()).digest() if salt else os.urandom(16)
+    return TrafficRecorder(settings.TRAFFIC_CAPTURE_PATH, salt)
+
+
+traffic_recorder = _create_recorder()
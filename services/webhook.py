@@ -0,0 +1,157 @@
+"""
+Прийом вебхука: відсіювання підроблених, завеликих, повторних і непотрібних оновлень
+до розбору JSON у модель aiogram; кілька ботів в одному aiohttp-застосунку (режим BOTS_FILE)
+"""
+import hashlib
+import hmac
+import json
+import re
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, TokenBasedRequestHandler
+
+from config import settings, ALLOWED_UPDATES
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Telegram серіалізує update_id першим полем, а тип оновлення — другим
+_HEAD = re.compile(rb'\s*\{\s*"update_id"\s*:\s*(\d+)\s*,\s*"([a-z_]+)"')
+_HEAD_BYTES = 96
+
+
+def webhook_secret(bot: Bot) -> str:
+    """WEBHOOK_SECRET або стабільний секрет, похідний від токена (символи [0-9a-f])"""
+    if settings.WEBHOOK_SECRET:
+        return settings.WEBHOOK_SECRET
+    return hmac.new(bot.token.encode(), b"webhook-secret", hashlib.sha256).hexdigest()
+
+
+def secret_fingerprint(bot: Bot) -> str:
+    """
+    Відбиток секрету в URL вебхука: getWebhookInfo секрет не повертає,
+    тож зміна секрету (або вебхук без нього) видна як зміна URL
+    """
+    return hashlib.sha256(webhook_secret(bot).encode()).hexdigest()[:8]
+
+
+def peek_update(body: bytes, loads: Callable[[bytes], Any] = json.loads) -> Tuple[Optional[int], Optional[str]]:
+    """update_id і тип оновлення без повного розбору; None — тіло не схоже на оновлення"""
+    match = _HEAD.match(body, 0, _HEAD_BYTES)
+    if match:
+        return int(match.group(1)), match.group(2).decode()
+    # Нетипове форматування — повільний шлях
+    try:
+        data = loads(body)
+    except ValueError:
+        return None, None
+    if not isinstance(data, dict) or not isinstance(data.get("update_id"), int):
+        return None, None
+    kinds = [key for key in data if key != "update_id"]
+    return data["update_id"], kinds[0] if kinds else None
+
+
+class WebhookGuard:
+    """Дешеві перевірки тіла вебхука та лічильники відхилень"""
+
+    def __init__(self, allowed_updates: List[str], max_body: int, dedup_window: int):
+        self.allowed_updates = frozenset(allowed_updates)
+        self.max_body = max_body
+        self.dedup_window = dedup_window
+        self.accepted = 0
+        self.rejected: Counter = Counter()
+        self._seen: Dict[int, Tuple[Set[int], Deque[int]]] = {}
+
+    def _duplicate(self, bot_id: int, update_id: int) -> bool:
+        seen, order = self._seen.setdefault(bot_id, (set(), deque()))
+        if update_id in seen:
+            return True
+        seen.add(update_id)
+        order.append(update_id)
+        if len(order) > self.dedup_window:
+            seen.discard(order.popleft())
+        return False
+
+    def inspect(self, bot_id: int, body: bytes, loads: Callable[[bytes], Any] = json.loads) -> Optional[str]:
+        """Причина відхилення або None, якщо оновлення треба обробити"""
+        update_id, kind = peek_update(body, loads)
+        if update_id is None:
+            return "malformed"
+        if kind not in self.allowed_updates:
+            return "update_type"
+        if self._duplicate(bot_id, update_id):
+            return "duplicate"
+        return None
+
+    def reject(self, reason: str, status: int) -> web.Response:
+        self.rejected[reason] += 1
+        return web.Response(status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"accepted": self.accepted, "rejected": dict(self.rejected)}
+
+
+# Повтор і непотрібний тип отримують 200, інакше Telegram надсилатиме їх знову
+_REJECT_STATUS = {"malformed": 400, "update_type": 200, "duplicate": 200}
+
+webhook_guard = WebhookGuard(ALLOWED_UPDATES, settings.WEBHOOK_MAX_BODY, settings.WEBHOOK_DEDUP_WINDOW)
+
+
+class GuardedRequestMixin:
+    """Секрет, розмір і заголовок оновлення перевіряються до request.json() і диспетчера"""
+
+    guard: WebhookGuard = webhook_guard
+
+    def verify_secret(self, telegram_secret_token: str, bot: Bot) -> bool:
+        # Байти: compare_digest для str з не-ASCII кидає TypeError (500 замість 401)
+        return hmac.compare_digest(
+            telegram_secret_token.encode(errors="surrogateescape"), webhook_secret(bot).encode()
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get(SECRET_HEADER, ""), bot):
+            return self.guard.reject("secret", 401)
+        if request.content_length is None:
+            return self.guard.reject("no_length", 411)
+        if request.content_length > self.guard.max_body:
+            return self.guard.reject("too_large", 413)
+
+        # Тіло кешується в запиті — request.json() у базовому класі його не перечитує
+        reason = self.guard.inspect(bot.id, await request.read(), bot.session.json_loads)
+        if reason:
+            return self.guard.reject(reason, _REJECT_STATUS[reason])
+        self.guard.accepted += 1
+
+        if self.handle_in_background:
+            return await self._handle_request_background(bot=bot, request=request)
+        return await self._handle_request(bot=bot, request=request)
+
+    __call__ = handle
+
+
+class GuardedRequestHandler(GuardedRequestMixin, SimpleRequestHandler):
+    """Вебхук одного бота (WEBHOOK_PATH)"""
+
+
+class ConfiguredBotsRequestHandler(GuardedRequestMixin, TokenBasedRequestHandler):
+    """
+    Шлях /webhook/{bot_token}, але лише для ботів з конфігурації:
+    невідомий токен — 404 замість створення нового Bot.
+    Боти спільно використовують одну сесію, її закриває main.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bots: List[Bot], **kwargs):
+        super().__init__(dispatcher=dispatcher, **kwargs)
+        self.bots = {bot.token: bot for bot in bots}
+
+    async def resolve_bot(self, request: web.Request) -> Bot:
+        bot = self.bots.get(request.match_info["bot_token"])
+        if bot is None:
+            raise web.HTTPNotFound()
+        return bot
+
+    async def close(self) -> None:
+        pass
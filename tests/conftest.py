@@ -0,0 +1,124 @@
+"""
+Спільні фікстури: те саме сховище кожного бекенду (sqlite, memory) у тимчасовому каталозі.
+Тести синхронні — кожне сховище має власний event loop
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Конфігурація читається при імпорті: без .env розробника, трасування і запису трафіку
+os.environ.update({
+    "BOT_TOKEN": "123456:TEST",
+    "ENV_FILE": os.path.join(tempfile.mkdtemp(), "test.env"),
+    "BOTS_FILE": "",
+    "TRACE_ENABLED": "false",
+    "TRAFFIC_CAPTURE_PATH": "",
+})
+
+import config  # noqa: E402
+from services.database import create_database  # noqa: E402
+
+BACKENDS = ("sqlite", "memory")
+
+
+class Store:
+    """Синхронна обгортка сховища: store.create_question(...) виконується в циклі сховища"""
+
+    def __init__(self, backend: str, path: str):
+        self.backend = backend
+        self.path = path
+        self.runner = asyncio.Runner()
+        self.db = None
+
+    def run(self, coro):
+        # Поточний контекст (bot_context), а не знімок з першого запуску циклу
+        return self.runner.run(coro, context=contextvars.copy_context())
+
+    def open(self):
+        self.db = create_database(self.backend, self.path)
+        self.run(self.db.init())
+        return self
+
+    def close(self):
+        if self.db is not None:
+            self.run(self.db.close())
+            self.db = None
+
+    def reopen(self):
+        """Перезапуск: закриття і відкриття того самого шляху"""
+        self.close()
+        return self.open()
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+        return lambda *args, **kwargs: self.run(attr(*args, **kwargs))
+
+    # ---- Час у минуле (знає внутрішній формат бекенду) ----
+
+    def backdate(self, request_id: str, seconds: float):
+        """Зсунути created_at / answered_at / delivered_at питання на seconds назад"""
+        if self.backend == "sqlite":
+            shift = f"-{seconds} seconds"
+            self.run(self.db._transaction(lambda conn: conn.execute(
+                """UPDATE questions SET created_at = datetime(created_at, ?),
+                   answered_at = datetime(answered_at, ?), delivered_at = datetime(delivered_at, ?)
+                   WHERE request_id = ?""",
+                (shift, shift, shift, request_id)
+            )))
+        else:
+            q = self.db._questions[request_id]
+            for name in ("created_at", "answered_at", "delivered_at"):
+                if getattr(q, name) is not None:
+                    setattr(q, name, getattr(q, name) - seconds)
+
+    def set_rate_limit_age(self, user_id: int, seconds: float):
+        """Останній запит користувача (бот 0) — seconds тому"""
+        if self.backend == "sqlite":
+            last = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+            self.run(self.db._transaction(lambda conn: conn.execute(
+                "UPDATE rate_limits SET last_request = ? WHERE bot_id = 0 AND user_id = ?", (last, user_id)
+            )))
+        else:
+            self.db._rate_limits[(0, user_id)] = time.time() - seconds
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    opened = Store(request.param, str(tmp_path / "store.db")).open()
+    yield opened
+    opened.close()
+    opened.runner.close()
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """Фабрика сховищ для порівняння бекендів між собою"""
+    opened = []
+
+    def factory(backend: str) -> Store:
+        store = Store(backend, str(tmp_path / f"{backend}.db")).open()
+        opened.append(store)
+        return store
+
+    yield factory
+    for store in opened:
+        store.close()
+        store.runner.close()
+
+
+@pytest.fixture
+def bot_context(monkeypatch):
+    """Режим кількох ботів: розділи 101 і 202"""
+    configs = {bot_id: config.build_runtime_config("", "", bot_id=bot_id) for bot_id in (101, 202)}
+    monkeypatch.setattr(config, "_bot_configs", configs)
+    return config.bot_context
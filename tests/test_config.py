@@ -0,0 +1,35 @@
+"""
+Перезавантаження конфігурації: той самий пріоритет джерел, що й при старті
+"""
+import pytest
+
+import config
+
+
+@pytest.fixture
+def env_file(monkeypatch):
+    """ENV_FILE теста і оточення процесу лише з переданими змінними; знімок відновлюється після теста"""
+    monkeypatch.setattr(config, "_runtime_config", config._runtime_config)
+
+    def write(content: str, **process_env):
+        with open(config.ENV_FILE, "w") as f:
+            f.write(content)
+        monkeypatch.setattr(config, "_PROCESS_ENV", process_env)
+        return config.reload_runtime_config()
+
+    return write
+
+
+def test_process_env_wins_over_file(env_file):
+    reloaded = env_file("ADMIN_IDS=2,3\nANSWERS_CHANNEL_ID=@file\n", ADMIN_IDS="1")
+
+    assert reloaded.ADMIN_IDS == {1}
+    assert reloaded.ANSWERS_CHANNEL_ID == "@file"
+    assert config.current_config() is reloaded
+
+
+def test_file_changes_are_picked_up(env_file):
+    assert env_file("SPAM_WORDS=реклама\n").SPAM_WORDS == ("реклама",)
+    assert env_file("SPAM_WORDS=казино, ставки\n").SPAM_WORDS == ("казино", "ставки")
+    # Видалене з файлу не лишається з попереднього читання
+    assert env_file("ADMIN_IDS=5\n").SPAM_WORDS == ()
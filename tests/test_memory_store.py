@@ -0,0 +1,168 @@
+"""
+Журнал і знімки сховища в пам'яті: відновлення після збою, обірваний запис, блокування
+"""
+import asyncio
+import os
+
+import pytest
+
+from services.memory_store import MemoryDatabase
+
+
+def crash(db: MemoryDatabase):
+    """Зупинка без close(): без знімка і без запису черги, блокування звільняється"""
+    db._flusher.cancel()
+    db._log.close()
+    db._log = None
+
+
+async def opened(path: str, **kwargs) -> MemoryDatabase:
+    db = MemoryDatabase(path, flush_interval=3600, **kwargs)
+    await db.init()
+    return db
+
+
+def test_replay_after_crash(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    async def scenario():
+        db = await opened(path)
+        answered = await db.create_question(1, "Питання")
+        pending = await db.create_question(2, "Ще питання")
+        await db.save_answer(answered, "Відповідь")
+        await db.set_dashboard(7, 100)
+        crash(db)
+
+        db = await opened(path)
+        # Зміни питань і outbox підтверджені fsync; решта чекає періодичного запису
+        assert await db.filter_pending() == [pending]
+        assert (await db.get_question(answered))["status"] == "answered"
+        assert await db.count_outbox() == 1
+        assert await db.get_dashboard(7) is None
+        assert db._seq == 3
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_changes_share_one_fsync(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    writes = []
+
+    async def scenario():
+        db = await opened(path)
+        write_log = db._write_log
+        monkeypatch.setattr(db, "_write_log", lambda data: (writes.append(data), write_log(data)))
+        ids = await asyncio.gather(*(db.create_question(i, f"Питання {i}") for i in range(20)))
+        crash(db)
+
+        db = await opened(path)
+        assert await db.filter_pending() == ids
+        await db.close()
+
+    asyncio.run(scenario())
+    assert len(writes) == 1 and writes[0].count(b"\n") == 20
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    async def scenario():
+        db = await opened(path)
+        request_id = await db.create_question(1, "Питання")
+        await db.flush()
+        crash(db)
+        valid = os.path.getsize(db.log_path)
+        with open(db.log_path, "ab") as f:
+            f.write('[2,"create","ABCDEF01",0,5,"Обірв'.encode())
+
+        db = await opened(path)
+        assert os.path.getsize(db.log_path) == valid
+        assert await db.filter_pending() == [request_id]
+        second = await db.create_question(2, "Після збою")
+        await db.flush()
+        crash(db)
+
+        db = await opened(path)
+        assert await db.filter_pending() == [request_id, second]
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_truncates_log_and_replays_rest(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    async def scenario():
+        db = await opened(path)
+        first = await db.create_question(1, "До знімка")
+        await db.snapshot()
+        assert os.path.getsize(db.log_path) == 0
+        second = await db.create_question(2, "Після знімка")
+        await db.flush()
+        crash(db)
+
+        db = await opened(path)
+        assert await db.filter_pending() == [first, second]
+        await db.close()
+        # close() зберігає знімок, журнал після нього порожній
+        assert os.path.getsize(db.log_path) == 0
+
+        db = await opened(path)
+        assert await db.filter_pending() == [first, second]
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_log_already_in_snapshot_is_skipped(tmp_path):
+    """Збій між заміною знімка і обрізанням журналу: записи не застосовуються вдруге"""
+    path = str(tmp_path / "store.db")
+
+    async def scenario():
+        db = await opened(path)
+        request_id = await db.create_question(1, "Питання")
+        await db.save_answer(request_id, "Відповідь")
+        await db.flush()
+        with open(db.log_path, "rb") as f:
+            log = f.read()
+        await db.snapshot()
+        crash(db)
+        with open(db.log_path, "wb") as f:
+            f.write(log)
+
+        db = await opened(path)
+        assert await db.count_outbox() == 1
+        assert (await db.count_questions())["total"] == 1
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_second_process_waits_for_log_lock(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    async def scenario():
+        old = await opened(path)
+        await old.create_question(1, "Старий процес")
+
+        with pytest.raises(RuntimeError):
+            await opened(path, lock_timeout=0.2)
+
+        new = asyncio.create_task(opened(path, lock_timeout=5))
+        await asyncio.sleep(0.2)
+        # Старий процес ще дописує під час плавної зупинки
+        await old.create_question(2, "Під час зупинки")
+        assert not new.done()
+        await old.close()
+
+        new = await new
+        assert (await new.count_questions())["total"] == 2
+        await new.create_question(3, "Новий процес")
+        await new.close()
+
+        db = await opened(path)
+        assert (await db.count_questions())["total"] == 3
+        await db.close()
+
+    asyncio.run(scenario())
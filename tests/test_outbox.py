@@ -0,0 +1,86 @@
+"""
+DeliveryWorker: екранування HTML і класифікація помилок Telegram
+"""
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+import services.outbox
+from services.outbox import DeliveryWorker
+
+ADMIN_CHAT = 5
+
+
+class FakeBot:
+    """send_message записує надіслане або кидає задану помилку"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.error and chat_id != ADMIN_CHAT:
+            raise self.error
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def worker(store, monkeypatch):
+    monkeypatch.setattr(services.outbox, "db", store.db)
+    return DeliveryWorker()
+
+
+def run_batch(store, worker, bot):
+    worker._bots = {0: bot}
+    worker._pacers = {0: services.outbox.SendPacer(0)}
+    store.run(worker._process(store.fetch_outbox_due(10)))
+
+
+def test_answer_text_is_escaped(store, worker):
+    request_id = store.create_question(1, "a < b & c?")
+    store.save_answers([request_id], "<b>так</b>", notify_chat_id=ADMIN_CHAT)
+    bot = FakeBot()
+
+    run_batch(store, worker, bot)
+
+    ((chat_id, text),) = bot.sent
+    assert chat_id == 1
+    assert "a &lt; b &amp; c?" in text and "&lt;b&gt;так&lt;/b&gt;" in text
+    assert store.get_question(request_id)["status"] == "delivered"
+
+
+def test_parse_error_keeps_user_id(store, worker):
+    request_id = store.create_question(1, "Питання")
+    store.save_answers([request_id], "Відповідь", notify_chat_id=ADMIN_CHAT)
+    bot = FakeBot(TelegramBadRequest(None, "Bad Request: can't parse entities"))
+
+    run_batch(store, worker, bot)
+
+    q = store.get_question(request_id)
+    assert (q["status"], q["user_id"]) == ("answered", 1)
+    assert store.count_outbox() == 1
+    ((chat_id, text),) = bot.sent
+    assert chat_id == ADMIN_CHAT and "can&#x27;t parse entities" in text
+
+    # Повторна невдача не надсилає адміну новий звіт
+    store.reschedule_outbox([(item["id"], 0, "BadRequest") for item in store.fetch_outbox_due(10)])
+    run_batch(store, worker, bot)
+    assert len(bot.sent) == 1
+    assert store.get_question(request_id)["user_id"] == 1
+
+
+@pytest.mark.parametrize("error", [
+    TelegramBadRequest(None, "Bad Request: chat not found"),
+    TelegramForbiddenError(None, "Forbidden: bot was blocked by the user"),
+])
+def test_permanent_errors_wipe_user_id(store, worker, error):
+    request_id = store.create_question(1, "Питання")
+    store.save_answers([request_id], "Відповідь", notify_chat_id=ADMIN_CHAT)
+    bot = FakeBot(error)
+
+    run_batch(store, worker, bot)
+
+    q = store.get_question(request_id)
+    assert (q["status"], q["user_id"]) == ("delivered", -1)
+    assert store.count_outbox() == 0
+    ((chat_id, text),) = bot.sent
+    assert chat_id == ADMIN_CHAT and "заблокував" in text
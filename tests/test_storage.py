@@ -0,0 +1,420 @@
+"""
+Контракт інтерфейсу Database: ті самі тести для кожного бекенду (фікстура store)
+"""
+import re
+import time
+
+from services.database import SNIPPET_CLOSE, SNIPPET_OPEN
+from services.exporter import EXPORT_COLUMNS
+
+QUESTION_KEYS = {
+    "request_id", "bot_id", "user_id", "question", "answer", "status",
+    "created_at", "answered_at", "delivered_at", "rating",
+}
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+DAY = 86400
+
+
+def today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def create(store, count: int, text: str = "Питання") -> list:
+    return [store.create_question(1000 + i, f"{text} {i}") for i in range(count)]
+
+
+def deliver_all(store) -> list:
+    """Доставка всієї черги, як DeliveryWorker без помилок"""
+    batch = store.fetch_outbox_due(100)
+    ids = [item["id"] for item in batch]
+    store.complete_outbox(ids, [item["request_id"] for item in batch], ids)
+    return batch
+
+
+# ---- Питання ----
+
+def test_create_and_get_question(store):
+    request_id = store.create_question(42, "Коли сесія?")
+
+    q = store.get_question(request_id)
+    assert set(q) == QUESTION_KEYS
+    assert re.fullmatch(r"[0-9A-F]{8}", request_id)
+    assert (q["request_id"], q["bot_id"], q["user_id"], q["question"]) == (request_id, 0, 42, "Коли сесія?")
+    assert (q["status"], q["answer"], q["answered_at"], q["rating"]) == ("pending", None, None, None)
+    assert TIMESTAMP.match(q["created_at"])
+    assert store.get_question("FFFFFFFF") is None
+
+
+def test_pending_in_arrival_order(store):
+    ids = create(store, 5)
+
+    assert [q["request_id"] for q in store.get_pending_questions()] == ids
+    assert store.filter_pending() == ids
+    assert store.filter_pending([ids[3], "FFFFFFFF", ids[0], ids[3]]) == [ids[0], ids[3]]
+    assert store.filter_pending([]) == []
+    assert store.count_pending() == 5
+
+
+def test_bots_are_isolated(store, bot_context):
+    with bot_context(101):
+        first = store.create_question(1, "Питання першого бота")
+    with bot_context(202):
+        assert store.check_rate_limit(1, 60) is None
+        second = store.create_question(1, "Питання другого бота")
+        assert store.get_question(first) is None
+        assert store.filter_pending() == [second]
+        assert store.reject_questions([first]) == 0
+        store.set_dashboard(7, 2020)
+    with bot_context(101):
+        assert store.count_pending() == 1
+        assert store.get_dashboard(7) is None
+        assert store.search_questions("питання")[0] == 1
+
+    everyone = store.get_pending_questions(all_bots=True)
+    assert [(q["request_id"], q["bot_id"]) for q in everyone] == [(first, 101), (second, 202)]
+
+
+# ---- Ліміт частоти ----
+
+def test_rate_limit(store):
+    assert store.check_rate_limit(1, 30) is None
+    store.create_question(1, "Питання")
+
+    assert 28 <= store.check_rate_limit(1, 30) <= 30
+    assert store.check_rate_limit(1, 0) is None
+    assert store.check_rate_limit(2, 30) is None
+
+    store.set_rate_limit_age(1, 40)
+    assert store.check_rate_limit(1, 30) is None
+    store.update_rate_limit(1)
+    assert store.check_rate_limit(1, 30) is not None
+
+
+# ---- Відповіді та черга доставки ----
+
+def test_save_answers_enqueues_delivery(store):
+    first, second, third = create(store, 3)
+
+    recipients = store.save_answers([second, first, "FFFFFFFF", second], "Відповідь", publish=True, notify_chat_id=5)
+
+    assert sorted((r["request_id"], r["user_id"], r["question"]) for r in recipients) == sorted(
+        [(first, 1000, "Питання 0"), (second, 1001, "Питання 1")]
+    )
+    for request_id in (first, second):
+        q = store.get_question(request_id)
+        assert (q["status"], q["answer"]) == ("answered", "Відповідь")
+        assert TIMESTAMP.match(q["answered_at"])
+    assert store.filter_pending() == [third]
+
+    batch = store.fetch_outbox_due(10)
+    assert store.count_outbox() == 3
+    answers = sorted((item["request_id"], item["notify_chat_id"], item["user_id"]) for item in batch if item["kind"] == "answer")
+    assert answers == sorted([(first, 5, 1000), (second, 5, 1001)])
+    # Публікація в канал одна — для першого питання зі списку
+    assert [(item["request_id"], item["notify_chat_id"]) for item in batch if item["kind"] == "channel"] == [(second, None)]
+    assert all(item["answer"] == "Відповідь" and item["attempts"] == 0 and item["bot_id"] == 0 for item in batch)
+    assert all(item["last_error"] is None for item in batch)
+
+
+def test_only_pending_questions_are_answered(store):
+    answered, rejected = create(store, 2)
+    assert store.save_answer(answered, "Перша") == 1000
+    store.reject_questions([rejected])
+
+    assert store.save_answer(answered, "Друга") is None
+    assert store.save_answer(rejected, "Друга") is None
+    assert store.save_answers([], "Порожньо") == []
+    assert store.get_question(answered)["answer"] == "Перша"
+    assert store.count_outbox() == 1
+
+
+def test_complete_outbox_wipes_user_id(store):
+    request_id, failed = create(store, 2)
+    store.save_answers([request_id, failed], "Відповідь")
+
+    batch = store.fetch_outbox_due(10)
+    delivered = [item["id"] for item in batch if item["request_id"] == request_id]
+    # Остаточна невдача теж видаляє user_id, але не йде в затримку доставки
+    store.complete_outbox([item["id"] for item in batch], [request_id, failed], delivered)
+
+    assert store.count_outbox() == 0
+    for rid in (request_id, failed):
+        q = store.get_question(rid)
+        assert (q["status"], q["user_id"]) == ("delivered", -1)
+        assert TIMESTAMP.match(q["delivered_at"])
+    (day,) = store.get_daily_metrics(today())
+    assert (day["answer"].count, day["delivery"].count) == (2, 1)
+
+
+def test_reschedule_outbox(store):
+    first, second = create(store, 2)
+    store.save_answers([first], "А")
+    store.save_answers([second], "Б")
+    (a, b) = store.fetch_outbox_due(10)
+    assert [a["request_id"], b["request_id"]] == [first, second]
+
+    now = time.time()
+    store.reschedule_outbox([(a["id"], now + 3600, "Timeout"), (b["id"], now - 10, "Flood")])
+
+    (due,) = store.fetch_outbox_due(10)
+    assert (due["id"], due["attempts"], due["last_error"]) == (b["id"], 1, "Flood")
+    store.reschedule_outbox([(b["id"], now - 20, "Flood")])
+    assert store.fetch_outbox_due(10)[0]["attempts"] == 2
+    assert store.count_outbox() == 2
+
+
+def test_fetch_outbox_due_order_and_limit(store):
+    ids = create(store, 4)
+    for request_id in ids:
+        store.save_answer(request_id, "Відповідь")
+    items = store.fetch_outbox_due(10)
+    now = time.time()
+    store.reschedule_outbox([(item["id"], now - 100 + i, "") for i, item in zip((3, 1, 2, 0), items)])
+
+    assert [item["request_id"] for item in store.fetch_outbox_due(2)] == [ids[3], ids[1]]
+    assert len(store.fetch_outbox_due(10)) == 4
+
+
+def test_outbox_serves_all_bots(store, bot_context):
+    for bot_id in (101, 202):
+        with bot_context(bot_id):
+            store.save_answer(store.create_question(bot_id, "Питання"), "Відповідь")
+
+    assert sorted((item["bot_id"], item["user_id"]) for item in store.fetch_outbox_due(10)) == [(101, 101), (202, 202)]
+
+
+# ---- Масові дії ----
+
+def test_reject_and_delete(store):
+    rejected, deleted, answered, kept = create(store, 4)
+    store.save_answer(answered, "Відповідь")
+
+    assert store.reject_questions([rejected, rejected, answered, "FFFFFFFF"]) == 1
+    assert store.delete_questions([deleted, answered, rejected]) == 1
+    assert store.reject_questions([]) == 0 and store.delete_questions([]) == 0
+
+    q = store.get_question(rejected)
+    assert (q["status"], q["user_id"]) == ("rejected", -1)
+    assert store.get_question(deleted) is None
+    assert store.get_question(answered)["status"] == "answered"
+    assert store.filter_pending() == [kept]
+    assert store.search_questions("питання")[0] == 3
+
+
+def test_search_pending(store):
+    spam = [store.create_question(i, f"Купуйте підписників {i}") for i in range(3)]
+    store.create_question(9, "Коли сесія")
+    store.save_answer(spam[1], "Ні")
+
+    assert store.search_pending("купуйте ПІДПИС") == [spam[0], spam[2]]
+    assert store.search_pending("підписників сесія") == []
+    assert store.search_pending("!!!") == []
+
+
+# ---- Оцінки та статистика ----
+
+def test_only_first_rating_counts(store):
+    first, second = create(store, 2)
+    store.save_answers([first, second], "Відповідь")
+    deliver_all(store)
+
+    store.save_rating(first, 1)
+    store.save_rating(first, 0)
+    store.save_rating(second, 0)
+    store.save_rating("FFFFFFFF", 1)
+
+    assert store.get_question(first)["rating"] == 1
+    (day,) = store.get_daily_metrics(today())
+    assert (day["rated_useful"], day["rated_total"]) == (1, 2)
+    assert store.get_stats()["useful"] == "50% (1 з 2)"
+
+
+def test_stats_of_empty_store(store):
+    assert store.count_questions() == {"total": 0, "answered": 0, "pending": 0, "last_question": None}
+    assert store.get_daily_metrics(today()) == []
+
+    stats = store.get_stats()
+    assert (stats["avg_time"], stats["answer_percentiles"], stats["delivery_percentiles"], stats["useful"]) == ("—",) * 4
+
+
+def test_stats_counts(store):
+    pending, answered, delivered, rejected = create(store, 4)
+    store.save_answer(answered, "Відповідь")
+    store.save_answer(delivered, "Відповідь")
+    store.reject_questions([rejected])
+    batch = [item for item in store.fetch_outbox_due(10) if item["request_id"] == delivered]
+    store.complete_outbox([batch[0]["id"]], [delivered], [batch[0]["id"]])
+
+    counts = store.count_questions()
+    assert (counts["total"], counts["answered"], counts["pending"]) == (4, 2, 1)
+    assert TIMESTAMP.match(counts["last_question"])
+
+    stats = store.get_stats()
+    assert stats["days"] == 7
+    assert stats["answer_percentiles"].count(" / ") == 2
+    assert stats["delivery_percentiles"] != "—"
+    assert re.fullmatch(r"\d{2}\.\d{2}\.\d{4} \d{2}:\d{2}", stats["last_question"])
+
+
+def test_daily_metrics_since(store):
+    store.save_answer(store.create_question(1, "Питання"), "Відповідь")
+
+    assert len(store.get_daily_metrics(today())) == 1
+    assert store.get_daily_metrics("9999-01-01") == []
+
+
+# ---- Спам-приклади та панелі ----
+
+def test_spam_examples_newest_first(store):
+    for i in range(5):
+        store.add_spam_example(f"Приклад {i}", i % 2 == 0)
+
+    assert store.get_spam_examples(3) == [("Приклад 4", True), ("Приклад 3", False), ("Приклад 2", True)]
+    assert len(store.get_spam_examples()) == 5
+
+
+def test_dashboards(store):
+    assert store.get_dashboard(7) is None
+    store.set_dashboard(7, 100)
+    store.set_dashboard(7, 200)
+    store.set_dashboard(8, 300)
+
+    assert (store.get_dashboard(7), store.get_dashboard(8)) == (200, 300)
+
+
+# ---- Пошук ----
+
+def test_search_questions(store):
+    ids = [store.create_question(i, f"Розклад сесії, тиждень {i}") for i in range(7)]
+    store.create_question(99, "Гуртожиток")
+    store.save_answer(ids[0], "Розклад оновлено в гуртожитку")
+
+    total, page = store.search_questions("розклад", limit=3)
+    assert total == 7 and len(page) == 3
+    assert set(page[0]) == {"request_id", "status", "created_at", "snippet"}
+    assert all(SNIPPET_OPEN + "Розклад" + SNIPPET_CLOSE in item["snippet"] for item in page)
+
+    rest = store.search_questions("розклад", limit=10, offset=3)[1]
+    assert {item["request_id"] for item in page + rest} == set(ids)
+    # Префіксний AND по питанню і відповіді
+    assert [item["request_id"] for item in store.search_questions("розк гуртож")[1]] == [ids[0]]
+    assert store.search_questions("розклад екзамен") == (0, [])
+    assert store.search_questions("?!") == (0, [])
+
+
+def test_search_tokens_like_fts5(store):
+    store.create_question(1, "Оплата через foo_bar у café")
+    store.create_question(2, "Їжак і йогурт")
+
+    for terms in ("bar", "FOO", "cafe", "CAFÉ", "їжак", "йогурт"):
+        assert store.search_questions(terms)[0] == 1, terms
+    # Кирилиця без зняття діакритики: й ≠ и, ї ≠ і
+    assert store.search_questions("іжак")[0] == 0
+    assert store.search_questions("иогурт")[0] == 0
+
+
+def test_search_order_matches_between_backends(open_store):
+    """Однаковий порядок сторінок: bm25 як rank FTS5, за рівних — новіші"""
+    words = "розклад сесії екзамен оцінка стипендія гуртожиток бібліотека декан залік кафедра".split()
+    results = {}
+    for backend in ("sqlite", "memory"):
+        store = open_store(backend)
+        for i in range(120):
+            text = " ".join(words[(i * 7 + j * 3) % len(words)] for j in range(2 + i % 9))
+            request_id = store.create_question(i, f"{text} №{i}")
+            if i % 4 == 0:
+                store.save_answer(request_id, " ".join(words[(i + j) % len(words)] for j in range(1 + i % 3)))
+        results[backend] = [
+            [store.get_question(item["request_id"])["question"] for item in store.search_questions(terms, limit=200)[1]]
+            for terms in ("розклад", "сес екзам", "декан декан", "бібл", "залік кафедра")
+        ]
+
+    assert results["sqlite"] == results["memory"]
+    assert all(results["sqlite"])
+
+
+# ---- Експорт, очищення, перезапуск ----
+
+def test_export_rows(store, bot_context):
+    old, answered, rejected = create(store, 3)
+    store.save_answer(answered, "Відповідь")
+    store.reject_questions([rejected])
+    store.backdate(old, 3 * DAY)
+    with bot_context(202):
+        other = store.create_question(1, "Інший бот")
+
+    rows = list(store.export_rows())
+    assert [row[0] for row in rows] == [old, answered, rejected, other]
+    assert all(len(row) == len(EXPORT_COLUMNS) for row in rows)
+    assert dict(zip(EXPORT_COLUMNS, rows[1]))["answer"] == "Відповідь"
+
+    two_days_ago = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 2 * DAY))
+    three_days_ago = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 3 * DAY))
+    assert [row[0] for row in store.export_rows(since=two_days_ago)] == [answered, rejected, other]
+    assert [row[0] for row in store.export_rows(until=three_days_ago)] == [old]
+    assert [row[0] for row in store.export_rows(status="rejected")] == [rejected]
+    assert [row[0] for row in store.export_rows(bot_id=0)] == [old, answered, rejected]
+    assert [row[0] for row in store.export_rows(bot_id=202, status="pending")] == [other]
+
+
+def test_cleanup_old_data(store):
+    old_delivered, old_rejected, old_pending, old_answered, recent = create(store, 5)
+    store.save_answers([old_delivered, recent], "Відповідь")
+    store.reject_questions([old_rejected])
+    deliver_all(store)
+    store.save_answer(old_answered, "Відповідь")
+    for request_id in (old_delivered, old_rejected, old_pending, old_answered):
+        store.backdate(request_id, 8 * DAY)
+    store.backdate(recent, 7 * DAY - 600)
+    store.set_rate_limit_age(1000, 8 * DAY)
+    store.set_rate_limit_age(1001, 6 * DAY)
+
+    store.cleanup_old_data(7)
+
+    assert store.get_question(old_delivered) is None
+    assert store.get_question(old_rejected) is None
+    # Без відповіді або з недоставленою відповіддю — лишаються
+    assert store.get_question(old_pending)["status"] == "pending"
+    assert store.get_question(old_answered)["status"] == "answered"
+    assert store.get_question(recent)["status"] == "delivered"
+    assert store.check_rate_limit(1000, 10 * DAY) is None
+    assert store.check_rate_limit(1001, 10 * DAY) is not None
+
+
+def test_state_survives_reopen(store):
+    pending, answered, rejected = create(store, 3)
+    store.save_answer(answered, "Відповідь")
+    store.reject_questions([rejected])
+    (item,) = store.fetch_outbox_due(10)
+    store.reschedule_outbox([(item["id"], time.time() - 1, "Timeout")])
+    store.save_rating(answered, 1)
+    store.add_spam_example("Спам", True)
+    store.set_dashboard(7, 100)
+
+    store.reopen()
+
+    assert store.filter_pending() == [pending]
+    assert store.get_question(answered)["rating"] == 1
+    assert store.get_question(rejected)["status"] == "rejected"
+    (item,) = store.fetch_outbox_due(10)
+    assert (item["request_id"], item["attempts"], item["user_id"]) == (answered, 1, 1001)
+    assert store.get_spam_examples() == [("Спам", True)]
+    assert store.get_dashboard(7) == 100
+    assert store.check_rate_limit(1000, 60) is not None
+    assert store.get_stats()["useful"] == "100% (1 з 1)"
+    assert store.search_questions("питання")[0] == 3
+
+    # Нові записи після перезапуску не конфліктують зі старими
+    store.save_answer(pending, "Пізніше")
+    assert store.count_outbox() == 2
+
+
+def test_storage_stats(store):
+    create(store, 2)
+
+    stats = store.get_storage_stats()
+    assert stats["backend"] == store.backend
+    assert (stats["questions"], stats["rate_limits"], stats["outbox"]) == (2, 2, 0)
+    assert {"file_bytes", "wal_bytes"} <= set(stats)
+    assert isinstance(store.queue_depth, int)
+    assert store.ping() is True
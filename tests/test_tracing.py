@@ -0,0 +1,56 @@
+"""
+Атрибути кореневого спану: вільний текст користувача не потрапляє в трейси
+"""
+import asyncio
+
+import pytest
+from aiogram import Router
+from aiogram.filters import Command, CommandStart
+from aiogram.types import Update
+
+from middlewares.tracing import OTHER_COMMAND, TracingMiddleware, registered_commands
+from services.tracing import Tracer, current_span
+
+
+def message_update(text: str) -> Update:
+    return Update.model_validate({
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": 0, "text": text,
+            "chat": {"id": 1, "type": "private"}, "from": {"id": 1, "is_bot": False, "first_name": "U"},
+        },
+    })
+
+
+def root_attributes(middleware: TracingMiddleware, update: Update) -> dict:
+    async def handler(event, data):
+        return dict(current_span().attributes)
+
+    return asyncio.run(middleware(handler, update, {}))
+
+
+def test_registered_commands_include_nested_routers():
+    root, nested = Router(), Router()
+    root.include_router(nested)
+    root.message.register(lambda message: None, CommandStart())
+    nested.message.register(lambda message: None, Command("stats", "spam"))
+
+    assert registered_commands(root) == {"/start", "/stats", "/spam"}
+
+
+@pytest.mark.parametrize("text, command", [
+    ("/stats", "/stats"),
+    ("/stats@SomeBot 7", "/stats"),
+    ("/my secret question about the dean", OTHER_COMMAND),
+    ("/", OTHER_COMMAND),
+])
+def test_only_registered_commands_are_recorded(text, command):
+    middleware = TracingMiddleware(Tracer(True), commands=frozenset({"/stats"}))
+
+    assert root_attributes(middleware, message_update(text))["command"] == command
+
+
+def test_plain_text_has_no_command():
+    middleware = TracingMiddleware(Tracer(True), commands=frozenset({"/stats"}))
+
+    assert "command" not in root_attributes(middleware, message_update("просто текст"))
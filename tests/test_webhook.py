@@ -0,0 +1,44 @@
+"""
+Вебхук: неправильний секрет у будь-якому кодуванні — 401, а не 500
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from aiogram import Bot, Dispatcher
+
+from services.webhook import SECRET_HEADER, GuardedRequestHandler, webhook_secret
+
+# Непотрібний тип оновлення: після перевірки секрету — 200 без диспетчера
+BODY = b'{"update_id": 1, "poll": {}}'
+
+
+async def post(secret: bytes) -> int:
+    """Сирий запит: клієнт aiohttp не надіслав би байти, що не є UTF-8"""
+    app = web.Application()
+    bot = Bot("123456:TEST")
+    GuardedRequestHandler(dispatcher=Dispatcher(), bot=bot).register(app, path="/webhook")
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(
+            b"POST /webhook HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+            + f"Content-Length: {len(BODY)}\r\n{SECRET_HEADER}: ".encode() + secret + b"\r\n\r\n" + BODY
+        )
+        status_line = await reader.readline()
+        writer.close()
+        return int(status_line.split()[1])
+    finally:
+        await server.close()
+        await bot.session.close()
+
+
+@pytest.mark.parametrize("secret", [b"", b"wrong", "секрет".encode(), b"\xff\xfe"])
+def test_wrong_secret_is_rejected(secret):
+    assert asyncio.run(post(secret)) == 401
+
+
+def test_valid_secret_passes():
+    assert asyncio.run(post(webhook_secret(Bot("123456:TEST")).encode())) == 200
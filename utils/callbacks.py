@@ -0,0 +1,149 @@
+"""
+Схема callback_data: типізовані фабрики aiogram і диспетчеризація за префіксом.
+Формат "префікс:поле:поле" збігається з попереднім — кнопки в уже надісланих
+повідомленнях продовжують працювати
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Annotated, Any, Dict, Optional, Type, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+from pydantic import Field
+
+from config import TEXTS
+
+# request_id — перші 8 символів uuid4 у верхньому регістрі (services/database.py)
+RequestId = Annotated[str, Field(pattern=r"^[0-9A-F]{8}$")]
+
+
+# Користувач
+
+class BackToMenuCallback(CallbackData, prefix="back_to_menu"):
+    pass
+
+
+class HowItWorksCallback(CallbackData, prefix="how_it_works"):
+    pass
+
+
+class AskQuestionCallback(CallbackData, prefix="ask_question"):
+    pass
+
+
+class ConfirmSendCallback(CallbackData, prefix="confirm_send"):
+    pass
+
+
+class EditQuestionCallback(CallbackData, prefix="edit_question"):
+    pass
+
+
+class CancelQuestionCallback(CallbackData, prefix="cancel_question"):
+    pass
+
+
+class RateCallback(CallbackData, prefix="rate"):
+    request_id: RequestId
+    useful: bool
+
+
+# Адмін
+
+class AdminStatsCallback(CallbackData, prefix="admin_stats"):
+    pass
+
+
+class AdminPendingCallback(CallbackData, prefix="admin_pending"):
+    pass
+
+
+class AdminBackCallback(CallbackData, prefix="admin_back"):
+    pass
+
+
+class AdminReplyCallback(CallbackData, prefix="admin_reply"):
+    request_id: RequestId
+
+
+class AdminReplyAllCallback(CallbackData, prefix="admin_reply_all"):
+    request_id: RequestId
+
+
+class AdminSearchCallback(CallbackData, prefix="admin_search"):
+    page: int = Field(ge=0)
+
+
+class BulkAction(str, Enum):
+    reject = "reject"
+    delete = "delete"
+    answer = "answer"
+
+
+class BulkSelectCallback(CallbackData, prefix="bulk"):
+    """Дія над усіма питаннями без відповіді (зі списку очікуючих)"""
+    action: BulkAction
+
+
+class BulkConfirmCallback(CallbackData, prefix="bulk_ok"):
+    """Вибір зберігається у FSM — callback_data обмежена 64 байтами"""
+    action: BulkAction
+
+
+class BulkCancelCallback(CallbackData, prefix="bulk_cancel"):
+    pass
+
+
+@dataclass(frozen=True)
+class _Route:
+    schema: Type[CallbackData]
+    handler: CallableObject
+    state: Optional[str]
+
+
+class CallbackRouter:
+    """
+    Таблиця префікс → обробник: один фільтр на роутер замість перебору F.data-фільтрів.
+    Обробник отримує розібраний callback_data; некоректні дані — відповідь, а не виняток
+    """
+
+    def __init__(self, router: Router):
+        self._routes: Dict[str, _Route] = {}
+        router.callback_query.register(self._dispatch, self._match)
+
+    def __call__(self, schema: Type[CallbackData], state: Optional[State] = None):
+        def register(handler):
+            if schema.__prefix__ in self._routes:
+                raise ValueError(f"Префікс {schema.__prefix__!r} вже зареєстровано")
+            self._routes[schema.__prefix__] = _Route(
+                schema, CallableObject(handler), state.state if state else None
+            )
+            return handler
+        return register
+
+    def _match(self, callback: CallbackQuery, raw_state: Optional[str] = None) -> Union[bool, Dict[str, Any]]:
+        data = callback.data or ""
+        route = self._routes.get(data.split(":", 1)[0])
+        # Невідомий префікс або інший стан FSM — оновлення йде до наступного роутера
+        if route is None or (route.state is not None and route.state != raw_state):
+            return False
+        try:
+            decoded = route.schema.unpack(data)
+        except (TypeError, ValueError):
+            decoded = None
+        return {"callback_route": route, "callback_data": decoded}
+
+    async def _dispatch(
+        self,
+        callback: CallbackQuery,
+        callback_route: _Route,
+        callback_data: Optional[CallbackData],
+        **data: Any,
+    ):
+        if callback_data is None:
+            await callback.answer(TEXTS["callback_invalid"], show_alert=True)
+            return
+        return await callback_route.handler.call(callback, callback_data=callback_data, **data)
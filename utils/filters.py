@@ -3,7 +3,7 @@
 """
 from aiogram.filters import BaseFilter
 from aiogram.types import Message, CallbackQuery
-from config import settings
+from config import current_config
 
 
 class IsAdmin(BaseFilter):
@@ -12,5 +12,5 @@ class IsAdmin(BaseFilter):
     async def __call__(self, event) -> bool:
         if isinstance(event, (Message, CallbackQuery)):
             user_id = event.from_user.id if event.from_user else None
-            return user_id in settings.ADMIN_IDS
+            return user_id in current_config().ADMIN_IDS
         return False
@@ -4,15 +4,22 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
+from utils.callbacks import (
+    AskQuestionCallback, HowItWorksCallback, ConfirmSendCallback, EditQuestionCallback,
+    CancelQuestionCallback, BackToMenuCallback, RateCallback, AdminReplyCallback,
+    AdminReplyAllCallback, AdminStatsCallback, AdminPendingCallback, AdminSearchCallback,
+    BulkAction, BulkSelectCallback, BulkConfirmCallback, BulkCancelCallback
+)
+
 
 def main_menu_keyboard() -> InlineKeyboardMarkup:
     """Головне меню"""
     builder = InlineKeyboardBuilder()
     builder.row(
-        InlineKeyboardButton(text="📩 Задати анонімне питання", callback_data="ask_question")
+        InlineKeyboardButton(text="📩 Задати анонімне питання", callback_data=AskQuestionCallback().pack())
     )
     builder.row(
-        InlineKeyboardButton(text="ℹ️ Як це працює / Про анонімність", callback_data="how_it_works")
+        InlineKeyboardButton(text="ℹ️ Як це працює / Про анонімність", callback_data=HowItWorksCallback().pack())
     )
     return builder.as_markup()
 
@@ -28,11 +35,11 @@ def confirm_question_keyboard(request_id: str = "") -> InlineKeyboardMarkup:
     """Підтвердження надсилання питання"""
     builder = InlineKeyboardBuilder()
     builder.row(
-        InlineKeyboardButton(text="✅ Надіслати анонімно", callback_data="confirm_send"),
-        InlineKeyboardButton(text="✏️ Редагувати", callback_data="edit_question"),
+        InlineKeyboardButton(text="✅ Надіслати анонімно", callback_data=ConfirmSendCallback().pack()),
+        InlineKeyboardButton(text="✏️ Редагувати", callback_data=EditQuestionCallback().pack()),
     )
     builder.row(
-        InlineKeyboardButton(text="❌ Скасувати", callback_data="cancel_question")
+        InlineKeyboardButton(text="❌ Скасувати", callback_data=CancelQuestionCallback().pack())
     )
     return builder.as_markup()
 
@@ -41,7 +48,7 @@ def back_to_menu_keyboard() -> InlineKeyboardMarkup:
     """Повернення до головного меню"""
     builder = InlineKeyboardBuilder()
     builder.row(
-        InlineKeyboardButton(text="🏠 Головне меню", callback_data="back_to_menu")
+        InlineKeyboardButton(text="🏠 Головне меню", callback_data=BackToMenuCallback().pack())
     )
     return builder.as_markup()
 
@@ -50,21 +57,45 @@ def rating_keyboard(request_id: str) -> InlineKeyboardMarkup:
     """Рейтинг відповіді"""
     builder = InlineKeyboardBuilder()
     builder.row(
-        InlineKeyboardButton(text="👍 Корисно", callback_data=f"rate:{request_id}:1"),
-        InlineKeyboardButton(text="👎 Не корисно", callback_data=f"rate:{request_id}:0"),
+        InlineKeyboardButton(
+            text="👍 Корисно", callback_data=RateCallback(request_id=request_id, useful=True).pack()
+        ),
+        InlineKeyboardButton(
+            text="👎 Не корисно", callback_data=RateCallback(request_id=request_id, useful=False).pack()
+        ),
     )
     return builder.as_markup()
 
 
-def admin_reply_keyboard(request_id: str) -> InlineKeyboardMarkup:
-    """Кнопка відповіді для адміна"""
+def admin_reply_keyboard(request_id: str, similar: int = 0) -> InlineKeyboardMarkup:
+    """Кнопка відповіді для адміна (та відповіді всім схожим питанням)"""
     builder = InlineKeyboardBuilder()
     builder.row(
         InlineKeyboardButton(
             text=f"↩️ Відповісти на #{request_id}",
-            callback_data=f"admin_reply:{request_id}"
+            callback_data=AdminReplyCallback(request_id=request_id).pack()
         )
     )
+    if similar:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"👥 Відповісти всім ({similar + 1})",
+                callback_data=AdminReplyAllCallback(request_id=request_id).pack()
+            )
+        )
+    return builder.as_markup()
+
+
+def admin_digest_keyboard(request_ids: list) -> InlineKeyboardMarkup:
+    """Кнопки відповіді для кожного питання дайджесту"""
+    builder = InlineKeyboardBuilder()
+    for request_id in request_ids:
+        builder.add(
+            InlineKeyboardButton(
+                text=f"↩️ #{request_id}", callback_data=AdminReplyCallback(request_id=request_id).pack()
+            )
+        )
+    builder.adjust(2)
     return builder.as_markup()
 
 
@@ -72,7 +103,56 @@ def admin_menu_keyboard() -> InlineKeyboardMarkup:
     """Адмін меню"""
     builder = InlineKeyboardBuilder()
     builder.row(
-        InlineKeyboardButton(text="📊 Статистика", callback_data="admin_stats"),
-        InlineKeyboardButton(text="📋 Очікують відповіді", callback_data="admin_pending"),
+        InlineKeyboardButton(text="📊 Статистика", callback_data=AdminStatsCallback().pack()),
+        InlineKeyboardButton(text="📋 Очікують відповіді", callback_data=AdminPendingCallback().pack()),
+    )
+    return builder.as_markup()
+
+
+def pending_bulk_keyboard() -> InlineKeyboardMarkup:
+    """Адмін меню та дії над усіма питаннями без відповіді"""
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text="🚫 Відхилити всі", callback_data=BulkSelectCallback(action=BulkAction.reject).pack()
+        ),
+        InlineKeyboardButton(
+            text="🗑 Видалити всі", callback_data=BulkSelectCallback(action=BulkAction.delete).pack()
+        ),
+    )
+    builder.row(
+        InlineKeyboardButton(
+            text="✍️ Одна відповідь усім", callback_data=BulkSelectCallback(action=BulkAction.answer).pack()
+        )
+    )
+    builder.attach(InlineKeyboardBuilder.from_markup(admin_menu_keyboard()))
+    return builder.as_markup()
+
+
+def bulk_confirm_keyboard(action: BulkAction, count: int) -> InlineKeyboardMarkup:
+    """Підтвердження масової дії"""
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text=f"✅ Так ({count})", callback_data=BulkConfirmCallback(action=action).pack()
+        ),
+        InlineKeyboardButton(text="❌ Ні", callback_data=BulkCancelCallback().pack()),
     )
     return builder.as_markup()
+
+
+def search_pagination_keyboard(page: int, has_next: bool) -> InlineKeyboardMarkup:
+    """Навігація по сторінках результатів пошуку"""
+    builder = InlineKeyboardBuilder()
+    buttons = []
+    if page > 0:
+        buttons.append(
+            InlineKeyboardButton(text="◀️ Назад", callback_data=AdminSearchCallback(page=page - 1).pack())
+        )
+    if has_next:
+        buttons.append(
+            InlineKeyboardButton(text="Далі ▶️", callback_data=AdminSearchCallback(page=page + 1).pack())
+        )
+    if buttons:
+        builder.row(*buttons)
+    return builder.as_markup()